@@ -49,6 +49,7 @@ import importlib
 
 import six
 
+from . import cache
 from .register import Registry
 from .compression import COMPRESSION_SUFFIXES
 
@@ -57,6 +58,7 @@ __all__ = [
     'BackendError',
     'BackendNotImplementedError',
     'get_backend',
+    'iter_tests',
     'load',
     'set_meta',
 ]
@@ -115,67 +117,116 @@ def get_backend(backend):
     return inst
 
 
-def load(file_path):
+def _get_extension(file_path):
+    """Get the extension name to use when searching for a loader.
+
+    This function correctly handles compression suffixes, as long as they
+    are valid.
+
+    """
+    def _extension(file_path):
+        """Helper function to get the extension string."""
+        compression = 'none'
+        name, extension = os.path.splitext(file_path)
+
+        # If we hit a compressed suffix, get an additional suffix to test
+        # with.
+        # i.e: Use .json.gz rather that .gz
+        if extension in COMPRESSION_SUFFIXES:
+            compression = extension[1:]  # Drop the leading '.'
+            # Remove any trailing '.', this fixes a bug where the filename
+            # is 'foo.json..xz, or similar
+            extension = os.path.splitext(name.rstrip('.'))[1]
+
+        return extension, compression
+
+    if not os.path.isdir(file_path):
+        return _extension(file_path)
+    else:
+        for file_ in os.listdir(file_path):
+            if file_.startswith('result') and not file_.endswith('.old'):
+                return _extension(file_)
+
+    tests = os.path.join(file_path, 'tests')
+    if os.path.exists(tests):
+        return _extension(os.listdir(tests)[0])
+    else:
+        # At this point we have failed to find any sort of backend, just
+        # except and die
+        raise BackendError("No backend found for any file in {}".format(
+            file_path))
+
+
+def _get_loader(file_path):
+    """Return the Registry for file_path, its extension, and its compression.
+    """
+    extension, compression = _get_extension(file_path)
+
+    for backend in six.itervalues(BACKENDS):
+        if extension in backend.extensions:
+            return backend, extension, compression
+
+    raise BackendError(
+        'No module supports file extensions "{}"'.format(extension))
+
+
+def load(file_path, lazy=False):
     """Wrapper for loading runs.
 
     This function will attempt to determine how to load the file (based on file
     extension), and then pass the file path into the appropriate loader, and
     then return the TestrunResult instance.
 
+    If lazy is truthy then the loader is asked to avoid decoding the values of
+    each test until they are used, if it is able to. This is useful for
+    consumers that only need a few values from each test, like the result.
+
+    Results that have been loaded before are read from the results cache if
+    they haven't changed since. Results that are loaded eagerly are added to
+    it, lazily loaded results aren't, since that would decode every value.
+
     """
-    def get_extension(file_path):
-        """Get the extension name to use when searching for a loader.
-
-        This function correctly handles compression suffixes, as long as they
-        are valid.
-
-        """
-        def _extension(file_path):
-            """Helper function to get the extension string."""
-            compression = 'none'
-            name, extension = os.path.splitext(file_path)
-
-            # If we hit a compressed suffix, get an additional suffix to test
-            # with.
-            # i.e: Use .json.gz rather that .gz
-            if extension in COMPRESSION_SUFFIXES:
-                compression = extension[1:]  # Drop the leading '.'
-                # Remove any trailing '.', this fixes a bug where the filename
-                # is 'foo.json..xz, or similar
-                extension = os.path.splitext(name.rstrip('.'))[1]
-
-            return extension, compression
-
-        if not os.path.isdir(file_path):
-            return _extension(file_path)
-        else:
-            for file_ in os.listdir(file_path):
-                if file_.startswith('result') and not file_.endswith('.old'):
-                    return _extension(file_)
+    backend, extension, compression = _get_loader(file_path)
+    loader = backend.load
 
-        tests = os.path.join(file_path, 'tests')
-        if os.path.exists(tests):
-            return _extension(os.listdir(tests)[0])
-        else:
-            # At this point we have failed to find any sort of backend, just
-            # except and die
-            raise BackendError("No backend found for any file in {}".format(
-                file_path))
+    if loader is None:
+        raise BackendNotImplementedError(
+            'Loader for {} is not implemented'.format(extension))
 
-    extension, compression = get_extension(file_path)
+    testrun = cache.get(file_path)
+    if testrun is not None:
+        return testrun
 
-    for backend in six.itervalues(BACKENDS):
-        if extension in backend.extensions:
-            loader = backend.load
+    if lazy:
+        return loader(file_path, compression, lazy=True)
+    testrun = loader(file_path, compression)
+    cache.put(file_path, testrun)
+    return testrun
 
-            if loader is None:
-                raise BackendNotImplementedError(
-                    'Loader for {} is not implemented'.format(extension))
 
-            return loader(file_path, compression)
+def iter_tests(file_path, testrun=None):
+    """Iterate over the (name, TestResult) pairs of the tests of a run.
 
-    raise BackendError(
-        'No module supports file extensions "{}"'.format(extension))
+    Backends that support it read the tests one at a time, so that only one
+    test is in memory at once. Other backends are loaded lazily, and the
+    tests of the TestrunResult are yielded.
+
+    If testrun is a TestrunResult, it is updated with the values of the run
+    other than the tests (name, options, totals, etc) once the iterator is
+    exhausted.
+
+    """
+    backend, _, compression = _get_loader(file_path)
+    if backend.iter_tests is not None:
+        for each in backend.iter_tests(file_path, compression, testrun):
+            yield each
+        return
+
+    loaded = load(file_path, lazy=True)
+    for each in six.iteritems(loaded.tests):
+        yield each
+    if testrun is not None:
+        testrun.update_metadata(loaded)
 
 
 def set_meta(backend, result):
@@ -33,6 +33,10 @@ import contextlib
 import itertools
 import os
 import shutil
+import struct
+import threading
+import time
+import zlib
 
 import six
 
@@ -41,6 +45,9 @@ from . import compression
 from framework.results import TestResult
 from framework.status import INCOMPLETE
 
+# The basename of the journal file used by FileBackend, in the tests directory
+JOURNAL_NAME = 'journal'
+
 
 @contextlib.contextmanager
 def write_compressed(filename):
@@ -65,6 +72,133 @@ def write_compressed(filename):
         yield f
 
 
+def _scan_journal(f):
+    """Yield each valid record in a journal, and the offset of its end.
+
+    Each record is a header of the length and crc32 of the payload, followed
+    by the payload. Scanning stops at the first record that is truncated or
+    doesn't match its checksum, since everything after a torn write is
+    suspect.
+
+    """
+    offset = 0
+    while True:
+        header = f.read(Journal.HEADER.size)
+        if len(header) < Journal.HEADER.size:
+            return
+        length, checksum = Journal.HEADER.unpack(header)
+        payload = f.read(length)
+        if (len(payload) < length or
+                zlib.crc32(payload) & 0xffffffff != checksum):
+            return
+        offset += Journal.HEADER.size + length
+        yield payload, offset
+
+
+def read_journal(filename):
+    """Yield the text of each valid record in a journal file, in order."""
+    with open(filename, 'rb') as f:
+        for payload, _ in _scan_journal(f):
+            yield payload.decode('utf-8')
+
+
+def read_tests(tests_dir):
+    """Yield the text written for each test in a FileBackend tests directory.
+
+    Tests written to their own files are yielded in the order they were
+    written, followed by the records of the journal, if there is one. A test
+    may be yielded more than once (the incomplete placeholder and then the
+    final result), the last one is the one that should be used.
+
+    """
+    files = []
+    journals = []
+    for each in os.listdir(tests_dir):
+        base = os.path.splitext(each)[0]
+        if base == JOURNAL_NAME:
+            journals.append(each)
+        elif base.isdigit():
+            files.append(each)
+
+    for each in sorted(files, key=lambda p: int(os.path.splitext(p)[0])):
+        with open(os.path.join(tests_dir, each), 'r') as f:
+            yield f.read()
+
+    for each in journals:
+        for record in read_journal(os.path.join(tests_dir, each)):
+            yield record
+
+
+class Journal(object):
+    """An append only file of length prefixed, checksummed records.
+
+    This is safe to write to from multiple threads. If syncing is enabled the
+    file is only synced to disk once sync_records records have been written
+    or sync_interval seconds have passed since the last sync, rather than
+    after every record. A crash can lose the records written since the last
+    sync, but it cannot corrupt the ones before it.
+
+    Arguments:
+    filename -- the file to append to. If it exists then anything after the
+                last valid record is discarded.
+
+    Keyword Arguments:
+    sync -- if truthy sync the file to disk, otherwise it is only flushed.
+    sync_records -- the most records to write between syncs.
+    sync_interval -- the most time in seconds between syncs.
+
+    """
+    HEADER = struct.Struct('<II')
+
+    def __init__(self, filename, sync=False, sync_records=64,
+                 sync_interval=1.0):
+        self.__sync = sync
+        self.__sync_records = sync_records
+        self.__sync_interval = sync_interval
+        self.__pending = 0
+        self.__last_sync = time.time()
+        self.__lock = threading.Lock()
+
+        self.__file = open(filename, 'ab+')
+        self.__file.seek(0)
+        end = 0
+        for _, end in _scan_journal(self.__file):
+            pass
+        self.__file.truncate(end)
+        self.__file.seek(end)
+
+    def append(self, text):
+        """Append a record containing text."""
+        payload = text
+        if isinstance(payload, six.text_type):
+            payload = payload.encode('utf-8')
+        record = self.HEADER.pack(
+            len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+        with self.__lock:
+            self.__file.write(record)
+            self.__file.flush()
+            self.__pending += 1
+            if self.__sync and (
+                    self.__pending >= self.__sync_records or
+                    time.time() - self.__last_sync >= self.__sync_interval):
+                self.__fsync()
+
+    def __fsync(self):
+        os.fsync(self.__file.fileno())
+        self.__pending = 0
+        self.__last_sync = time.time()
+
+    def close(self):
+        """Sync any records that haven't been, and close the file."""
+        with self.__lock:
+            if self.__file.closed:
+                return
+            if self.__sync and self.__pending:
+                self.__fsync()
+            self.__file.close()
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Backend(object):
     """ Abstract base class for summary backends
@@ -165,12 +299,20 @@ class FileBackend(Backend):
                         tests. It is important for resumes that this is not
                         overlapping as the Inheriting classes assume they are
                         not. Default: 0
+    file_journal -- if truthy append the tests to a single journal file
+                    rather than writing a file for each of them. This
+                    requires far fewer filesystem operations per test.
+                    Default: False
 
     """
-    def __init__(self, dest, file_start_count=0, **kwargs):
+    def __init__(self, dest, file_start_count=0, file_journal=False,
+                 **kwargs):
         self._dest = dest
         self._counter = itertools.count(file_start_count)
         self._write_final = write_compressed
+        self._journal_mode = file_journal
+        self.__journal = None
+        self.__journal_lock = threading.Lock()
 
     __INCOMPLETE = TestResult(result=INCOMPLETE)
 
@@ -192,6 +334,30 @@ class FileBackend(Backend):
     def _file_extension(self):
         """The file extension of the backend."""
 
+    def __write_record(self, name, data):
+        """Append a test to the journal, opening it if necessary."""
+        with self.__journal_lock:
+            if self.__journal is None:
+                self.__journal = Journal(
+                    os.path.join(self._dest, 'tests', '{}.{}'.format(
+                        JOURNAL_NAME, self._file_extension)),
+                    sync=options.OPTIONS.sync)
+
+        f = six.StringIO()
+        self._write(f, name, data)
+        self.__journal.append(f.getvalue())
+
+    def _close_journal(self):
+        """Close the journal, if one was opened.
+
+        Derived classes must call this before they read the tests back in
+        finalize.
+
+        """
+        if self.__journal is not None:
+            self.__journal.close()
+            self.__journal = None
+
     @contextlib.contextmanager
     def write_test(self, name):
         """Write a test.
@@ -205,7 +371,16 @@ class FileBackend(Backend):
         long as the filesystem continues running and the result was valid in
         the original file it will be valid at the end
 
+        If the journal is being used then both the placeholder and the final
+        result are instead appended to it as records, the last record for a
+        test is the one that counts.
+
         """
+        if self._journal_mode:
+            self.__write_record(name, self.__INCOMPLETE)
+            yield lambda val: self.__write_record(name, val)
+            return
+
         def finish(val):
             tfile = file_ + '.tmp'
             with open(tfile, 'w') as f:
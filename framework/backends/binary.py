@@ -0,0 +1,296 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A compact binary results format.
+
+The results are stored as a number of sections, whose offsets and lengths are
+in a fixed size header at the start of the file:
+
+meta -- the metadata of the run as zlib compressed json, along with the
+        table of statuses used by the status column.
+names -- the test names, sorted, joined by NUL bytes and zlib compressed.
+statuses -- one byte per test, an index into the table of statuses.
+times -- the start and end time of each test, as little endian doubles.
+subtests -- zlib compressed json mapping the index of each test that has
+            subtests to its subtests.
+index -- the offset and length of each test's blob, as little endian
+         unsigned 64 bit integers.
+blobs -- the rest of each test (output, command, etc) as zlib compressed
+         json, one blob per test.
+
+Everything a summary needs is in the first five sections, which are small.
+The blobs are only read when they are needed if the results are loaded
+lazily.
+
+While tests are running the results directory is the same as the json
+backend's, so it can be resumed the same way.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import collections
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import six
+from six.moves import range, intern
+
+from framework import exceptions, results, status
+from .json import (JSONBackend, LazyTestResult, piglit_encoder, set_meta,
+                   _iter_tests)
+from .register import Registry
+
+__all__ = [
+    'REGISTRY',
+    'BinaryBackend',
+    'write_results',
+]
+
+_MAGIC = b'PIGLITBR'
+
+# The current version of the binary format
+CURRENT_BINARY_VERSION = 1
+
+_SECTIONS = ['meta', 'names', 'statuses', 'times', 'subtests', 'index',
+             'blobs']
+
+# magic, version, number of tests, and an offset and length per section
+_HEADER = struct.Struct('<8sIQ' + 'QQ' * len(_SECTIONS))
+
+# The keys of a test that are stored in the columns, the rest go in the blob
+_COLUMNS = ['result', 'time', 'subtests', '__type__']
+
+
+class _BinaryTestResult(LazyTestResult):
+    """A LazyTestResult that reads everything but the columns on use."""
+    __slots__ = []
+
+    _LAZY = dict(LazyTestResult._LAZY)  # pylint: disable=protected-access
+    _LAZY.update({
+        'exception': 'exception',
+        'pid': 'pid',
+        'returncode': 'returncode',
+    })
+
+
+class _Blobs(object):
+    """Reads the blobs of a binary results file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self, start, end):
+        """Decode the blob between offsets start and end of the file."""
+        with open(self.filename, 'rb') as f:
+            f.seek(start)
+            return _decode(f.read(end - start))
+
+
+def _encode(value):
+    return zlib.compress(
+        json.dumps(value, default=piglit_encoder).encode('utf-8'))
+
+
+def _decode(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'),
+                      object_pairs_hook=collections.OrderedDict)
+
+
+def _write(f, meta, tests):
+    """Write a binary results file.
+
+    Arguments:
+    f -- a file opened for binary writing
+    meta -- a dict of the metadata of the run. If it has no totals they are
+            counted from the tests.
+    tests -- an iterable of (name, dict) pairs for each test
+
+    """
+    statuses = [six.text_type(s) for s in status.ALL]
+    rows = []
+    totals = collections.defaultdict(results.Totals)
+
+    # The blobs are written in the order the tests come in, to a temporary
+    # file, so that only the columns have to be kept in memory until the
+    # tests have been sorted.
+    with tempfile.TemporaryFile() as blobs:
+        for name, test in tests:
+            test = results.TestResult.from_dict(test)
+            results.TestrunResult.add_totals(totals, name, test)
+
+            value = test.to_json()
+            blob = _encode({k: v for k, v in six.iteritems(value)
+                            if k not in _COLUMNS})
+            rows.append((name, statuses.index(six.text_type(test.result)),
+                         test.time.start, test.time.end,
+                         dict(test.subtests), blobs.tell(), len(blob)))
+            blobs.write(blob)
+
+        rows.sort(key=lambda r: r[0])
+        count = len(rows)
+        meta = dict(meta)
+        meta.setdefault('totals', totals)
+        sections = [
+            _encode({'metadata': meta, 'statuses': statuses}),
+            zlib.compress(b'\0'.join(r[0].encode('utf-8') for r in rows)),
+            struct.pack('<{}B'.format(count), *[r[1] for r in rows]),
+            struct.pack('<{}d'.format(count * 2),
+                        *[t for r in rows for t in r[2:4]]),
+            _encode({i: r[4] for i, r in enumerate(rows) if r[4]}),
+        ]
+
+        # The blob offsets are relative to the start of the blobs section
+        # until here, where the final position of that section is known.
+        start = _HEADER.size + sum(len(s) for s in sections) + count * 16
+        sections.append(struct.pack(
+            '<{}Q'.format(count * 2),
+            *[v for r in rows for v in (start + r[5], r[6])]))
+
+        offset = _HEADER.size
+        layout = []
+        for section in sections:
+            layout.extend([offset, len(section)])
+            offset += len(section)
+        blobs.seek(0, os.SEEK_END)
+        layout.extend([offset, blobs.tell()])
+
+        f.write(_HEADER.pack(_MAGIC, CURRENT_BINARY_VERSION, count, *layout))
+        for section in sections:
+            f.write(section)
+        blobs.seek(0)
+        shutil.copyfileobj(blobs, f)
+
+
+def write_results(results_, filename):
+    """Write a TestrunResult to filename in the binary format.
+
+    This allows results in any other format to be converted.
+
+    """
+    meta = results_.to_json()
+    tests = meta.pop('tests')
+    meta.pop('__type__', None)
+    with open(filename, 'wb') as f:
+        _write(f, meta, six.iteritems(tests))
+
+
+class BinaryBackend(JSONBackend):
+    """A backend that writes the compact binary format.
+
+    Tests are written exactly as the JSONBackend writes them while the run is
+    in progress, only the final file differs.
+
+    """
+    def finalize(self, metadata=None):
+        self._close_journal()
+        with open(os.path.join(self._dest, 'metadata.json'), 'r') as f:
+            meta = json.load(f, object_pairs_hook=collections.OrderedDict)
+        if metadata:
+            meta.update(metadata)
+
+        with open(os.path.join(self._dest, 'results.bin'), 'wb') as f:
+            _write(f, meta, _iter_tests(os.path.join(self._dest, 'tests')))
+
+        # Delete the temporary files
+        os.unlink(os.path.join(self._dest, 'metadata.json'))
+        shutil.rmtree(os.path.join(self._dest, 'tests'))
+
+
+def _read_section(f, layout, name):
+    offset, length = layout[name]
+    f.seek(offset)
+    return f.read(length)
+
+
+def load(filename, compression, lazy=False):  # pylint: disable=unused-argument
+    """Load a binary results file, and return a TestrunResult.
+
+    If lazy is truthy then only the columns are read, the rest of each test
+    is read from the file when it is used.
+
+    """
+    if os.path.isdir(filename):
+        filename = os.path.join(filename, 'results.bin')
+
+    with open(filename, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size or header[:8] != _MAGIC:
+            raise exceptions.PiglitFatalError(
+                'Not a binary results file: "{}"'.format(filename))
+
+        header = _HEADER.unpack(header)
+        if header[1] != CURRENT_BINARY_VERSION:
+            raise exceptions.PiglitFatalError(
+                'Unsupported binary results version {} in "{}"'.format(
+                    header[1], filename))
+        count = header[2]
+        layout = {s: header[3 + i * 2:5 + i * 2]
+                  for i, s in enumerate(_SECTIONS)}
+
+        meta = _decode(_read_section(f, layout, 'meta'))
+        statuses = meta['statuses']
+        meta = meta['metadata']
+        names = zlib.decompress(_read_section(f, layout, 'names'))
+        names = [intern(n.decode('utf-8')) for n in names.split(b'\0')] \
+            if count else []
+        column = struct.unpack('<{}B'.format(count),
+                               _read_section(f, layout, 'statuses'))
+        times = struct.unpack('<{}d'.format(count * 2),
+                              _read_section(f, layout, 'times'))
+        subtests = _decode(_read_section(f, layout, 'subtests'))
+        index = struct.unpack('<{}Q'.format(count * 2),
+                              _read_section(f, layout, 'index'))
+
+        tests = collections.OrderedDict()
+        blobs = _Blobs(filename)
+        for i in range(count):
+            test = {
+                'result': statuses[column[i]],
+                'time': {'start': times[i * 2], 'end': times[i * 2 + 1]},
+                'subtests': subtests.get(six.text_type(i), {}),
+            }
+            start, length = index[i * 2], index[i * 2 + 1]
+            if lazy:
+                tests[names[i]] = _BinaryTestResult.from_source(
+                    blobs, start, start + length, test)
+            else:
+                f.seek(start)
+                test.update(_decode(f.read(length)))
+                tests[names[i]] = results.TestResult.from_dict(test)
+
+    meta['tests'] = {}
+    testrun = results.TestrunResult.from_dict(meta)
+    testrun.tests = tests
+    return testrun
+
+
+REGISTRY = Registry(
+    extensions=['.bin'],
+    backend=BinaryBackend,
+    load=load,
+    meta=set_meta,
+)
@@ -0,0 +1,172 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A cache of loaded results.
+
+Decompressing and decoding a large results file takes far longer than
+unpickling the TestrunResult it produces, and the same results are often
+summarized many times. Once a results file has been loaded the TestrunResult
+is pickled into the cache, in a file named for the path, size, and
+modification time of the results, so that a results file that changes is
+never loaded from the cache.
+
+The cache is limited to [core]:results cache size megabytes in piglit.conf.
+When it grows larger than that the least recently used entries are removed.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import hashlib
+import os
+
+from framework import core
+
+__all__ = [
+    'get',
+    'put',
+]
+
+_DISABLED = bool(os.environ.get('PIGLIT_NO_RESULTS_CACHE', False))
+
+# Bump this whenever the format of the values stored in the cache changes.
+_VERSION = 1
+
+# Changes to the classes that are pickled, or to the code that loads and
+# upgrades results, can make old entries unusable or wrong, so they invalidate
+# the whole cache. Every module in this package is included, the same way
+# backends._register() finds the backends, so no loader can be forgotten.
+_MODULES = [os.path.join('..', 'results.py'), os.path.join('..', 'status.py')]
+_MODULES.extend(sorted(
+    m for m in os.listdir(os.path.dirname(os.path.abspath(__file__)))
+    if os.path.splitext(m)[1] == '.py'))
+
+_SUFFIX = '.pickle'
+
+# The default size of the cache in megabytes
+_DEFAULT_SIZE = 1024
+
+
+def _stat(path):
+    """Return the modification time and size of path, or None."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def _signature(path):
+    """Return a value which changes whenever the results at path do, or None
+    if they shouldn't be cached.
+
+    A results directory is described by the results files in it, a directory
+    without any is a run that hasn't been finalized, which is never cached.
+
+    """
+    path = os.path.realpath(path)
+    if not os.path.isdir(path):
+        stat = _stat(path)
+        return None if stat is None else (path, stat)
+
+    files = sorted(f for f in os.listdir(path) if f.startswith('results.'))
+    if not files:
+        return None
+    return (path, tuple((f, _stat(os.path.join(path, f))) for f in files))
+
+
+def _key(signature):
+    return (_VERSION, signature) + tuple(
+        _stat(os.path.join(os.path.dirname(__file__), m)) for m in _MODULES)
+
+
+def _filename(signature):
+    name = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()
+    return os.path.join(core.get_cache_dir('results'), name + _SUFFIX)
+
+
+def _limit():
+    """Return the size limit of the cache in bytes."""
+    size = core.PIGLIT_CONFIG.safe_get('core', 'results cache size')
+    try:
+        size = float(size) if size else _DEFAULT_SIZE
+    except ValueError:
+        size = _DEFAULT_SIZE
+    return int(size * 1024 * 1024)
+
+
+def _evict(limit):
+    """Remove the least recently used entries until the cache is no larger
+    than limit bytes.
+    """
+    dirname = core.get_cache_dir('results')
+    entries = []
+    for name in os.listdir(dirname):
+        if name.endswith(_SUFFIX):
+            stat = _stat(os.path.join(dirname, name))
+            if stat is not None:
+                entries.append((stat[0], stat[1], name))
+
+    total = sum(e[1] for e in entries)
+    for _, size, name in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.unlink(os.path.join(dirname, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def get(path):
+    """Return the TestrunResult cached for the results at path, or None."""
+    if _DISABLED or not _limit():
+        return None
+
+    try:
+        signature = _signature(path)
+        if signature is None:
+            return None
+        filename = _filename(signature)
+    except OSError:
+        return None
+
+    testrun = core.read_cache(filename, _key(signature))
+    if testrun is not None:
+        # The modification time of an entry is when it was last used
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+    return testrun
+
+
+def put(path, testrun):
+    """Cache a TestrunResult loaded from the results at path."""
+    limit = _limit()
+    if _DISABLED or not limit:
+        return
+
+    try:
+        signature = _signature(path)
+        if signature is None:
+            return
+        core.write_cache(_filename(signature), _key(signature), testrun)
+        _evict(limit)
+    except OSError:
+        pass
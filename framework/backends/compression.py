@@ -23,9 +23,10 @@
 This includes both compression and decompression support.
 
 This provides a low level interface of dictionaries, COMPRESSORS and
-DECOMPRESSORS, which use compression modes ('bz2', 'gz', 'xz', 'none') to
-provide open-like functions with correct mode settings for writing or reading,
-respectively.
+DECOMPRESSORS, which use compression modes ('bz2', 'gz', 'xz', 'zst', 'lz4',
+'none') to provide open-like functions with correct mode settings for writing
+or reading, respectively. zst and lz4 are only available if the zstd and lz4
+binaries are, zst compresses with a thread per CPU.
 
 They should always take unicode (str in python 3.x) objects. It is up to the
 caller to ensure that they're passing unicode and not bytes.
@@ -33,7 +34,12 @@ caller to ensure that they're passing unicode and not bytes.
 A helper, get_mode(), is provided to return the user selected mode (it will try
 the PIGLIT_COMPRESSION environment variable, then the piglit.conf
 [core]:compression key, and finally the value of compression.DEFAULT). This is
-the best way to get a compressor.
+the best way to get a compressor. The compressors use the level from
+get_level(), which is the [core]:compression level key, or the compressor's
+default if it isn't set.
+
+benchmark() measures how well and how quickly each mode compresses a results
+file, to help choose one.
 
 """
 
@@ -44,9 +50,13 @@ import bz2
 import errno
 import functools
 import gzip
+import io
 import os
+import shutil
 import subprocess
 import contextlib
+import tempfile
+import time
 
 import six
 from six.moves import cStringIO as StringIO
@@ -58,6 +68,8 @@ __all__ = [
     'UnsupportedCompressor',
     'COMPRESSORS',
     'DECOMPRESSORS',
+    'benchmark',
+    'get_level',
     'get_mode',
 ]
 
@@ -75,11 +87,26 @@ class UnsupportedCompressor(exceptions.PiglitInternalError):
 
 DEFAULT = 'bz2'
 
+
+def _leveled(func, keyword):
+    """Wrap an open-like function to pass it the level from get_level() as
+    the keyword argument keyword, if a level is set.
+    """
+    def open_(filename):
+        level = get_level()
+        if level is None:
+            return func(filename)
+        return func(filename, **{keyword: level})
+    return open_
+
+
 if six.PY2:
     COMPRESSION_SUFFIXES = ['.gz', '.bz2']
     COMPRESSORS = {
-        'bz2': functools.partial(bz2.BZ2File, mode='w'),
-        'gz': functools.partial(gzip.open, mode='w'),
+        'bz2': _leveled(functools.partial(bz2.BZ2File, mode='w'),
+                        'compresslevel'),
+        'gz': _leveled(functools.partial(gzip.open, mode='w'),
+                       'compresslevel'),
         'none': functools.partial(open, mode='w'),
     }
 
@@ -95,7 +122,8 @@ if six.PY2:
     try:
         import backports.lzma  # pylint: disable=wrong-import-position
 
-        COMPRESSORS['xz'] = functools.partial(backports.lzma.open, mode='w')
+        COMPRESSORS['xz'] = _leveled(
+            functools.partial(backports.lzma.open, mode='w'), 'preset')
         DECOMPRESSORS['xz'] = functools.partial(backports.lzma.open, mode='r')
         COMPRESSION_SUFFIXES += ['.xz']
     except ImportError:
@@ -107,7 +135,7 @@ if six.PY2:
         else:
 
             @contextlib.contextmanager
-            def _compress_xz(filename):
+            def _compress_xz(filename, level=9):
                 """Emulates an open function in write mode for xz.
 
                 Python 2.x doesn't support xz, but it's dang useful. This
@@ -129,7 +157,8 @@ if six.PY2:
                 try:
                     with open(os.devnull, 'w') as null:
                         subprocess.check_call(
-                            ['xz', '--compress', '-9', '--force', filename],
+                            ['xz', '--compress', '-{}'.format(level),
+                             '--force', filename],
                             stderr=null)
                 except OSError as e:
                     if e.errno == errno.ENOENT:
@@ -171,7 +200,7 @@ if six.PY2:
 
                 io.close()
 
-            COMPRESSORS['xz'] = _compress_xz
+            COMPRESSORS['xz'] = _leveled(_compress_xz, 'level')
             DECOMPRESSORS['xz'] = _decompress_xz
             COMPRESSION_SUFFIXES += ['.xz']
 else:
@@ -183,10 +212,12 @@ else:
     COMPRESSION_SUFFIXES = ['.gz', '.bz2', '.xz']
 
     COMPRESSORS = {
-        'bz2': functools.partial(bz2.open, mode='wt'),
-        'gz': functools.partial(gzip.open, mode='wt'),
+        'bz2': _leveled(functools.partial(bz2.open, mode='wt'),
+                        'compresslevel'),
+        'gz': _leveled(functools.partial(gzip.open, mode='wt'),
+                       'compresslevel'),
         'none': functools.partial(open, mode='w'),
-        'xz': functools.partial(lzma.open, mode='wt'),
+        'xz': _leveled(functools.partial(lzma.open, mode='wt'), 'preset'),
     }
 
     DECOMPRESSORS = {
@@ -197,6 +228,92 @@ else:
     }
 
 
+def _have_binary(binary):
+    """Return True if binary can be run."""
+    try:
+        with open(os.devnull, 'w') as d:
+            subprocess.check_call([binary, '--help'], stdout=d, stderr=d)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
+
+
+@contextlib.contextmanager
+def _compress_pipe(command, filename, level=None):
+    """Emulates an open function in write mode for a compression binary.
+
+    command is run with what is written to the file on its stdin, and must
+    write the compressed data to its stdout, which is filename.
+
+    """
+    if level is not None:
+        command = command + ['-{}'.format(level)]
+
+    with open(os.devnull, 'w') as null, open(filename, 'wb') as out:
+        try:
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                    stdout=out, stderr=null)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise exceptions.PiglitFatalError(
+                    'No {} binary available'.format(command[0]))
+            raise
+
+    f = io.TextIOWrapper(proc.stdin, encoding='utf-8') if six.PY3 \
+        else proc.stdin
+    try:
+        yield f
+    finally:
+        f.close()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise exceptions.PiglitFatalError(
+            '{} failed to compress {}'.format(command[0], filename))
+
+
+@contextlib.contextmanager
+def _decompress_pipe(command, filename):
+    """Emulates an open function in read mode for a compression binary.
+
+    command is run with filename as its stdin, and must write the
+    decompressed data to its stdout.
+
+    """
+    with open(os.devnull, 'w') as null, open(filename, 'rb') as in_:
+        try:
+            proc = subprocess.Popen(command, stdin=in_,
+                                    stdout=subprocess.PIPE, stderr=null)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise exceptions.PiglitFatalError(
+                    'No {} binary available'.format(command[0]))
+            raise
+
+    f = io.TextIOWrapper(proc.stdout, encoding='utf-8') if six.PY3 \
+        else proc.stdout
+    try:
+        yield f
+    finally:
+        # If the whole file hasn't been read closing the pipe stops the
+        # binary.
+        f.close()
+        proc.wait()
+
+
+# zstd and lz4 are much faster than the other modes, for a slightly lower
+# ratio. There are python bindings for both, but they aren't widely
+# packaged, so the binaries are used like xz is on python 2.
+for _mode, _binary, _options in [('zst', 'zstd', ['-T0']), ('lz4', 'lz4', [])]:
+    if _have_binary(_binary):
+        COMPRESSORS[_mode] = _leveled(functools.partial(
+            _compress_pipe, [_binary, '-c', '-q'] + _options), 'level')
+        DECOMPRESSORS[_mode] = functools.partial(
+            _decompress_pipe, [_binary, '-d', '-c', '-q'])
+        COMPRESSION_SUFFIXES += ['.' + _mode]
+del _mode, _binary, _options
+
+
 def get_mode():
     """Return the key value of the correct compressor to use.
 
@@ -220,3 +337,62 @@ def get_mode():
         raise UnsupportedCompressor(method)
 
     return method
+
+
+def get_level():
+    """Return the compression level to use, or None for the default.
+
+    This is the PIGLIT_CONFIG section 'core', option 'compression level'. What
+    levels are valid depends on the compressor: 1-9 for bz2 and gz, 0-9 for
+    xz, 1-19 for zst, and 1-12 for lz4.
+
+    """
+    level = PIGLIT_CONFIG.safe_get('core', 'compression level')
+    if not level:
+        return None
+
+    try:
+        return int(level)
+    except ValueError:
+        raise exceptions.PiglitFatalError(
+            'Invalid compression level "{}", it must be an integer'.format(
+                level))
+
+
+def benchmark(filename, modes=None):
+    """Compress and decompress a results file with each compression mode.
+
+    Returns a list of a tuple of the mode, the size of the compressed file,
+    and the seconds taken to compress it and to decompress it, for each mode
+    in modes (by default every mode).
+
+    Arguments:
+    filename -- the results file, which may itself be compressed
+
+    """
+    mode = os.path.splitext(filename)[1][1:]
+    with DECOMPRESSORS[mode if mode in DECOMPRESSORS else 'none'](
+            filename) as f:
+        text = f.read()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        stats = []
+        for mode in sorted(modes or COMPRESSORS):
+            path = os.path.join(tmpdir, 'results.json.' + mode)
+
+            start = time.time()
+            with COMPRESSORS[mode](path) as f:
+                f.write(text)
+            compress = time.time() - start
+
+            start = time.time()
+            with DECOMPRESSORS[mode](path) as f:
+                f.read()
+            decompress = time.time() - start
+
+            stats.append((mode, os.path.getsize(path), compress, decompress))
+            os.unlink(path)
+        return stats
+    finally:
+        shutil.rmtree(tmpdir)
@@ -27,13 +27,17 @@ import collections
 import functools
 import os
 import posixpath
+import re
 import shutil
 import sys
+import threading
 
 try:
     import simplejson as json
+    from simplejson.decoder import scanstring as _scanstring
 except ImportError:
     import json
+    from json.decoder import scanstring as _scanstring
 
 import six
 try:
@@ -43,13 +47,14 @@ except ImportError:
     _STREAMS = False
 
 from framework import status, results, exceptions, compat
-from .abstract import FileBackend, write_compressed
+from .abstract import FileBackend, read_tests, write_compressed
 from .register import Registry
 from . import compression
 
 __all__ = [
     'REGISTRY',
     'JSONBackend',
+    'LazyTestResult',
 ]
 
 # The current version of the JSON results
@@ -61,6 +66,9 @@ MINIMUM_SUPPORTED_VERSION = 7
 # The level to indent a final file
 INDENT = 4
 
+# Matches JSON insignificant whitespace
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
 
 def piglit_encoder(obj):
     """ Encoder for piglit that can transform additional classes into json
@@ -125,48 +133,22 @@ class JSONBackend(FileBackend):
         containers that are still open and closes the file
 
         """
+        self._close_journal()
         tests_dir = os.path.join(self._dest, 'tests')
-        file_list = sorted(os.listdir(tests_dir),
-                           key=lambda p: int(os.path.splitext(p)[0]))
 
-        # If jsonstreams is not present then build a complete tree of all of
-        # the data and write it with json.dump
+        # If jsonstreams is not present then use the built in stream writer,
+        # which converts and writes one test at a time.
         if not _STREAMS:
-            # Create a dictionary that is full of data to be written to a
-            # single file
-            data = collections.OrderedDict()
-
-            # Load the metadata and put it into a dictionary
+            # Load the metadata, and add any additional metadata to it
             with open(os.path.join(self._dest, 'metadata.json'), 'r') as f:
-                data.update(json.load(f))
-
-            # If there is more metadata add it the dictionary
+                data = json.load(f, object_pairs_hook=collections.OrderedDict)
             if metadata:
                 data.update(metadata)
 
-            # Add the tests to the dictionary
-            data['tests'] = collections.OrderedDict()
-
-            for test in file_list:
-                test = os.path.join(tests_dir, test)
-                if os.path.isfile(test):
-                    # Try to open the json snippets. If we fail to open a test
-                    # then throw the whole thing out. This gives us atomic
-                    # writes, the writing worked and is valid or it didn't
-                    # work.
-                    try:
-                        with open(test, 'r') as f:
-                            data['tests'].update(json.load(f))
-                    except ValueError:
-                        pass
-            assert data['tests']
-
-            data = results.TestrunResult.from_dict(data)
-
             # write out the combined file. Use the compression writer from the
             # FileBackend
             with self._write_final(os.path.join(self._dest, 'results.json')) as f:
-                json.dump(data, f, default=piglit_encoder, indent=INDENT)
+                _write_stream(f, data, _iter_tests(tests_dir))
 
         # Otherwise use jsonstreams to write the final dictionary. This uses an
         # external library, but is slightly faster and uses considerably less
@@ -186,17 +168,7 @@ class JSONBackend(FileBackend):
                         s.iterwrite(six.iteritems(metadata))
 
                     with s.subobject('tests') as t:
-                        for test in file_list:
-                            test = os.path.join(tests_dir, test)
-                            if os.path.isfile(test):
-                                try:
-                                    with open(test, 'r') as f:
-                                        a = json.load(f)
-                                except ValueError:
-                                    continue
-
-                                t.iterwrite(six.iteritems(a))
-
+                        t.iterwrite(_iter_tests(tests_dir))
 
         # Delete the temporary files
         os.unlink(os.path.join(self._dest, 'metadata.json'))
@@ -207,43 +179,507 @@ class JSONBackend(FileBackend):
         json.dump({name: data}, f, default=piglit_encoder)
 
 
-def load_results(filename, compression_):
-    """ Loader function for TestrunResult class
+def _write_stream(f, metadata, tests):
+    """Write a complete results file incrementally.
 
-    This function takes a single argument of a results file.
+    This writes the same document that dumping a TestrunResult would, but
+    only one test is ever held in memory, and the totals are counted as the
+    tests are written.
 
-    It makes quite a few assumptions, first it assumes that it has been passed
-    a folder, if that fails then it looks for a plain text json file called
-    "main"
+    Arguments:
+    f -- a file-like object to write to
+    metadata -- a dict of the values to write before the tests
+    tests -- an iterable of (name, dict) pairs for each test
+
+    """
+    def dump(value, level):
+        """Encode value to be written at level of indentation.
+
+        Newlines inside of strings are escaped by the encoder, so any
+        newline in the output is between elements.
+        """
+        text = json.dumps(value, default=piglit_encoder, indent=INDENT)
+        return text.replace('\n', '\n' + ' ' * INDENT * level)
+
+    indent = ' ' * INDENT
+    totals = collections.defaultdict(results.Totals)
+
+    f.write('{\n' + indent + '"__type__": "TestrunResult"')
+    for key, value in six.iteritems(metadata):
+        f.write(',\n{}{}: {}'.format(indent, dump(key, 1), dump(value, 1)))
+
+    f.write(',\n' + indent + '"tests": {')
+    separator = '\n'
+    for name, value in tests:
+        test = results.TestResult.from_dict(value)
+        results.TestrunResult.add_totals(totals, name, test)
+        f.write('{}{}{}: {}'.format(separator, indent * 2, dump(name, 2),
+                                    dump(test, 2)))
+        separator = ',\n'
+    assert separator != '\n', 'No tests were written'
+
+    f.write('\n{0}}},\n{0}"totals": {1}\n}}\n'.format(indent,
+                                                     dump(totals, 1)))
+
+
+def _record_name(text):
+    """Return the name of the test in a record, without decoding the rest of
+    it.
+
+    Each record is an object with a single member, the test. A ValueError is
+    raised if the record doesn't start like one.
+
+    """
+    pos = _WHITESPACE.match(text, 0).end()
+    if text[pos:pos + 1] != '{':
+        raise ValueError('Expecting object at {}'.format(pos))
+    pos = _WHITESPACE.match(text, pos + 1).end()
+    if text[pos:pos + 1] != '"':
+        raise ValueError('Expecting property name at {}'.format(pos))
+    return _scanstring(text, pos + 1)[0]
+
+
+def _iter_tests(tests_dir):
+    """Yield a (name, value) pair for each test written to a tests directory.
+
+    A test can be written more than once, when it's placeholder is in the
+    journal or when it is re-run by resume, only the last value written for
+    it is yielded. Tests that cannot be decoded are skipped. This gives us
+    atomic writes, the writing worked and is valid or it didn't work.
+
+    """
+    # Find the last record for each test first, so that only one test needs
+    # to be kept in memory at a time. Only the names are needed for that,
+    # so the records are not decoded.
+    last = {}
+    for i, text in enumerate(read_tests(tests_dir)):
+        try:
+            last[_record_name(text)] = i
+        except ValueError:
+            continue
+
+    # The earlier values of tests that were written more than once, in case
+    # the last one turns out to be invalid.
+    earlier = {}
+    for i, text in enumerate(read_tests(tests_dir)):
+        try:
+            name = _record_name(text)
+        except ValueError:
+            continue
+        try:
+            test = json.loads(text, object_pairs_hook=collections.OrderedDict)
+        except ValueError:
+            if last[name] == i and name in earlier:
+                yield name, earlier.pop(name)
+            continue
+        for name, value in six.iteritems(test):
+            if last.get(name) == i:
+                earlier.pop(name, None)
+                yield name, value
+            else:
+                earlier[name] = value
+
+
+def _scan_object(text, pos, member):
+    """Scan the members of a JSON object without decoding it as a whole.
+
+    member is called with the key of each member of the object that starts at
+    or after pos, and the offset of the member's value. It must return the
+    offset of the end of the value. Returns the offset of the end of the
+    object.
+
+    A ValueError is raised if the object is invalid.
+
+    """
+    def skip(pos):
+        return _WHITESPACE.match(text, pos).end()
+
+    def expect(pos, char, what):
+        if text[pos:pos + 1] != char:
+            raise ValueError('Expecting {} at {}'.format(what, pos))
+        return pos + 1
+
+    pos = skip(expect(skip(pos), '{', 'object'))
+    if text[pos:pos + 1] == '}':
+        return pos + 1
+
+    while True:
+        key, pos = _scanstring(text, expect(pos, '"', 'property name'))
+        pos = member(key, skip(expect(skip(pos), ':', "':' delimiter")))
+        pos = skip(pos)
+        if text[pos:pos + 1] == '}':
+            return pos + 1
+        pos = skip(expect(pos, ',', "',' delimiter"))
+
+
+class _Source(object):
+    """A results file, from which the values of tests are read again if they
+    are needed.
+
+    The file is not kept in memory. It is kept open and read forward to the
+    offsets of each value that is loaded, so loading the tests in the order
+    they are in the file only decompresses it once. Loading an earlier value
+    than the last one opens the file again.
+
+    Arguments:
+    filepath -- the path of the results file
+    compression_ -- the compression of the results file
+
+    """
+    # The most characters read at once when skipping to a value
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, filepath, compression_):
+        self.filepath = filepath
+        self.compression = compression_
+        self.__lock = threading.Lock()
+        self.__context = None
+        self.__file = None
+        self.__pos = 0
+
+    def __open(self):
+        self.close()
+        self.__context = compression.DECOMPRESSORS[self.compression](
+            self.filepath)
+        self.__file = self.__context.__enter__()
+        self.__pos = 0
+
+    def close(self):
+        """Close the file, it will be opened again if it is needed."""
+        if self.__context is not None:
+            context, self.__context, self.__file = self.__context, None, None
+            context.__exit__(None, None, None)
+
+    def load(self, start, end):
+        """Decode the value between offsets start and end of the file."""
+        with self.__lock:
+            if self.__file is None or start < self.__pos:
+                self.__open()
+            while self.__pos < start:
+                skipped = len(self.__file.read(
+                    min(start - self.__pos, self.CHUNK_SIZE)))
+                if not skipped:
+                    break
+                self.__pos += skipped
+            text = self.__file.read(end - start)
+            self.__pos += len(text)
+        return json.loads(text)
+
+
+class LazyTestResult(results.TestResult):
+    """A TestResult that decodes its output from a results file when used.
+
+    The fields that can be large (like out and err) are not kept when the
+    results are loaded, only the offsets of the test in the results file.
+    The first time one of them is used the test is decoded again to get them.
+
+    Use from_source to create instances. The source must have a load method
+    which takes the offsets and returns the test as a dict, which must have
+    at least the lazily loaded values. Subclasses can change which values are
+    lazily loaded by overriding _LAZY.
+
+    """
+    __slots__ = ['__source']
+
+    # The json keys of the fields that are loaded when used, and the slots
+    # they are stored in
+    _LAZY = {
+        'command': 'command',
+        'dmesg': 'dmesg',
+        'environment': 'environment',
+        'err': '_err',
+        'out': '_out',
+        'traceback': 'traceback',
+    }
+
+    @classmethod
+    def from_source(cls, source, start, end, dict_):
+        """Create an instance for the test at offsets start to end of source.
+
+        dict_ is the decoded test, without the values that are loaded lazily.
+
+        """
+        inst = cls.from_dict(dict_)
+        for slot in six.itervalues(cls._LAZY):
+            if hasattr(inst, slot):
+                delattr(inst, slot)
+        inst.__source = (source, start, end)
+        return inst
+
+    def __getattr__(self, name):
+        # This is only called for slots that are unset, which are the lazy
+        # ones until they are loaded.
+        if name not in six.viewvalues(self._LAZY) or self.__source is None:
+            raise AttributeError(name)
+
+        source, start, end = self.__source
+        self.__source = None
+        dict_ = source.load(start, end)
+        loaded = results.TestResult.from_dict(
+            {k: v for k, v in six.iteritems(dict_) if k in self._LAZY})
+        for slot in six.itervalues(self._LAZY):
+            # out and err are only set if they were in the file, the
+            # descriptor provides their default otherwise.
+            if hasattr(loaded, slot):
+                setattr(self, slot, getattr(loaded, slot))
+
+        return getattr(self, name)
+
+    def __reduce__(self):
+        # Pickling would otherwise include the whole results file
+        return (results.TestResult.from_dict, (self.to_json(),))
+
+
+def _load_lazy(results_file, filepath, compression_):
+    """Load a json results file, creating LazyTestResults for the tests.
+
+    The tests are decoded one at a time, and only the small values needed
+    for summaries are kept in memory. The text of the file is not kept
+    either, it will be read again if any of the other values are used.
+
+    """
+    text = results_file.read()
+    decoder = json.JSONDecoder(object_pairs_hook=collections.OrderedDict)
+    meta = collections.OrderedDict()
+    tests = collections.OrderedDict()
+
+    def test(name, start):
+        value, end = decoder.raw_decode(text, start)
+        for key in LazyTestResult._LAZY:  # pylint: disable=protected-access
+            value.pop(key, None)
+        tests[name] = (start, end, value)
+        return end
+
+    def member(key, start):
+        if key == 'tests':
+            return _scan_object(text, start, test)
+        meta[key], end = decoder.raw_decode(text, start)
+        return end
+
+    try:
+        _scan_object(text, 0, member)
+    except ValueError as e:
+        raise exceptions.PiglitFatalError(
+            'While loading json results file: "{}",\n'
+            'the following error occurred:\n{}'.format(filepath,
+                                                       six.text_type(e)))
+
+    # Updating old results needs all of every test, so there is nothing to
+    # gain from being lazy about them.
+    if meta.get('results_version') != CURRENT_JSON_VERSION:
+        meta['tests'] = collections.OrderedDict(
+            (n, decoder.decode(text[s:e])) for n, (s, e, _) in
+            six.iteritems(tests))
+        return results.TestrunResult.from_dict(_update_results(meta, filepath))
+
+    source = _Source(filepath, compression_)
+    meta['tests'] = {}
+    testrun = results.TestrunResult.from_dict(meta)
+    testrun.tests = collections.OrderedDict(
+        (n, LazyTestResult.from_source(source, s, e, v))
+        for n, (s, e, v) in six.iteritems(tests))
+    if 'totals' not in meta:
+        testrun.totals = collections.defaultdict(results.Totals)
+        testrun.calculate_group_totals()
+
+    return testrun
+
+
+def _find_results(filename, compression_):
+    """Return the path of the results file for filename.
+
+    filename may be a results file or a results directory. None is returned if
+    it is the directory of a run that has not been finalized.
 
     """
+    assert compression_ in compression.COMPRESSORS, \
+        'unsupported compression type'
+
     # This will load any file or file-like thing. That would include pipes and
     # file descriptors
     if not os.path.isdir(filename):
-        filepath = filename
+        return filename
     elif (os.path.exists(os.path.join(filename, 'metadata.json')) and
           not os.path.exists(os.path.join(
               filename, 'results.json.' + compression_))):
         # We want to hit this path only if there isn't a
         # results.json.<compressions>, since otherwise we'll continually
         # regenerate values that we don't need to.
-        return _resume(filename)
+        return None
+
+    # Look for a compressed result first, then a bare result, finally for
+    # an old main file
+    for name in ['results.json.{}'.format(compression_), 'results.json']:
+        if os.path.exists(os.path.join(filename, name)):
+            return os.path.join(filename, name)
+
+    raise exceptions.PiglitFatalError(
+        'No results found in "{}" (compression: {})'.format(
+            filename, compression_))
+
+
+class _Reader(object):
+    """Decodes the values of a JSON document as it is read from a file.
+
+    Only the part of the document that hasn't been decoded yet is kept in
+    memory.
+
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, f):
+        self.__file = f
+        self.__eof = False
+        self.text = ''
+        self.pos = 0
+
+    def __fill(self, size):
+        """Read at least size more characters, return False at EOF."""
+        chunk = self.__file.read(size)
+        if not chunk:
+            self.__eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk if self.text else chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at EOF."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.__fill(self.CHUNK_SIZE):
+                return self.text[self.pos:self.pos + 1]
+
+    def expect(self, char, what):
+        """Skip whitespace and consume char, or raise ValueError."""
+        if self.peek() != char:
+            raise ValueError('Expecting {} at {}'.format(what, self.pos))
+        self.pos += 1
+
+    def decode(self, func):
+        """Decode a value with func(text, pos), which returns the value and
+        the offset of its end.
+
+        A value that reaches the end of the text that has been read may be
+        incomplete (or a number that continues), so more is read and it is
+        decoded again.
+
+        """
+        size = self.CHUNK_SIZE
+        while True:
+            try:
+                value, end = func(self.text, self.pos)
+            except ValueError:
+                if self.__eof:
+                    raise
+            else:
+                if end < len(self.text) or self.__eof:
+                    self.pos = end
+                    return value
+
+            # Read as much again as is buffered, so that a large value isn't
+            # decoded a quadratic number of times.
+            if not self.__fill(max(size, len(self.text) - self.pos)):
+                continue
+            size *= 2
+
+    def members(self):
+        """Iterate over the keys of the members of an object.
+
+        The value of each member must be decoded before the next key is read,
+        whitespace before the value has already been skipped.
+
+        """
+        self.expect('{', 'object')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            self.expect('"', 'property name')
+            key = self.decode(_scanstring)
+            self.expect(':', "':' delimiter")
+            self.peek()
+            yield key
+            if self.peek() == '}':
+                self.pos += 1
+                return
+            self.expect(',', "',' delimiter")
+
+
+def iter_tests(filename, compression_, testrun=None):
+    """Iterate over the (name, TestResult) pairs of the tests of a run.
+
+    The results file is read and decoded a piece at a time, so only a single
+    test is in memory at once, no matter how large the results are. Results
+    of older versions can't be updated one test at a time, so they are loaded
+    in full.
+
+    If testrun is a TestrunResult it is updated with the rest of the values
+    of the run once the iterator is exhausted.
+
+    """
+    filepath = _find_results(filename, compression_)
+    if filepath is None:
+        with open(os.path.join(filename, 'metadata.json'), 'r') as f:
+            meta = json.load(f)
+        for name, value in _iter_tests(os.path.join(filename, 'tests')):
+            yield name, results.TestResult.from_dict(value)
     else:
-        # Look for a compressed result first, then a bare result, finally for
-        # an old main file
-        for name in ['results.json.{}'.format(compression_), 'results.json']:
-            if os.path.exists(os.path.join(filename, name)):
-                filepath = os.path.join(filename, name)
-                break
-        else:
-            raise exceptions.PiglitFatalError(
-                'No results found in "{}" (compression: {})'.format(
-                    filename, compression_))
+        meta = collections.OrderedDict()
+        decoder = json.JSONDecoder(object_pairs_hook=collections.OrderedDict)
+        with compression.DECOMPRESSORS[compression_](filepath) as f:
+            reader = _Reader(f)
+            try:
+                for key in reader.members():
+                    if key != 'tests':
+                        meta[key] = reader.decode(decoder.raw_decode)
+                        continue
+                    if meta.get('results_version') != CURRENT_JSON_VERSION:
+                        meta = None
+                        break
+                    for name in reader.members():
+                        yield name, results.TestResult.from_dict(
+                            reader.decode(decoder.raw_decode))
+            except ValueError as e:
+                raise exceptions.PiglitFatalError(
+                    'While loading json results file: "{}",\n'
+                    'the following error occurred:\n{}'.format(
+                        filepath, six.text_type(e)))
+
+    if meta is None:
+        # This is an old (or unversioned) results file
+        loaded = load_results(filename, compression_)
+        for each in six.iteritems(loaded.tests):
+            yield each
+    else:
+        meta['tests'] = {}
+        loaded = results.TestrunResult.from_dict(meta)
 
-    assert compression_ in compression.COMPRESSORS, \
-        'unsupported compression type'
+    if testrun is not None:
+        testrun.update_metadata(loaded)
+
+
+def load_results(filename, compression_, lazy=False):
+    """ Loader function for TestrunResult class
+
+    This function takes a single argument of a results file.
+
+    It makes quite a few assumptions, first it assumes that it has been passed
+    a folder, if that fails then it looks for a plain text json file called
+    "main"
+
+    If lazy is truthy then the tests are LazyTestResult instances, which only
+    decode the values that are used.
+
+    """
+    filepath = _find_results(filename, compression_)
+    if filepath is None:
+        return _resume(filename)
 
     with compression.DECOMPRESSORS[compression_](filepath) as f:
+        if lazy:
+            return _load_lazy(f, filepath, compression_)
         testrun = _load(f)
 
     return results.TestrunResult.from_dict(_update_results(testrun, filepath))
@@ -288,16 +724,7 @@ def _resume(results_dir):
     meta['tests'] = collections.OrderedDict()
 
     # Load all of the test names and added them to the test list
-    tests_dir = os.path.join(results_dir, 'tests')
-    file_list = sorted(os.listdir(tests_dir),
-                       key=lambda p: int(os.path.splitext(p)[0]))
-
-    for file_ in file_list:
-        with open(os.path.join(tests_dir, file_), 'r') as f:
-            try:
-                meta['tests'].update(json.load(f))
-            except ValueError:
-                continue
+    meta['tests'].update(_iter_tests(os.path.join(results_dir, 'tests')))
 
     return results.TestrunResult.from_dict(meta)
 
@@ -405,4 +832,5 @@ REGISTRY = Registry(
     backend=JSONBackend,
     load=load_results,
     meta=set_meta,
+    iter_tests=iter_tests,
 )
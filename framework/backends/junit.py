@@ -23,6 +23,7 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import collections
 import os.path
 import shutil
 try:
@@ -38,7 +39,7 @@ import six
 
 from framework import grouptools, results, exceptions
 from framework.core import PIGLIT_CONFIG
-from .abstract import FileBackend
+from .abstract import FileBackend, read_tests
 from .register import Registry
 
 __all__ = [
@@ -318,16 +319,20 @@ class JUnitBackend(FileBackend):
         root = etree.Element('testsuites')
         piglit = etree.Element('testsuite', name='piglit')
         root.append(piglit)
-        for each in os.listdir(os.path.join(self._dest, 'tests')):
-            with open(os.path.join(self._dest, 'tests', each), 'r') as f:
-                # parse returns an element tree, and that's not what we want,
-                # we want the first (and only) Element node
-                # If the element cannot be properly parsed then consider it a
-                # failed transaction and ignore it.
-                try:
-                    piglit.append(etree.parse(f).getroot())
-                except etree.ParseError:
-                    continue
+        self._close_journal()
+
+        # A test may have been written more than once if the journal was
+        # used, the last element written for it replaces any earlier ones.
+        elements = collections.OrderedDict()
+        for each in read_tests(os.path.join(self._dest, 'tests')):
+            # If the element cannot be properly parsed then consider it a
+            # failed transaction and ignore it.
+            try:
+                element = etree.fromstring(each)
+            except etree.ParseError:
+                continue
+            elements[(element.get('classname'), element.get('name'))] = element
+        piglit.extend(elements.values())
 
         # set the test count by counting the number of tests.
         # This must be unicode (py3 str)
@@ -425,7 +430,7 @@ def _load(results_file):
     return run_result
 
 
-def load(results_dir, compression):  # pylint: disable=unused-argument
+def load(results_dir, compression, lazy=False):  # pylint: disable=unused-argument
     """Searches for a results file and returns a TestrunResult.
 
     wraps _load and searches for the result file.
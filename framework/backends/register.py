@@ -27,5 +27,8 @@ import collections
 
 Registry = collections.namedtuple(
     'Registry',
-    ['extensions', 'backend', 'load', 'meta']
+    ['extensions', 'backend', 'load', 'meta', 'iter_tests']
 )
+
+# iter_tests is optional, backends without it are loaded in full instead
+Registry.__new__.__defaults__ = (None, )
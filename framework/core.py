@@ -30,9 +30,14 @@ from __future__ import (
 )
 import errno
 import os
+import stat
 import subprocess
+import sys
+import tempfile
+import warnings
 
 from six.moves import configparser
+from six.moves import cPickle as pickle
 
 from framework import exceptions
 
@@ -41,7 +46,10 @@ __all__ = [
     'PLATFORMS',
     'PiglitConfig',
     'collect_system_info',
+    'get_cache_dir',
     'parse_listfile',
+    'read_cache',
+    'write_cache',
 ]
 
 PLATFORMS = ["glx", "x11_egl", "wayland", "gbm", "mixed_glx_egl"]
@@ -159,6 +167,119 @@ def check_dir(dirname, failifexists=False, handler=None):
             raise
 
 
+def _private_dir(dirname):
+    """Create a directory only the current user can use, if it doesn't exist.
+
+    Raises an OSError if the directory is owned by another user, or can be
+    written by other users. The caches are unpickled, and unpickling a file
+    planted by someone else could run any code they like.
+
+    """
+    try:
+        os.mkdir(dirname, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+    # There are no owners or modes to check on Windows
+    if hasattr(os, 'getuid'):
+        stat_ = os.stat(dirname)
+        if stat_.st_uid != os.getuid() or \
+                stat_.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise OSError(errno.EPERM,
+                          'The cache directory is not private to this user',
+                          dirname)
+
+
+def get_cache_dir(*subdirs):
+    """Return the path to a directory for piglit's on-disk caches.
+
+    The root of the cache is [core]:cache dir from piglit.conf if it is set,
+    otherwise it is $XDG_CACHE_HOME/piglit, or ~/.cache/piglit. Any subdirs
+    passed are joined onto the root, and the directories are created if they
+    don't exist.
+
+    Raises an OSError if any of the directories is owned by another user or
+    can be written by other users, these are not used.
+
+    """
+    root = PIGLIT_CONFIG.safe_get('core', 'cache dir') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or
+        os.path.join(os.path.expanduser('~'), '.cache'), 'piglit')
+    root = os.path.abspath(root)
+    check_dir(os.path.dirname(root))
+
+    dirname = root
+    try:
+        _private_dir(dirname)
+        for each in subdirs:
+            dirname = os.path.join(dirname, each)
+            _private_dir(dirname)
+    except OSError as e:
+        if e.errno == errno.EPERM:
+            warnings.warn('Not using the cache in {}: {}'.format(
+                dirname, e.strerror), RuntimeWarning)
+        raise
+    return dirname
+
+
+def read_cache(filename, key):
+    """Read a value written by write_cache.
+
+    Returns None if the file is missing, unreadable, or was written with a
+    different key.
+
+    Arguments:
+    filename -- the path to the cache file, or None if there is no cache
+    key -- the key the value must have been written with
+    """
+    if filename is None:
+        return None
+
+    try:
+        with open(filename, 'rb') as f:
+            cached_key, value = pickle.load(f)
+    except Exception:  # pylint: disable=broad-except
+        # Anything can go wrong unpickling a file that is corrupt or was
+        # written by a different version of piglit, and in every case the
+        # right thing to do is to ignore it and rebuild it.
+        return None
+
+    if cached_key != key:
+        return None
+    return value
+
+
+def write_cache(filename, key, value):
+    """Atomically pickle a key and value to filename.
+
+    Caches are only an optimization, so failures (including values that cannot
+    be pickled) are silently ignored.
+
+    Arguments:
+    filename -- the path to the cache file, or None if there is no cache
+    key -- a picklable value that read_cache will compare against
+    value -- the value to cache
+    """
+    if filename is None:
+        return
+
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename))
+    except (OSError, IOError):
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((key, value), f, pickle.HIGHEST_PROTOCOL)
+        if sys.platform == 'win32' and os.path.exists(filename):
+            os.unlink(filename)
+        os.rename(tmp, filename)
+    except (pickle.PicklingError, TypeError, AttributeError, OSError,
+            IOError):
+        os.unlink(tmp)
+
+
 def collect_system_info():
     """ Get relavent information about the system running piglit
 
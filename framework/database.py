@@ -0,0 +1,237 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A database of the results of many runs.
+
+Results are stored in an SQLite database, with a table of runs, a table of
+the tests of each run, and a table of the subtests of each test. The tests and
+subtests are indexed by name and status, so that the history of a test across
+every run can be found without loading any results files.
+
+Each test's row has its full json representation, so that a run can be loaded
+back into a TestrunResult for the summaries.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import collections
+import sqlite3
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import six
+
+from framework import exceptions, grouptools, results, status
+from framework.backends.json import piglit_encoder
+
+__all__ = [
+    'ResultsDB',
+]
+
+# Bump this whenever the schema changes.
+_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    time_start REAL NOT NULL,
+    metadata TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tests (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    result TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run, name)
+);
+
+CREATE TABLE IF NOT EXISTS subtests (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    test TEXT NOT NULL,
+    name TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (run, name)
+);
+
+CREATE INDEX IF NOT EXISTS tests_name ON tests (name);
+CREATE INDEX IF NOT EXISTS tests_result ON tests (result);
+CREATE INDEX IF NOT EXISTS subtests_name ON subtests (name);
+CREATE INDEX IF NOT EXISTS subtests_result ON subtests (result);
+"""
+
+
+class ResultsDB(object):
+    """A database of the results of many runs.
+
+    Runs are ordered by the time they were started, and are identified by
+    their name, which must be unique.
+
+    Arguments:
+    filename -- the path to the database, it is created if it doesn't exist
+
+    """
+    def __init__(self, filename):
+        self.__conn = sqlite3.connect(filename)
+        self.__conn.execute('PRAGMA foreign_keys = ON')
+
+        version = self.__conn.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            with self.__conn:
+                self.__conn.executescript(_SCHEMA)
+                self.__conn.execute(
+                    'PRAGMA user_version = {}'.format(_VERSION))
+        elif version != _VERSION:
+            raise exceptions.PiglitFatalError(
+                'Unsupported results database version {} in "{}"'.format(
+                    version, filename))
+
+    def close(self):
+        """Close the database."""
+        self.__conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, name):
+        return self.__conn.execute(
+            'SELECT 1 FROM runs WHERE name = ?', (name, )).fetchone() is not None
+
+    def add(self, testrun, name=None, replace=False):
+        """Add a TestrunResult to the database.
+
+        Arguments:
+        testrun -- a TestrunResult instance
+
+        Keyword Arguments:
+        name -- the name to store the run as. Default: the name of the run
+        replace -- If True a run of the same name is replaced, otherwise a
+                   PiglitFatalError is raised. Default: False
+
+        """
+        name = name or testrun.name
+        if name is None:
+            raise exceptions.PiglitFatalError(
+                'Results without a name must be given one to be added to '
+                'the database')
+
+        meta = testrun.to_json()
+        tests = meta.pop('tests')
+        meta.pop('__type__', None)
+        meta['name'] = name
+
+        with self.__conn:
+            if name in self:
+                if not replace:
+                    raise exceptions.PiglitFatalError(
+                        'A run named "{}" is already in the database'.format(
+                            name))
+                self.__conn.execute('DELETE FROM runs WHERE name = ?',
+                                    (name, ))
+
+            cursor = self.__conn.execute(
+                'INSERT INTO runs (name, time_start, metadata) '
+                'VALUES (?, ?, ?)',
+                (name, testrun.time_elapsed.start,
+                 json.dumps(meta, default=piglit_encoder)))
+            run = cursor.lastrowid
+
+            self.__conn.executemany(
+                'INSERT INTO tests (run, name, result, data) '
+                'VALUES (?, ?, ?, ?)',
+                ((run, n, six.text_type(t['result']),
+                  json.dumps(t, default=piglit_encoder))
+                 for n, t in six.iteritems(tests)))
+            self.__conn.executemany(
+                'INSERT INTO subtests (run, test, name, result) '
+                'VALUES (?, ?, ?, ?)',
+                ((run, n, grouptools.join(n, s), six.text_type(r))
+                 for n, t in six.iteritems(testrun.tests)
+                 for s, r in six.iteritems(t.subtests)))
+
+    def remove(self, name):
+        """Remove a run from the database.
+
+        Raises a KeyError if there is no such run.
+
+        """
+        with self.__conn:
+            cursor = self.__conn.execute('DELETE FROM runs WHERE name = ?',
+                                         (name, ))
+        if not cursor.rowcount:
+            raise KeyError(name)
+
+    def runs(self):
+        """Return a list of the names of the runs, oldest first."""
+        return [r[0] for r in self.__conn.execute(
+            'SELECT name FROM runs ORDER BY time_start, id')]
+
+    def history(self, name):
+        """Return the status of a test or subtest in every run.
+
+        Returns a list of (run name, status) tuples, oldest run first. The
+        status is None in runs that don't have the test. Like
+        TestrunResult.get_result a test shadows a subtest of the same name.
+
+        """
+        found = {}
+        for run, result in self.__conn.execute(
+                'SELECT run, result FROM subtests WHERE name = ?', (name, )):
+            found[run] = status.status_lookup(result)
+        for run, result in self.__conn.execute(
+                'SELECT run, result FROM tests WHERE name = ?', (name, )):
+            found[run] = status.status_lookup(result)
+
+        return [(n, found.get(i)) for i, n in self.__conn.execute(
+            'SELECT id, name FROM runs ORDER BY time_start, id')]
+
+    def first(self, name, statuses):
+        """Return the name of the oldest run in which a test or subtest had one
+        of statuses, or None.
+        """
+        statuses = frozenset(status.status_lookup(s) for s in statuses)
+        for run, result in self.history(name):
+            if result is not None and result in statuses:
+                return run
+        return None
+
+    def load(self, name):
+        """Load a run into a TestrunResult.
+
+        Raises a KeyError if there is no such run.
+
+        """
+        row = self.__conn.execute(
+            'SELECT id, metadata FROM runs WHERE name = ?', (name, )).fetchone()
+        if row is None:
+            raise KeyError(name)
+
+        meta = json.loads(row[1])
+        meta['tests'] = collections.OrderedDict(
+            (n, json.loads(d)) for n, d in self.__conn.execute(
+                'SELECT name, data FROM tests WHERE run = ? ORDER BY rowid',
+                (row[0], )))
+        return results.TestrunResult.from_dict(meta)
@@ -21,9 +21,10 @@
 
 """ Module implementing classes for reading posix dmesg
 
-Currently this module only has the default DummyDmesg, and a LinuxDmesg.
-The method used on Linux requires that timetamps are enabled, and no other
-posix system has timestamps.
+Currently this module only has the default DummyDmesg, a KmsgDmesg, and a
+LinuxDmesg. On Linux KmsgDmesg is used when /dev/kmsg can be read, otherwise
+LinuxDmesg, which calls dmesg, and requires that timetamps are enabled. No
+other posix system has timestamps.
 
 On OSX and *BSD one would likely want to implement a system that reads the
 sysloger, since timestamps can be added by the sysloger, and are not inserted
@@ -39,10 +40,15 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 import abc
+import collections
+import errno
 import gzip
+import os
 import re
 import subprocess
 import sys
+import threading
+import time
 import warnings
 
 import six
@@ -52,6 +58,7 @@ from framework import exceptions
 __all__ = [
     'BaseDmesg',
     'DummyDmesg',
+    'KmsgDmesg',
     'LinuxDmesg',
     'get_dmesg',
 ]
@@ -72,9 +79,15 @@ class BaseDmesg(object):
     This class is not thread safe, because it does not black between the start
     of the test and the reading of dmesg, which means that if two tests run at
     the same time, and test A creates an entri in dmesg, but test B finishes
-    first, test B will be marked as having the dmesg error.
+    first, test B will be marked as having the dmesg error. Subclasses that
+    can tell when each message was logged (see KmsgDmesg) override _messages()
+    to avoid this, and set concurrent to True.
 
     """
+    # True if messages are matched to the right test when tests are run
+    # concurrently
+    concurrent = False
+
     @abc.abstractmethod
     def __init__(self):
         # A list containing all messages since the last time dmesg was read.
@@ -126,15 +139,14 @@ class BaseDmesg(object):
                 "fail": "dmesg-fail"
             }.get(res, res)
 
-        # Get a new snapshot of dmesg
-        self.update_dmesg()
+        messages = self._messages(result)
 
-        # if update_dmesg() found new entries replace the results of the test
-        # and subtests
-        if self._new_messages:
+        # if there are new entries replace the results of the test and
+        # subtests
+        if messages:
 
             if self.regex:
-                for line in self._new_messages:
+                for line in messages:
                     if self.regex.search(line):
                         break
                 else:
@@ -147,14 +159,158 @@ class BaseDmesg(object):
                 result.subtests[key] = replace(value)
 
             # Add the dmesg values to the result
-            result.dmesg = "\n".join(self._new_messages)
+            result.dmesg = "\n".join(messages)
 
         return result
 
+    def _messages(self, result):
+        """Return the messages that belong to a test.
+
+        By default this reads dmesg, and returns every message since the last
+        time it was read.
+
+        Arguments:
+        result -- the TestResult of the test
+
+        """
+        # Get a new snapshot of dmesg
+        self.update_dmesg()
+        return self._new_messages
+
     def __repr__(self):
         return 'BaseDmesg()'
 
 
+def _monotonic():
+    """Return the time of the clock used for kernel message timestamps."""
+    try:
+        return time.clock_gettime(time.CLOCK_MONOTONIC)
+    except AttributeError:
+        # Python 2 doesn't have clock_gettime, the uptime is close enough.
+        with open('/proc/uptime', 'r') as f:
+            return float(f.read().split()[0])
+
+
+class KmsgDmesg(BaseDmesg):
+    """ Read dmesg on Linux from /dev/kmsg
+
+    /dev/kmsg is kept open, and each read of it returns the next record of
+    the kernel log, so reading it only costs as much as the number of new
+    records, and doesn't need a new process. Each record has a sequence
+    number, and a timestamp, which is used to find the messages that were
+    logged while a test was running. This makes it possible to attribute
+    messages to the right test even when tests are run concurrently, as long
+    as the tests that overlap in time are not confused with each other.
+
+    When tests are not run concurrently (serial is True, the default) the
+    messages read between the start and the end of a test are given to it,
+    like LinuxDmesg does, whatever their timestamp says.
+
+    A OSError or IOError is raised if /dev/kmsg cannot be opened.
+
+    """
+    KMSG = '/dev/kmsg'
+    concurrent = True
+
+    # The number of records to remember, which is roughly as many as fit in
+    # the kernel's own ring buffer.
+    RECORDS = 16384
+
+    # The lowest priority that is recorded, notice. This matches the levels
+    # LinuxDmesg passes to dmesg.
+    LEVEL = 5
+
+    def __init__(self):
+        """ Create a dmesg instance """
+        self._fd = os.open(self.KMSG, os.O_RDONLY | os.O_NONBLOCK)
+        # Skip the records that are already in the buffer, only messages
+        # logged from now on are interesting.
+        os.lseek(self._fd, 0, os.SEEK_END)
+
+        self._lock = threading.Lock()
+        self._seq = -1
+        self._records = collections.deque(maxlen=self.RECORDS)
+        # Set this to False when tests are run concurrently
+        self.serial = True
+        super(KmsgDmesg, self).__init__()
+
+    def __del__(self):
+        fd = getattr(self, '_fd', None)
+        if fd is not None:
+            os.close(fd)
+
+    def _read(self):
+        """Return the next record, or None if there isn't one."""
+        while True:
+            try:
+                return os.read(self._fd, 8192)
+            except OSError as e:
+                # EPIPE means that records were overwritten before they were
+                # read, the next read returns the oldest record left.
+                if e.errno == errno.EPIPE:
+                    continue
+                elif e.errno == errno.EAGAIN:
+                    return None
+                raise
+
+    def update_dmesg(self):
+        """ Read the records added to /dev/kmsg since the last read
+
+        Each record is stored with its time (as returned by time.time()), and
+        self._new_messages is set to the new messages.
+
+        """
+        new = []
+        with self._lock:
+            # The kernel timestamps records with the monotonic clock, which
+            # needs to be converted to the same clock as the test times.
+            offset = time.time() - _monotonic()
+
+            while True:
+                record = self._read()
+                if not record:
+                    break
+
+                # A record is "priority,sequence,timestamp,flags;message",
+                # followed by optional lines of "KEY=value" pairs.
+                header, _, message = record.partition(b';')
+                fields = header.split(b',')
+                seq = int(fields[1])
+                if seq <= self._seq:
+                    continue
+                self._seq = seq
+                if int(fields[0]) & 7 > self.LEVEL:
+                    continue
+
+                stamp = int(fields[2])
+                message = '[{:5d}.{:06d}] {}'.format(
+                    stamp // 1000000, stamp % 1000000,
+                    message.split(b'\n', 1)[0].decode('utf-8', 'replace'))
+                self._records.append((stamp / 1000000 + offset, message))
+                new.append(message)
+
+        self._new_messages = new
+
+    def _messages(self, result):
+        """Return the messages logged while the test was running."""
+        if self.serial:
+            return super(KmsgDmesg, self)._messages(result)
+        self.update_dmesg()
+
+        messages = []
+        with self._lock:
+            for stamp, message in reversed(self._records):
+                if stamp < result.time.start:
+                    break
+                elif stamp <= result.time.end:
+                    messages.append(message)
+        messages.reverse()
+        return messages
+
+    def __repr__(self):
+        return 'KmsgDmesg()'
+
+
 class LinuxDmesg(BaseDmesg):
     """ Read dmesg on posix systems
 
@@ -236,6 +392,7 @@ class DummyDmesg(BaseDmesg):
 
     """
     DMESG_COMMAND = []
+    concurrent = True
 
     def __init__(self):
         pass
@@ -259,7 +416,13 @@ def get_dmesg(not_dummy=True):
     your system. However, if Dummy is True then it will always return a
     DummyDmesg instance.
 
+    On Linux a KmsgDmesg is returned if /dev/kmsg can be read, otherwise a
+    LinuxDmesg.
+
     """
     if sys.platform.startswith('linux') and not_dummy:
-        return LinuxDmesg()
+        try:
+            return KmsgDmesg()
+        except (OSError, IOError):
+            return LinuxDmesg()
     return DummyDmesg()
@@ -29,15 +29,25 @@ monitored-errors.
 When one of the regex is found in the corresponding source Piglit will abort
 with code 3.
 
+While tests are running the sources are also read from a background thread,
+and the errors found are remembered with the time they were found, so that
+they can be matched to the tests that were running at the time, even when
+many tests are run concurrently.
+
 """
 
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 import abc
+import collections
 import errno
 import os
 import re
+import select
+import sys
+import threading
+import time
 
 import six
 
@@ -70,19 +80,52 @@ class Monitoring(object):
     _abort_error = None
     _monitoring_rules = None
 
+    # The number of errors remembered for errors()
+    ERRORS = 1024
+
+    # How often the background thread reads the sources, in seconds
+    INTERVAL = 0.5
+
     def __init__(self, monitoring_enabled):
         """Create a LinuxMonitored instance"""
         # Get the monitoring rules from piglit.conf and store them into a dict.
         self._monitoring_rules = {}
 
+        # Each error is stored as (after, before, rule key, message), where
+        # the message was logged between the times after and before.
+        self._errors = collections.deque(maxlen=self.ERRORS)
+        self._last_update = time.time()
+        # The window of the error that caused the abort
+        self._abort_window = None
+        # The tests that have been checked, as (start, end, name)
+        self._tests = collections.deque(maxlen=self.ERRORS)
+        self._init_thread()
+
         if monitoring_enabled and PIGLIT_CONFIG.has_section('monitored-errors'):
             for key, _ in PIGLIT_CONFIG.items('monitored-errors'):
                 if PIGLIT_CONFIG.has_section(key):
                     type = PIGLIT_CONFIG.required_get(key, 'type')
                     regex = PIGLIT_CONFIG.required_get(key, 'regex')
                     parameters = PIGLIT_CONFIG.required_get(key, 'parameters')
+                    inotify = PIGLIT_CONFIG.safe_get(key, 'inotify', 'false')
+
+                    self.add_rule(key, type, parameters, regex,
+                                  inotify.lower() in ('1', 'true', 'yes'))
+
+    def _init_thread(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ['_lock', '_stop', '_thread']:
+            del state[name]
+        return state
 
-                    self.add_rule(key, type, parameters, regex)
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_thread()
 
     @property
     def abort_needed(self):
@@ -91,10 +134,19 @@ class Monitoring(object):
 
     @property
     def error_message(self):
-        """Simply return _abort_error message"""
+        """Return _abort_error message, and the tests that caused it"""
+        if self._abort_error is None:
+            return None
+        after, before = self._abort_window
+        with self._lock:
+            tests = [n for start, end, n in self._tests
+                     if start <= before and end >= after]
+        if tests:
+            return "{}\nWhile running: {}".format(self._abort_error,
+                                                  ", ".join(tests))
         return self._abort_error
 
-    def add_rule(self, key, type, parameters, regex):
+    def add_rule(self, key, type, parameters, regex, inotify=False):
         """Add a new monitoring rule
 
         This method adds a new monitoring rule. The type must be file,
@@ -107,15 +159,19 @@ class Monitoring(object):
                       options
         regex -- The rule regex
 
+        Keyword Arguments:
+        inotify -- Use inotify to watch files for changes, see
+                   MonitoringFile. Default: False
+
         """
         rule = None
 
         if type == 'file':
             rule = MonitoringFile(parameters,
-                                  regex)
+                                  regex, inotify=inotify)
         elif type == 'locked_file':
             rule = MonitoringFile(parameters,
-                                  regex, True)
+                                  regex, True, inotify)
         elif type == 'dmesg':
             rule = MonitoringLinuxDmesg(parameters,
                                         regex)
@@ -135,33 +191,119 @@ class Monitoring(object):
         self._monitoring_rules.pop(key, None)
 
     def update_monitoring(self):
-        """Update the new messages for each monitoring object"""
-        if self._monitoring_rules:
-            for monitoring_rule in six.itervalues(self._monitoring_rules):
+        """Update the new messages for each monitoring object
+
+        Every new message that matches the pattern of its rule is remembered
+        (see errors()), and the first one sets the abort_needed state.
+
+        """
+        if not self._monitoring_rules:
+            return
+
+        with self._lock:
+            now = time.time()
+            for rule_key, monitoring_rule in six.iteritems(
+                    self._monitoring_rules):
                 monitoring_rule.update_monitoring()
+                for line in monitoring_rule.errors():
+                    self._errors.append(
+                        (self._last_update, now, rule_key, line))
+                    # if error message is not empty, abort is requested
+                    if not self.abort_needed:
+                        self._abort_error = "From the rule {}:\n{}".format(
+                            rule_key, line)
+                        self._abort_window = (self._last_update, now)
+            self._last_update = now
+
+    def errors(self, start, end):
+        """Return the errors that may have been logged between two times
+
+        Returns a list of (rule key, message) tuples, for the errors that
+        were logged between start and end, which are times as returned by
+        time.time(), like the start and end of a TestResult's time.
 
-    def check_monitoring(self):
+        """
+        with self._lock:
+            return [(k, m) for after, before, k, m in self._errors
+                    if after <= end and before >= start]
+
+    def check_monitoring(self, result=None, name=None):
         """Check monitoring objects statue
 
         This method checks the state for each monitoring object.
         If one of them found the pattern in the new messages,
         set itself on abort_needed state.
 
+        While the background thread is running (see start()) this doesn't
+        read the sources, it only looks at the errors found so far. The
+        thread reads them, and so does profile.run() before deciding whether
+        to start another test.
+
+        Keyword Arguments:
+        result -- A TestResult. If given the errors logged while the test was
+                  running are returned, see errors(). Default: None
+        name -- The name of the test the result is for. If the error that
+                causes the abort was logged while the test was running, it
+                is added to the error_message. Default: None
+
         """
-        # Get a new snapshot of the source
-        self.update_monitoring()
+        if self._thread is None:
+            # Get a new snapshot of the source
+            self.update_monitoring()
 
-        if self._monitoring_rules:
-            for rule_key, monitoring_rule in six.iteritems(
-                    self._monitoring_rules):
-                # Get error message
-                self._abort_error = monitoring_rule.check_monitoring()
-                # if error message is not empty, abort is requested
-                if self.abort_needed:
-                    self._abort_error = "From the rule {}:\n{}".format(
-                        rule_key,
-                        self._abort_error)
-                    break
+        if result is None:
+            return []
+        if name is not None:
+            with self._lock:
+                self._tests.append(
+                    (result.time.start, result.time.end, name))
+        return self.errors(result.time.start, result.time.end)
+
+    def start(self):
+        """Start reading the sources from a background thread
+
+        This does nothing if there are no rules, or the thread is already
+        running.
+
+        """
+        if self._monitoring_rules and self._thread is None:
+            # Only what is logged from now on is new.
+            self.update_monitoring()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread started by start()"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _wait(self):
+        """Wait for INTERVAL, or until a source watched with inotify changes.
+
+        Return True if the thread should stop.
+
+        """
+        with self._lock:
+            fds = [r.fileno() for r in six.itervalues(self._monitoring_rules)]
+        fds = [fd for fd in fds if fd is not None]
+        if fds:
+            try:
+                select.select(fds, [], [], self.INTERVAL)
+                return self._stop.is_set()
+            except (select.error, OSError, ValueError):
+                # A file was reopened while waiting for it.
+                pass
+        return self._stop.wait(self.INTERVAL)
+
+    def _run(self):
+        while not self._wait():
+            self.update_monitoring()
+            if self.abort_needed:
+                break
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -204,6 +346,19 @@ class BaseMonitoring(object):
         """
         pass
 
+    def fileno(self):
+        """Return a file descriptor which is readable when the source has
+        changed, or None if there isn't one.
+        """
+        return None
+
+    def errors(self):
+        """Return the new messages which match the regex"""
+        if self._new_messages and self._monitoring_regex:
+            return [l for l in self._new_messages
+                    if self._monitoring_regex.search(l)]
+        return []
+
     def check_monitoring(self):
         """Check _new_messages
 
@@ -212,87 +367,252 @@ class BaseMonitoring(object):
         the matched line
 
         """
-        if self._new_messages and self._monitoring_regex:
-            for line in self._new_messages:
-                if self._monitoring_regex.search(line):
-                    return line
+        for line in self.errors():
+            return line
 
 
 if os.name == 'posix':
+    import ctypes
+    import ctypes.util
     import fcntl
+    import stat
+    import struct
+
+
+    class _Inotify(object):
+        """Watch a file for changes with inotify
+
+        This is used to avoid even stat()ing a file that hasn't changed.
+        Once the file has been moved or deleted changed() always returns True,
+        since the file at the path is no longer the one being watched.
+
+        A OSError is raised if inotify isn't available.
+
+        Arguments:
+        path -- the file to watch
+
+        """
+        # IN_MODIFY | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+        MASK = 0x2 | 0x4 | 0x400 | 0x800
+        # IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+        GONE = 0x400 | 0x800 | 0x8000
+        EVENT = struct.Struct(str('iIII'))
+
+        _libc = None
+
+        def __init__(self, path):
+            if _Inotify._libc is None:
+                name = ctypes.util.find_library('c')
+                if name is None:
+                    raise OSError(errno.ENOSYS, 'libc was not found')
+                _Inotify._libc = ctypes.CDLL(name, use_errno=True)
+                if not hasattr(_Inotify._libc, 'inotify_init1'):
+                    raise OSError(errno.ENOSYS, 'inotify is not available')
+
+            self._fd = self._check(self._libc.inotify_init1(
+                os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0)))
+            self._gone = False
+            try:
+                self._check(self._libc.inotify_add_watch(
+                    self._fd, path.encode(sys.getfilesystemencoding())
+                    if isinstance(path, six.text_type) else path,
+                    self.MASK))
+            except OSError:
+                self.close()
+                raise
+
+        @staticmethod
+        def _check(ret):
+            if ret < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            return ret
+
+        def fileno(self):
+            return self._fd
+
+        def changed(self):
+            """Return True if the file may have changed since the last call.
+            """
+            changed = self._gone
+            while True:
+                try:
+                    data = os.read(self._fd, 4096)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        break
+                    raise
+                changed = True
+                offset = 0
+                while offset < len(data):
+                    _, mask, _, length = self.EVENT.unpack_from(data, offset)
+                    offset += self.EVENT.size + length
+                    if mask & self.GONE:
+                        self._gone = True
+            return changed
+
+        def close(self):
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+        def __del__(self):
+            self.close()
 
 
     class MonitoringFile(BaseMonitoring):
         """Monitoring from a file
 
         This class is for monitoring the system from a file that
-        can be a standard file or a locked file. The locked file
-        algorithm uses fnctl, so it doesn't work on non Unix systems
+        can be a standard file or a locked file. Locked files (like
+        /dev/kmsg) are read without blocking, so it doesn't work on non Unix
+        systems.
+
+        The file is kept open, and only the data added since the last update
+        is read. Like tail -F, a file that is replaced (it has a new inode)
+        is reopened. To notice a file that has been truncated or rewritten
+        the last few bytes that were read are read again, if they have
+        changed the whole file is read again. A line that hasn't been
+        terminated yet is kept until it has been, or until the file is
+        replaced.
 
         Arguments:
         is_locked -- True if the target is a locked file
+        inotify -- If True use inotify to only read the file when it has
+                   changed. This doesn't work for files that don't report
+                   changes, like those in /proc, /sys, or debugfs.
 
         """
         _is_locked = False
 
-        def __init__(self, monitoring_source, regex, is_locked=False):
+        # The number of bytes before the offset which are compared
+        _TAIL = 256
+
+        def __init__(self, monitoring_source, regex, is_locked=False,
+                     inotify=False):
             """Create a MonitoringFile instance"""
-            self._last_message = None
             self._is_locked = is_locked
+            self._use_inotify = inotify
+            self._inotify = None
+            self._fd = None
+            self._inode = None
+            self._offset = 0
+            self._tail = b''
+            self._partial = b''
             super(MonitoringFile, self).__init__(monitoring_source, regex)
 
-        def update_monitoring(self):
-            """Open the file and get the differences
-
-            Get the contents of the file, then calculate new messages.
-            This implements also a specific method for reading locked files.
-
-            """
+        def __del__(self):
+            self._close()
+
+        def _close(self):
+            if getattr(self, '_fd', None) is not None:
+                os.close(self._fd)
+                self._fd = None
+            if getattr(self, '_inotify', None) is not None:
+                self._inotify.close()
+                self._inotify = None
+
+        def fileno(self):
+            """Return the inotify file descriptor, if inotify is used"""
+            inotify = self._inotify
+            return inotify.fileno() if inotify is not None else None
+
+        def _open(self, stat_):
+            """Open the file, which is described by stat_."""
+            self._close()
+            if self._use_inotify and stat.S_ISREG(stat_.st_mode):
+                try:
+                    self._inotify = _Inotify(self._monitoring_source)
+                except OSError:
+                    pass
+            self._fd = os.open(self._monitoring_source,
+                               os.O_RDONLY | os.O_NONBLOCK
+                               if self._is_locked else os.O_RDONLY)
+            self._inode = (stat_.st_dev, stat_.st_ino)
+            self._offset = 0
+            self._tail = b''
+            self._partial = b''
+
+        def _read(self):
+            """Read everything from the current offset to the end."""
+            data = []
+            while True:
+                try:
+                    chunk = os.read(self._fd, 65536)
+                except OSError as e:
+                    # EPIPE is returned by /dev/kmsg if records were
+                    # overwritten before they were read.
+                    if e.errno == errno.EPIPE:
+                        continue
+                    elif e.errno == errno.EAGAIN:
+                        break
+                    raise
+                if not chunk:
+                    break
+                data.append(chunk)
+            data = b''.join(data)
+            self._offset += len(data)
+            self._tail = (self._tail + data)[-self._TAIL:]
+            return data
+
+        def _rewritten(self):
+            """Return True if the data before the offset has changed."""
+            os.lseek(self._fd, self._offset - len(self._tail), os.SEEK_SET)
+            return os.read(self._fd, len(self._tail)) != self._tail
+
+        def _update(self):
+            """Return the data added to the file since the last update."""
+            if self._inotify is not None and not self._inotify.changed():
+                return b''
+
+            stat_ = os.stat(self._monitoring_source)
+            if self._fd is None:
+                # Only the data added from now on is new.
+                self._open(stat_)
+                if stat.S_ISREG(stat_.st_mode):
+                    self._offset = os.lseek(
+                        self._fd, max(stat_.st_size - self._TAIL, 0),
+                        os.SEEK_SET)
+                # The rest of an unterminated last line is new though.
+                self._partial = self._read().rpartition(b'\n')[2]
+                return b''
+
+            data = b''
+            if (stat_.st_dev, stat_.st_ino) != self._inode:
+                # The file has been rotated, finish reading the old one,
+                # including its last line even if it isn't terminated.
+                data = self._partial + self._read()
+                if data and not data.endswith(b'\n'):
+                    data += b'\n'
+                self._open(stat_)
+            elif stat.S_ISREG(stat_.st_mode) and self._rewritten():
+                # The file has been truncated or rewritten. This can't be
+                # done with the size, since files in /sys and the like report
+                # a size of 0.
+                self._offset = os.lseek(self._fd, 0, os.SEEK_SET)
+                self._tail = b''
+                self._partial = b''
+            return data + self._read()
 
+        def update_monitoring(self):
+            """Read the new data in the file, and split it into lines"""
             try:
-                with open(self._monitoring_source, 'r') as f:
-                    lines = []
-                    if self._is_locked:
-                        # Create a duplicated file descriptor, this avoid lock
-                        fd = os.dup(f.fileno())
-                        # use I/O control for reading the lines
-                        fcntl.fcntl(fd, fcntl.F_SETFL, os.O_NONBLOCK)
-
-                        while True:
-                            try:
-                                line = os.read(fd, 1024)
-                                if not line:
-                                    break;
-                            except OSError as e:
-                                if e.errno == errno.EAGAIN:
-                                    break
-                                else:
-                                    raise e
-                            lines.append(line.decode("utf-8", "strict"))
-                        os.close(fd)
-
-                    else:
-                        lines = f.read().splitlines()
-
-                    f.close()
-
-                    # Find all new entries, do this by slicing the list of the
-                    # lines to only returns elements after the last element
-                    # stored. If there are not matches a value error is raised,
-                    # that means all of the lines are new
-                    l = 0
-                    for index, item in enumerate(reversed(lines)):
-                        if item == self._last_message:
-                            l = len(lines) - index  # don't include the matched element
-                            break
-                    self._new_messages = lines[l:]
-                    # Attempt to store the last element of lines,
-                    # unless there was no line
-                    self._last_message = lines[-1] if lines else None
-            except Exception:
-                # if an error occured, we consider there are no new messages
+                data = self._update()
+            except (OSError, IOError):
+                # if an error occured, we consider there are no new messages.
+                # The file is kept open, it may be being rotated, but inotify
+                # can't tell when the new file appears, so stop using it
+                # until the file is reopened.
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
                 self._new_messages = []
-                pass
+                return
+
+            lines = (self._partial + data).split(b'\n')
+            self._partial = lines.pop()
+            self._new_messages = [
+                l.decode('utf-8', 'replace') for l in lines]
 
 
     class MonitoringLinuxDmesg(BaseMonitoring, LinuxDmesg):
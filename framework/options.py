@@ -50,6 +50,12 @@ class _Options(object):  # pylint: disable=too-many-instance-attributes
     valgrind -- True if valgrind is to be used
     env -- environment variables set for each test before run
     deqp_mustpass -- True to enable the use of the deqp mustpass list feature.
+    output_head -- the number of bytes at the start of each output stream of a
+                   test to keep, 0 for no limit unless output_tail is set
+    output_tail -- the number of bytes at the end of each output stream of a
+                   test to keep, 0 for no limit unless output_head is set
+    output_dir -- the directory that output larger than output_head +
+                  output_tail is saved to, or None to not save it
     """
 
     def __init__(self):
@@ -58,6 +64,9 @@ class _Options(object):  # pylint: disable=too-many-instance-attributes
         self.sync = False
         self.deqp_mustpass = False
         self.process_isolation = True
+        self.output_head = 0
+        self.output_tail = 0
+        self.output_dir = None
 
         # env is used to set some base environment variables that are not going
         # to change across runs, without sending them to os.environ which is
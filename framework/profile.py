@@ -33,29 +33,68 @@ from __future__ import (
 import collections
 import contextlib
 import copy
+import datetime
+import functools
+import hashlib
+import heapq
 import importlib
 import itertools
+import json
 import multiprocessing
 import multiprocessing.dummy
 import os
 import re
+import sys
+import threading
+import time
 
 import six
 
 from framework import grouptools, exceptions
+from framework.core import (PIGLIT_CONFIG, get_cache_dir, read_cache,
+                            write_cache)
 from framework.dmesg import get_dmesg
 from framework.log import LogManager
 from framework.monitoring import Monitoring
+from framework.options import OPTIONS
 from framework.test.base import Test
+from framework.test.parse_cache import PARSE_CACHE
+from framework.test.piglit_test import TEST_BIN_DIR
+
+try:
+    from framework.test import async_
+except ImportError:
+    # asyncio is only available on python 3
+    async_ = None
 
 __all__ = [
+    'DirectoryCache',
+    'ProfileCache',
+    'RWLock',
     'RegexFilter',
     'TestDict',
     'TestProfile',
     'load_test_profile',
     'run',
+    'schedule',
 ]
 
+# The ways tests can be executed by run(). 'threads' runs every test from a
+# thread in this process, 'processes' hands the running of each test off to a
+# pool of worker processes, 'hybrid' uses worker processes only for tests that
+# can run concurrently, and 'asyncio' runs every test from a single event loop.
+EXECUTORS = ['threads', 'processes', 'hybrid']
+if async_ is not None:
+    EXECUTORS.append('asyncio')
+
+# Bump this whenever the layout of the cache files, or of any object stored in
+# them, changes.
+PROFILE_CACHE_VERSION = 1
+
+_DISABLE_CACHE = bool(os.environ.get('PIGLIT_NO_PROFILE_CACHE', False))
+
+_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
 
 class RegexFilter(object):
     """An object to be passed to TestProfile.filter.
@@ -287,6 +326,12 @@ class TestProfile(object):
             'monitor': Monitoring(False),
         }
 
+        # A mapping of the roots of the directory trees this profile was
+        # generated from to the signatures of each directory in them, as
+        # returned by DirectoryCache.trees. Only profiles that set this will
+        # be cached by load_test_profile.
+        self.source_trees = {}
+
     def setup(self):
         """Method to do pre-run setup."""
 
@@ -323,6 +368,176 @@ class TestProfile(object):
                 yield k, v
 
 
+def _directory_signature(dirpath, filenames):
+    """Return a signature for the files in a directory.
+
+    This is a hash of the name, modification time, and size of each file, so
+    adding, removing, or modifying any of them will change the signature.
+    """
+    hash_ = hashlib.sha1()
+    for name in sorted(filenames):
+        try:
+            stat = os.stat(os.path.join(dirpath, name))
+        except OSError:
+            continue
+        hash_.update('{}\0{!r}\0{}\0'.format(
+            name, stat.st_mtime, stat.st_size).encode('utf-8'))
+    return hash_.hexdigest()
+
+
+def _tree_signatures(root):
+    """Return a dict mapping each directory under root to its signature."""
+    return {d: _directory_signature(d, f) for d, _, f in os.walk(root)}
+
+
+def _cache_key():
+    """Return a key describing everything a cached profile depends on.
+
+    This covers the framework and the profile modules themselves, piglit.conf,
+    OPTIONS, the environment, and the binaries that are available. Files
+    discovered by walking the test directories are not covered by this, they
+    are handled by the per directory signatures.
+    """
+    hash_ = hashlib.sha1()
+
+    def update(*values):
+        for value in values:
+            hash_.update(six.text_type(value).encode('utf-8'))
+            hash_.update(b'\0')
+
+    update(PROFILE_CACHE_VERSION, sys.version, _ROOT_DIR)
+    # Where the output of tests is saved depends on the results directory,
+    # and has nothing to do with the profile
+    update(json.dumps({k: v for k, v in OPTIONS if k != 'output_dir'},
+                      sort_keys=True))
+
+    for name in sorted(os.environ):
+        if name.startswith('PIGLIT_'):
+            update(name, os.environ[name])
+
+    for section in sorted(PIGLIT_CONFIG.sections()):
+        update(section, sorted(PIGLIT_CONFIG.items(section, raw=True)))
+
+    # Which binaries exist can change what tests are generated, but rebuilding
+    # them shouldn't invalidate the cache.
+    if os.path.isdir(TEST_BIN_DIR):
+        update(TEST_BIN_DIR, sorted(os.listdir(TEST_BIN_DIR)))
+
+    for dirname in ['tests', os.path.join('tests', 'py_modules')]:
+        dirname = os.path.join(_ROOT_DIR, dirname)
+        update(dirname, _directory_signature(
+            dirname, [f for f in os.listdir(dirname) if f.endswith('.py')]))
+    for dirpath, _, filenames in os.walk(os.path.join(_ROOT_DIR, 'framework')):
+        update(dirpath, _directory_signature(
+            dirpath, [f for f in filenames if f.endswith('.py')]))
+
+    return hash_.hexdigest()
+
+
+def _cache_filename(name):
+    """Return the filename of the cache file for name.
+
+    The cache files of different piglit checkouts are kept apart, so that
+    using more than one doesn't cause them to constantly invalidate each other.
+    None is returned if the cache directory can't be used.
+    """
+    try:
+        dirname = get_cache_dir('profiles')
+    except OSError:
+        return None
+    return os.path.join(
+        dirname, '{}-{}.pickle'.format(
+            name, hashlib.sha1(_ROOT_DIR.encode('utf-8')).hexdigest()[:12]))
+
+
+class DirectoryCache(object):
+    """Cache the result of processing each directory in a tree of tests.
+
+    Profiles that generate tests by walking a directory tree can use walk()
+    in place of os.walk. The value computed for each directory is cached
+    along with a signature of the files in that directory, and is only
+    recomputed when that signature changes, so editing one file causes only
+    the directory that contains it to be processed again.
+
+    Arguments:
+    name -- the name of the cache, usually the name of the profile module
+    """
+
+    def __init__(self, name):
+        self.name = '{}-dirs'.format(name)
+        self.__key = _cache_key()
+        self.__old = {} if _DISABLE_CACHE else (
+            read_cache(_cache_filename(self.name), self.__key) or {})
+        self.__new = {}
+        self.trees = {}
+
+    def walk(self, root, func):
+        """Walk root, yielding (dirpath, value) for each directory in it.
+
+        Arguments:
+        root -- the directory to walk
+        func -- a callable taking dirpath and a list of filenames, which
+                returns a value to cache. The value must be picklable.
+        """
+        signatures = self.trees.setdefault(root, {})
+        for dirpath, _, filenames in os.walk(root):
+            signature = _directory_signature(dirpath, filenames)
+            signatures[dirpath] = signature
+
+            cached = self.__old.get(dirpath)
+            if cached is not None and cached[0] == signature:
+                value = cached[1]
+            else:
+                value = func(dirpath, filenames)
+
+            self.__new[dirpath] = (signature, value)
+            yield dirpath, value
+
+    def save(self):
+        """Write the values of all of the directories walked to disk."""
+        if not _DISABLE_CACHE:
+            write_cache(_cache_filename(self.name), self.__key, self.__new)
+
+
+class ProfileCache(object):
+    """Cache an entire TestProfile on disk.
+
+    A cached profile is valid as long as the key (see _cache_key) is
+    unchanged, and no file in any of the profile's source_trees has been
+    added, removed, or modified.
+
+    Arguments:
+    name -- the name of the profile module
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.__key = _cache_key()
+
+    def load(self):
+        """Return the cached profile, or None if there isn't a valid one."""
+        if _DISABLE_CACHE:
+            return None
+
+        profile = read_cache(_cache_filename(self.name), self.__key)
+        if profile is None:
+            return None
+
+        for root, signatures in six.iteritems(profile.source_trees):
+            if _tree_signatures(root) != signatures:
+                return None
+        return profile
+
+    def save(self, profile):
+        """Write profile to disk.
+
+        Not every profile can be pickled (for example if a filter is a
+        lambda), those are silently not cached.
+        """
+        if not _DISABLE_CACHE:
+            write_cache(_cache_filename(self.name), self.__key, profile)
+
+
 def load_test_profile(filename):
     """Load a python module and return it's profile attribute.
 
@@ -330,6 +545,11 @@ def load_test_profile(filename):
     TestProfile instance. This loads that module and returns it or raises an
     error.
 
+    If there is a valid cached copy of the profile (see ProfileCache) that is
+    returned instead, without importing the module. Profiles that don't set
+    source_trees are never cached, since there is no way to know whether they
+    are stale.
+
     This method doesn't care about file extensions as a way to be backwards
     compatible with script wrapping piglit. 'tests/quick', 'tests/quick.tests',
     'tests/quick.py', and 'quick' are all equally valid for filename.
@@ -344,24 +564,252 @@ def load_test_profile(filename):
     Arguments:
     filename -- the name of a python module to get a 'profile' from
     """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    modname = 'tests.{0}'.format(name)
+    cache = ProfileCache(name)
+
+    # If the module has already been imported its profile may have been
+    # modified since, so neither load nor save a cached copy.
+    imported = modname in sys.modules
+    if not imported:
+        profile = cache.load()
+        if profile is not None:
+            return profile
+
     try:
-        mod = importlib.import_module('tests.{0}'.format(
-            os.path.splitext(os.path.basename(filename))[0]))
+        mod = importlib.import_module(modname)
     except ImportError:
         raise exceptions.PiglitFatalError(
             'Failed to import "{}", there is either something wrong with the '
             'module or it doesn\'t exist. Check your spelling?'.format(
                 filename))
 
+    # Importing the module may have parsed test files that weren't already in
+    # the parse cache.
+    PARSE_CACHE.save()
+
     try:
-        return mod.profile
+        profile = mod.profile
     except AttributeError:
         raise exceptions.PiglitFatalError(
             'There is no "profile" attribute in module {}.\n'
             'Did you specify the right file?'.format(filename))
 
+    if not imported and profile.source_trees:
+        cache.save(profile)
+    return profile
+
+
+class RWLock(object):
+    """A reader/writer lock that interleaves windows of readers and writers.
+
+    Any number of readers can hold the lock at once, but a writer holds it
+    alone. Writers are preferred: once one is waiting no new readers are
+    admitted, and it gets the lock as soon as the current readers release it.
+    To keep either side from starving the other, when both are waiting they
+    take turns, each keeping the lock for at least window seconds.
+
+    Arguments:
+    window -- the minimum number of seconds each side keeps the lock for when
+              the other side is waiting.
+    """
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self.__cond = threading.Condition()
+        self.__readers = 0
+        self.__writer = False
+        self.__readers_waiting = 0
+        self.__writers_waiting = 0
+        self.__phase = 'read'
+        self.__phase_start = time.time()
+
+    def __readers_turn(self):
+        """Return whether readers have priority, and how long that lasts."""
+        remaining = self.__phase_start + self.window - time.time()
+        if self.__phase == 'read':
+            return remaining > 0, remaining
+        return remaining <= 0, remaining
+
+    def __wait(self, ready):
+        """Wait until ready() returns True. The condition must be held."""
+        while True:
+            ok, remaining = ready()
+            if ok:
+                return
+            # The turn changes when the window expires, so wake up then even
+            # if nothing notifies.
+            self.__cond.wait(remaining if remaining > 0 else None)
+
+    def __start_phase(self, phase):
+        if self.__phase != phase:
+            self.__phase = phase
+            self.__phase_start = time.time()
+
+    @contextlib.contextmanager
+    def shared(self):
+        """Hold the lock as a reader."""
+        def ready():
+            turn, remaining = self.__readers_turn()
+            return (not self.__writer and
+                    (not self.__writers_waiting or turn)), remaining
+
+        with self.__cond:
+            self.__readers_waiting += 1
+            try:
+                self.__wait(ready)
+            finally:
+                self.__readers_waiting -= 1
+            self.__readers += 1
+            self.__start_phase('read')
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__readers -= 1
+                self.__cond.notify_all()
+
+    def expired(self):
+        """Return whether the window of the side holding the lock has expired
+        and the other side is waiting for it.
+
+        Holders that run many short jobs back to back use this to decide when
+        to give up the lock, rather than releasing it after every job.
+        """
+        with self.__cond:
+            if self.__phase_start + self.window > time.time():
+                return False
+            if self.__phase == 'write':
+                return bool(self.__readers_waiting)
+            return bool(self.__writers_waiting)
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        """Hold the lock as a writer."""
+        def ready():
+            turn, remaining = self.__readers_turn()
+            return (not self.__writer and not self.__readers and
+                    (not self.__readers_waiting or not turn)), remaining
+
+        with self.__cond:
+            self.__writers_waiting += 1
+            try:
+                self.__wait(ready)
+            finally:
+                self.__writers_waiting -= 1
+            self.__writer = True
+            self.__start_phase('write')
+        try:
+            yield
+        finally:
+            with self.__cond:
+                self.__writer = False
+                self.__cond.notify_all()
+
+
+@contextlib.contextmanager
+def _unlocked():
+    yield
+
+
+def _init_worker(options):
+    """Initialize a worker process used by run().
+
+    On platforms without fork the global OPTIONS aren't inherited, so they
+    need to be copied in.
+    """
+    for key, value in six.iteritems(options):
+        setattr(OPTIONS, key, value)
+
+
+def _run_test(test):
+    """Run a test in a worker process and return its result."""
+    test.run()
+    return test.result
+
+
+def _abort_needed(profile):
+    """Return True if the monitoring of profile found an error.
+
+    The sources are read first, rather than waiting for the monitoring
+    thread, so that no other test is started after the one that caused an
+    error.
+
+    """
+    monitor = profile.options['monitor']
+    monitor.update_monitoring()
+    return monitor.abort_needed
+
 
-def run(profiles, logger, backend, concurrency):
+def _estimate_times(test_list, history):
+    """Return a list of the estimated run time of each test in test_list.
+
+    Tests that are in history are expected to take as long as they did then.
+    Other tests are expected to take the median time of the tests in history
+    for each of their subtests, or one second per subtest with no history at
+    all, which roughly orders them by how many subtests they have.
+    """
+    known = sorted(six.itervalues(history))
+    default = known[len(known) // 2] if known else 1.0
+    return [history[name] if name in history
+            else default * max(1, len(test.result.subtests))
+            for name, test in test_list]
+
+
+def _predict(times, jobs):
+    """Predict how long it will take jobs workers to run tests in order.
+
+    Each test is given to whichever worker will be free first.
+    """
+    if not times:
+        return 0.0
+    loads = [0.0] * min(jobs, len(times))
+    for each in times:
+        heapq.heapreplace(loads, loads[0] + each)
+    return max(loads)
+
+
+def schedule(test_list, history, jobs, concurrency):
+    """Order tests longest first, and predict how long they will take.
+
+    Running the longest tests first (the LPT heuristic) avoids a long test
+    starting near the end of the run, and leaving every other worker idle
+    until it finishes.
+
+    Returns a tuple of the reordered test list, and the predicted run time in
+    seconds.
+
+    Arguments:
+    test_list -- a list of (name, Test) tuples
+    history -- a dict mapping test names to how long they took in seconds
+    jobs -- the number of tests that can run concurrently
+    concurrency -- the concurrency mode of the run, as passed to run()
+    """
+    times = _estimate_times(test_list, history)
+    order = sorted(range(len(test_list)), key=lambda i: -times[i])
+
+    if concurrency == 'none':
+        predicted = sum(times)
+    elif concurrency == 'interleave':
+        # The serial tests never overlap with the concurrent ones.
+        predicted = _predict(
+            [times[i] for i in order if test_list[i][1].run_concurrent],
+            jobs) + sum(times[i] for i in order
+                        if not test_list[i][1].run_concurrent)
+    else:
+        concurrent = [times[i] for i in order
+                      if concurrency == 'all' or test_list[i][1].run_concurrent]
+        # The serial tests run alongside the concurrent ones.
+        predicted = max(
+            _predict(concurrent, jobs),
+            sum(times[i] for i in order if concurrency != 'all' and
+                not test_list[i][1].run_concurrent))
+
+    return [test_list[i] for i in order], predicted
+
+
+def run(profiles, logger, backend, concurrency, jobs=None, executor='threads',
+        history=None):
     """Runs all tests using Thread pool.
 
     When called this method will flatten out self.tests into self.test_list,
@@ -370,7 +818,16 @@ def run(profiles, logger, backend, concurrency):
 
     Based on the value of options.OPTIONS.concurrent it will either run all the
     tests concurrently, all serially, or first the thread safe tests then the
-    serial tests.
+    serial tests. With "interleave" the serial tests run alongside the
+    concurrent ones, but in exclusive windows (see RWLock) so that they never
+    run at the same time as a concurrent test.
+
+    Depending on the executor tests are either run directly from those
+    threads, or handed off to a pool of worker processes to be run. Either way
+    the threads in this process still handle the backend, the logger, dmesg,
+    and monitoring, only running the test itself (and interpreting its
+    result) is done in the worker. The asyncio executor doesn't use threads
+    at all, instead every test is run from an event loop in this thread.
 
     Finally it will print a final summary of the tests.
 
@@ -378,8 +835,19 @@ def run(profiles, logger, backend, concurrency):
     profiles -- a list of Profile instances.
     logger   -- a log.LogManager instance.
     backend  -- a results.Backend derived instance.
+
+    Keyword Arguments:
+    jobs     -- the number of tests to run concurrently. If None the number of
+                CPUs is used. Default: None
+    executor -- one of EXECUTORS. Default: 'threads'
+    history  -- a dict mapping test names to the time they took in a previous
+                run. If provided tests are run longest first (see schedule),
+                and the predicted and actual run time are printed at the end.
+                Default: None
     """
+    assert executor in EXECUTORS, executor
     chunksize = 1
+    jobs = jobs or multiprocessing.cpu_count()
 
     # The logger needs to know how many tests are running. Because of filters
     # there's no way to do that without making a concrete list out of the
@@ -387,15 +855,25 @@ def run(profiles, logger, backend, concurrency):
     profiles = [(p, list(p.itertests())) for p in profiles]
     log = LogManager(logger, sum(len(l) for _, l in profiles))
 
-    def test(name, test, profile, this_pool=None):
+    predicted = 0.0
+    if history is not None:
+        for i, (p, test_list) in enumerate(profiles):
+            test_list, time_ = schedule(test_list, history, jobs, concurrency)
+            profiles[i] = (p, test_list)
+            predicted += time_
+    start = time.time()
+
+    def test(name, test, profile, runner, guard, this_pool=None):
         """Function to call test.execute from map"""
         with backend.write_test(name) as w:
-            test.execute(name, log.get(), profile.options)
+            with guard():
+                test.execute(name, log.get(), profile.options, runner=runner)
             w(test.result)
-        if profile.options['monitor'].abort_needed:
+        if _abort_needed(profile):
             this_pool.terminate()
 
-    def run_threads(pool, profile, test_list, filterby=None):
+    def run_threads(pool, runner, profile, test_list, filterby=None,
+                    guard=_unlocked):
         """ Open a pool, close it, and join it """
         if filterby:
             # Although filterby could be attached to TestProfile as a filter,
@@ -403,45 +881,138 @@ def run(profiles, logger, backend, concurrency):
             # more code, and adding side-effects
             test_list = (x for x in test_list if filterby(x))
 
-        pool.imap(lambda pair: test(pair[0], pair[1], profile, pool),
-                  test_list, chunksize)
+        pool.imap(
+            lambda pair: test(pair[0], pair[1], profile, runner, guard, pool),
+            test_list, chunksize)
+
+    def run_exclusive(runner, profile, test_list):
+        """Run tests one after another, holding the lock exclusively.
+
+        The lock is kept for as long as there are tests left, and only given
+        up between tests once its window has expired, so the concurrent tests
+        get their turn without each serial test waiting for a whole window.
+        """
+        tests = iter(test_list)
+        pending = next(tests, None)
+        while pending is not None:
+            with lock.exclusive():
+                while pending is not None:
+                    test(pending[0], pending[1], profile, runner, _unlocked,
+                         single)
+                    if profile.options['monitor'].abort_needed:
+                        return
+                    pending = next(tests, None)
+                    if lock.expired():
+                        break
 
     def run_profile(profile, test_list):
         """Run an individual profile."""
         profile.setup()
         if concurrency == "all":
-            run_threads(multi, profile, test_list)
+            run_threads(multi, multi_runner, profile, test_list)
         elif concurrency == "none":
-            run_threads(single, profile, test_list)
+            run_threads(single, single_runner, profile, test_list)
+        elif concurrency == "interleave":
+            # The serial tests run while holding the lock exclusively, so
+            # they never overlap with the concurrent tests.
+            run_threads(multi, multi_runner, profile, test_list,
+                        lambda x: x[1].run_concurrent, lock.shared)
+            single.apply_async(run_exclusive, (
+                single_runner, profile,
+                [x for x in test_list if not x[1].run_concurrent]))
         else:
             assert concurrency == "some"
             # Filter and return only thread safe tests to the threaded pool
-            run_threads(multi, profile, test_list,
+            run_threads(multi, multi_runner, profile, test_list,
                         lambda x: x[1].run_concurrent)
 
             # Filter and return the non thread safe tests to the single
             # pool
-            run_threads(single, profile, test_list,
+            run_threads(single, single_runner, profile, test_list,
                         lambda x: not x[1].run_concurrent)
         profile.teardown()
 
-    # Multiprocessing.dummy is a wrapper around Threading that provides a
-    # multiprocessing compatible API
-    #
-    # The default value of pool is the number of virtual processor cores
-    single = multiprocessing.dummy.Pool(1)
-    multi = multiprocessing.dummy.Pool()
+    def test_async(name, test, profile, loop):
+        """Execute a test from the event loop, and return a future."""
+        writer = backend.write_test(name)
+        w = writer.__enter__()
+
+        def finished(_):
+            w(test.result)
+            writer.__exit__(None, None, None)
+            if _abort_needed(profile):
+                for lane in lanes:
+                    lane.stop()
+
+        future = async_.execute(test, name, log.get(), profile.options, loop)
+        future.add_done_callback(finished)
+        return future
+
+    def run_async():
+        """Run every profile from a single event loop."""
+        for profile, test_list in profiles:
+            profile.setup()
+            for name, test in test_list:
+                func = functools.partial(test_async, name, test, profile)
+                if concurrency == 'all' or (
+                        concurrency == 'some' and test.run_concurrent):
+                    lanes[0].add(func)
+                else:
+                    lanes[1].add(func)
+            profile.teardown()
+        async_.run(lanes)
+
+    workers = None
+    lock = RWLock()
+    if executor == 'asyncio':
+        assert concurrency != 'interleave', \
+            'interleave is not supported by the asyncio executor'
+        lanes = [async_.Lane(jobs), async_.Lane(1)]
+    else:
+        # Multiprocessing.dummy is a wrapper around Threading that provides a
+        # multiprocessing compatible API
+        single = multiprocessing.dummy.Pool(1)
+        multi = multiprocessing.dummy.Pool(jobs)
+
+        # The threads above block waiting for the workers, so there is never
+        # more than one test per thread handed to them.
+        single_runner = multi_runner = None
+        if executor != 'threads':
+            workers = multiprocessing.Pool(
+                jobs + 1 if executor == 'processes' else jobs,
+                _init_worker, (dict(OPTIONS),))
+            multi_runner = lambda t: workers.apply(_run_test, (t,))
+            if executor == 'processes':
+                single_runner = multi_runner
+
+    # Monitoring reads its sources from a background thread while the tests
+    # run, several profiles may share the same Monitoring instance.
+    for p, _ in profiles:
+        p.options['monitor'].start()
 
     try:
-        for p in profiles:
-            run_profile(*p)
+        if executor == 'asyncio':
+            run_async()
+        else:
+            for p in profiles:
+                run_profile(*p)
 
-        for pool in [single, multi]:
-            pool.close()
-            pool.join()
+            for pool in [single, multi]:
+                pool.close()
+                pool.join()
     finally:
+        for p, _ in profiles:
+            p.options['monitor'].stop()
+        if workers is not None:
+            workers.terminate()
+            workers.join()
         log.get().summary()
 
+    if history is not None:
+        print('Predicted run time: {}, actual run time: {}'.format(
+            datetime.timedelta(seconds=int(predicted)),
+            datetime.timedelta(seconds=int(time.time() - start))))
+
     for p, _ in profiles:
         if p.options['monitor'].abort_needed:
             raise exceptions.PiglitAbort(p.options['monitor'].error_message)
@@ -0,0 +1,161 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Commands for managing a database of results."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import argparse
+
+from framework import backends, core, database, exceptions, grouptools, status
+from . import parsers
+
+__all__ = [
+    'history',
+    'import_',
+    'list_',
+    'load',
+    'remove',
+]
+
+# A parent parser for the path of the database, which is shared with the
+# summary commands.
+DB = argparse.ArgumentParser(add_help=False)
+DB.add_argument("--db",
+                metavar="<Database>",
+                default=None,
+                help="The results database to use. Default is [db] path "
+                     "from piglit.conf, or piglit.db")
+
+
+def _open(path):
+    """Open the database at path, or the default one if path is None."""
+    return database.ResultsDB(
+        path or core.PIGLIT_CONFIG.safe_get('db', 'path', 'piglit.db'))
+
+
+def load(path, names):
+    """Load runs from the database at path.
+
+    Raises a PiglitFatalError if any of the runs isn't in the database.
+
+    """
+    with _open(path) as db:
+        try:
+            return [db.load(n) for n in names]
+        except KeyError as e:
+            raise exceptions.PiglitFatalError(
+                'No run named "{}" in the database'.format(e.args[0]))
+
+
+@exceptions.handler
+def import_(input_):
+    """Add results files to the database."""
+    unparsed = parsers.parse_config(input_)[1]
+
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, DB])
+    parser.add_argument("-n", "--name",
+                        help="The name to store the results as, only valid "
+                             "with a single results file. Default is the "
+                             "name of the results")
+    parser.add_argument("-r", "--replace",
+                        action="store_true",
+                        help="Replace runs that are already in the database")
+    parser.add_argument("results",
+                        metavar="<Results Path(s)>",
+                        nargs="+",
+                        help="Space separated paths to results files")
+    args = parser.parse_args(unparsed)
+
+    if args.name and len(args.results) > 1:
+        parser.error('-n/--name cannot be used with more than one results '
+                     'file')
+
+    with _open(args.db) as db:
+        for each in args.results:
+            testrun = backends.load(each)
+            db.add(testrun, args.name, args.replace)
+            print('Added {}'.format(args.name or testrun.name))
+
+
+@exceptions.handler
+def list_(input_):
+    """Print the names of the runs in the database, oldest first."""
+    unparsed = parsers.parse_config(input_)[1]
+
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, DB])
+    args = parser.parse_args(unparsed)
+
+    with _open(args.db) as db:
+        for name in db.runs():
+            print(name)
+
+
+@exceptions.handler
+def remove(input_):
+    """Remove runs from the database."""
+    unparsed = parsers.parse_config(input_)[1]
+
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, DB])
+    parser.add_argument("runs",
+                        metavar="<Run Name(s)>",
+                        nargs="+",
+                        help="Space separated names of runs to remove")
+    args = parser.parse_args(unparsed)
+
+    with _open(args.db) as db:
+        for name in args.runs:
+            try:
+                db.remove(name)
+            except KeyError:
+                raise exceptions.PiglitFatalError(
+                    'No run named "{}" in the database'.format(name))
+
+
+@exceptions.handler
+def history(input_):
+    """Print the status of a test in each run in the database."""
+    unparsed = parsers.parse_config(input_)[1]
+
+    statuses = [str(s) for s in status.ALL]
+
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, DB])
+    parser.add_argument("-F", "--first",
+                        action="append",
+                        choices=statuses,
+                        metavar="<status>",
+                        help="Only print the oldest run in which the test "
+                             "had this status. May be used multiple times")
+    parser.add_argument("test",
+                        metavar="<Test Name>",
+                        help="The name of a test or subtest")
+    args = parser.parse_args(unparsed)
+
+    name = grouptools.from_path(args.test)
+    with _open(args.db) as db:
+        if args.first:
+            run = db.first(name, args.first)
+            if run is None:
+                raise exceptions.PiglitFatalError(
+                    '{} never had status {}'.format(
+                        args.test, ', '.join(args.first)))
+            print(run)
+        else:
+            for run, result in db.history(name):
+                print('{}: {}'.format(run, result or status.NOTRUN))
@@ -139,6 +139,37 @@ def _run_parser(input_):
                              const="none",
                              dest="concurrency",
                              help="Disable concurrent test runs")
+    conc_parser.add_argument("--interleave",
+                             action="store_const",
+                             default="some",
+                             const="interleave",
+                             dest="concurrency",
+                             help="Run tests that are not thread safe in "
+                                  "exclusive windows between the concurrent "
+                                  "tests, rather than alongside them")
+    parser.add_argument("-j", "--jobs",
+                        type=int,
+                        default=core.PIGLIT_CONFIG.safe_get('core', 'jobs'),
+                        metavar='<int>',
+                        help="The number of tests to run concurrently. "
+                             "Default is the number of CPUs. This value can "
+                             "also be set in piglit.conf.")
+    parser.add_argument("--executor",
+                        choices=profile.EXECUTORS,
+                        default=core.PIGLIT_CONFIG.safe_get(
+                            'core', 'executor', 'threads'),
+                        help="How to execute tests. 'threads' runs tests "
+                             "from threads in the piglit process, "
+                             "'processes' runs them from a pool of worker "
+                             "processes, and 'hybrid' uses worker processes "
+                             "only for tests that can run concurrently. "
+                             "This value can also be set in piglit.conf.")
+    parser.add_argument("--history",
+                        type=path.realpath,
+                        metavar="<Results Path>",
+                        help="Use the time each test took in a previous run "
+                             "to run the longest tests first, and predict "
+                             "how long the run will take.")
     parser.add_argument("-p", "--platform",
                         choices=core.PLATFORMS,
                         default=_default_platform(),
@@ -149,17 +180,25 @@ def _run_parser(input_):
     parser.add_argument("--dmesg",
                         action="store_true",
                         help="Capture a difference in dmesg before and "
-                             "after each test. Implies -1/--no-concurrency")
+                             "after each test. Implies -1/--no-concurrency "
+                             "if /dev/kmsg cannot be read")
     parser.add_argument("--abort-on-monitored-error",
                         action="store_true",
                         dest="monitored",
                         help="Enable monitoring according the rules defined "
                              "in piglit.conf, and stop the execution when a "
-                             "monitored error is detected. Exit code 3. "
-                             "Implies -1/--no-concurrency")
+                             "monitored error is detected. Exit code 3.")
     parser.add_argument("-s", "--sync",
                         action="store_true",
                         help="Sync results to disk after every test")
+    parser.add_argument("--journal",
+                        action="store_true",
+                        help="Append the results of each test to a single "
+                             "journal file, rather than writing a file for "
+                             "each test. This is much faster on network "
+                             "filesystems. With -s/--sync the journal is "
+                             "synced to disk in batches rather than after "
+                             "every test")
     parser.add_argument("--junit_suffix",
                         type=str,
                         default="",
@@ -207,6 +246,27 @@ def _run_parser(input_):
                              'isolation. This allows, but does not require, '
                              'tests to run multiple tests per process. '
                              'This value can also be set in piglit.conf.')
+    parser.add_argument('--output-head',
+                        type=int,
+                        default=core.PIGLIT_CONFIG.safe_get(
+                            'core', 'output head', 0),
+                        metavar='<KiB>',
+                        help='Only keep this much of the start of the stdout '
+                             'and stderr of each test in the results. When '
+                             'this or --output-tail is set the whole output '
+                             'of tests that print more is saved in the '
+                             'output directory of the results. Default: no '
+                             'limit. This value can also be set in '
+                             'piglit.conf.')
+    parser.add_argument('--output-tail',
+                        type=int,
+                        default=core.PIGLIT_CONFIG.safe_get(
+                            'core', 'output tail', 0),
+                        metavar='<KiB>',
+                        help='Only keep this much of the end of the stdout '
+                             'and stderr of each test in the results. '
+                             'Default: no limit. This value can also be set '
+                             'in piglit.conf.')
     parser.add_argument("test_profile",
                         metavar="<Profile path(s)>",
                         nargs='+',
@@ -226,6 +286,11 @@ def _create_metadata(args, name, forced_test_list):
     opts['profile'] = args.test_profile
     opts['log_level'] = args.log_level
     opts['concurrent'] = args.concurrency
+    opts['jobs'] = args.jobs
+    opts['executor'] = args.executor
+    opts['history'] = args.history
+    opts['journal'] = args.journal
+    opts['backend'] = args.backend
     opts['include_filter'] = args.include_tests
     opts['exclude_filter'] = args.exclude_tests
     opts['dmesg'] = args.dmesg
@@ -241,6 +306,14 @@ def _create_metadata(args, name, forced_test_list):
     return metadata
 
 
+def _load_history(results_path):
+    """Return a dict mapping test names to how long they took in a run."""
+    if results_path is None:
+        return None
+    results = backends.load(results_path)
+    return {n: r.time.total for n, r in six.iteritems(results.tests)}
+
+
 def _disable_windows_exception_messages():
     """Disable Windows error message boxes for this and all child processes."""
     if sys.platform == 'win32':
@@ -279,10 +352,21 @@ def run(input_):
     args = _run_parser(input_)
     _disable_windows_exception_messages()
 
-    # If dmesg is requested we must have serial run, this is because dmesg
-    # isn't reliable with threaded run
-    if args.dmesg or args.monitored:
+    # If dmesg is requested we must have serial run, unless the messages can
+    # be matched to tests by when they were logged (see dmesg.KmsgDmesg),
+    # this is because dmesg isn't reliable with threaded run otherwise
+    dmesg_ = dmesg.get_dmesg(args.dmesg) if args.dmesg else None
+    if dmesg_ is not None and not dmesg_.concurrent:
         args.concurrency = "none"
+    elif dmesg_ is not None:
+        dmesg_.serial = args.concurrency == "none"
+
+    if args.concurrency == "interleave" and args.executor == "asyncio":
+        raise exceptions.PiglitFatalError(
+            '--interleave cannot be used with the asyncio executor')
+
+    # Load this before anything is written, in case it fails.
+    history = _load_history(args.history)
 
     # Pass arguments into Options
     options.OPTIONS.execute = args.execute
@@ -290,6 +374,9 @@ def run(input_):
     options.OPTIONS.sync = args.sync
     options.OPTIONS.deqp_mustpass = args.deqp_mustpass
     options.OPTIONS.process_isolation = args.process_isolation
+    options.OPTIONS.output_head = args.output_head * 1024
+    options.OPTIONS.output_tail = args.output_tail * 1024
+    options.OPTIONS.output_dir = os.path.join(args.results_path, 'output')
 
     # Set the platform to pass to waffle
     options.OPTIONS.env['PIGLIT_PLATFORM'] = args.platform
@@ -323,6 +410,7 @@ def run(input_):
 
     backend = backends.get_backend(args.backend)(
         args.results_path,
+        file_journal=args.journal,
         junit_suffix=args.junit_suffix,
         junit_subtests=args.junit_subtests)
     backend.initialize(_create_metadata(
@@ -337,13 +425,14 @@ def run(input_):
         profiles[0].forced_test_list = forced_test_list
 
     # Set the dmesg type
-    if args.dmesg:
+    if dmesg_ is not None:
         for p in profiles:
-            p.options['dmesg'] = dmesg.get_dmesg(args.dmesg)
+            p.options['dmesg'] = dmesg_
 
     if args.monitored:
+        monitor = monitoring.Monitoring(args.monitored)
         for p in profiles:
-            p.options['monitor'] = monitoring.Monitoring(args.monitored)
+            p.options['monitor'] = monitor
 
     for p in profiles:
         if args.exclude_tests:
@@ -354,7 +443,9 @@ def run(input_):
 
     time_elapsed = TimeAttribute(start=time.time())
 
-    profile.run(profiles, args.log_level, backend, args.concurrency)
+    profile.run(profiles, args.log_level, backend, args.concurrency,
+                jobs=args.jobs, executor=args.executor,
+                history=history)
 
     time_elapsed.end = time.time()
     backend.finalize({'time_elapsed': time_elapsed.to_json()})
@@ -388,6 +479,9 @@ def resume(input_):
     options.OPTIONS.sync = results.options['sync']
     options.OPTIONS.deqp_mustpass = results.options['deqp_mustpass']
     options.OPTIONS.proces_isolation = results.options['process_isolation']
+    options.OPTIONS.output_head = results.options.get('output_head', 0)
+    options.OPTIONS.output_tail = results.options.get('output_tail', 0)
+    options.OPTIONS.output_dir = os.path.join(args.results_path, 'output')
 
     core.get_config(args.config_file)
 
@@ -396,10 +490,14 @@ def resume(input_):
     results.options['env'] = core.collect_system_info()
     results.options['name'] = results.name
 
-    # Resume only works with the JSON backend
-    backend = backends.get_backend('json')(
+    # Resume only works with the JSON backend, and those derived from it
+    backend = backends.get_backend(results.options.get('backend', 'json'))
+    if not issubclass(backend, backends.json.JSONBackend):
+        backend = backends.json.JSONBackend
+    backend = backend(
         args.results_path,
-        file_start_count=len(results.tests) + 1)
+        file_start_count=len(results.tests) + 1,
+        file_journal=results.options.get('journal', False))
     # Specifically do not initialize again, everything initialize does is done.
 
     # Don't re-run tests that have already completed, incomplete status tests
@@ -409,17 +507,29 @@ def resume(input_):
         if args.no_retry or result.result != 'incomplete':
             exclude_tests.add(name)
 
+    concurrency = results.options['concurrent']
+    dmesg_ = None
+    if results.options['dmesg']:
+        dmesg_ = dmesg.get_dmesg(results.options['dmesg'])
+        if not dmesg_.concurrent:
+            concurrency = "none"
+        else:
+            dmesg_.serial = concurrency == "none"
+
+    monitor = None
+    if results.options['monitoring']:
+        monitor = monitoring.Monitoring(results.options['monitoring'])
+
     profiles = [profile.load_test_profile(p)
                 for p in results.options['profile']]
     for p in profiles:
         p.results_dir = args.results_path
 
-        if results.options['dmesg']:
-            p.dmesg = dmesg.get_dmesg(results.options['dmesg'])
+        if dmesg_ is not None:
+            p.options['dmesg'] = dmesg_
 
-        if results.options['monitoring']:
-            p.options['monitor'] = monitoring.Monitoring(
-                results.options['monitoring'])
+        if monitor is not None:
+            p.options['monitor'] = monitor
 
         if exclude_tests:
             p.filters.append(lambda n, _: n not in exclude_tests)
@@ -439,7 +549,10 @@ def resume(input_):
         profiles,
         results.options['log_level'],
         backend,
-        results.options['concurrent'])
+        concurrency,
+        jobs=results.options.get('jobs'),
+        executor=results.options.get('executor', 'threads'),
+        history=_load_history(results.options.get('history')))
 
     backend.finalize()
 
@@ -32,10 +32,11 @@ import errno
 import six
 
 from framework import summary, status, core, backends, exceptions
-from . import parsers
+from . import db, parsers
 
 __all__ = [
     'aggregate',
+    'compression',
     'console',
     'csv',
     'html',
@@ -54,7 +55,7 @@ def html(input_):
     unparsed = parsers.parse_config(input_)[1]
 
     # Adding the parent is necissary to get the help options
-    parser = argparse.ArgumentParser(parents=[parsers.CONFIG])
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, db.DB])
     parser.add_argument("-o", "--overwrite",
                         action="store_true",
                         help="Overwrite existing directories")
@@ -72,19 +73,42 @@ def html(input_):
                              "given as arguments. This speeds up HTML "
                              "generation, but reduces the info in the HTML "
                              "pages. May be used multiple times")
+    parser.add_argument("--incremental",
+                        action="store_true",
+                        help="Update an existing summary, only rendering the "
+                             "pages of results that have changed since it "
+                             "was generated")
+    parser.add_argument("--paged",
+                        action="store_true",
+                        help="Only list the top level groups in the "
+                             "comparison pages, loading the tests in each "
+                             "group when it is expanded. Use this for "
+                             "results that are too large to view otherwise")
+    parser.add_argument("-j", "--jobs",
+                        type=int,
+                        default=core.PIGLIT_CONFIG.safe_get('core', 'jobs'),
+                        metavar='<int>',
+                        help="The number of processes to load the results "
+                             "and render the test pages with. Default is the "
+                             "number of CPUs. This value can also be set in "
+                             "piglit.conf.")
     parser.add_argument("summaryDir",
                         metavar="<Summary Directory>",
                         help="Directory to put HTML files in")
     parser.add_argument("resultsFiles",
                         metavar="<Results Files>",
                         nargs="*",
-                        help="Results files to include in HTML")
+                        help="Results files to include in HTML, or names "
+                             "of runs with --db")
     args = parser.parse_args(unparsed)
 
     # If args.list and args.resultsFiles are empty, then raise an error
     if not args.list and not args.resultsFiles:
         raise parser.error("Missing required option -l or <resultsFiles>")
 
+    if args.db and args.incremental:
+        parser.error('--incremental cannot be used with --db')
+
     # Convert the exclude_details list to status objects, without this using
     # the -e option will except
     if args.exclude_details:
@@ -102,7 +126,8 @@ def html(input_):
 
     # If the requested directory doesn't exist, create it or throw an error
     try:
-        core.check_dir(args.summaryDir, not args.overwrite)
+        core.check_dir(args.summaryDir,
+                       not (args.overwrite or args.incremental))
     except exceptions.PiglitException:
         raise exceptions.PiglitFatalError(
             '{} already exists.\n'
@@ -113,8 +138,13 @@ def html(input_):
     if args.list:
         args.resultsFiles.extend(core.parse_listfile(args.list))
 
+    # With a database the results are the names of runs in it
+    if args.db:
+        args.resultsFiles = db.load(args.db, args.resultsFiles)
+
     # Create the HTML output
-    summary.html(args.resultsFiles, args.summaryDir, args.exclude_details)
+    summary.html(args.resultsFiles, args.summaryDir, args.exclude_details,
+                 args.jobs, args.incremental, args.paged)
 
 
 @exceptions.handler
@@ -123,7 +153,7 @@ def console(input_):
     unparsed = parsers.parse_config(input_)[1]
 
     # Adding the parent is necissary to get the help options
-    parser = argparse.ArgumentParser(parents=[parsers.CONFIG])
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, db.DB])
 
     # Set the -d and -s options as exclusive, since it's silly to call for diff
     # and then call for only summary
@@ -148,11 +178,18 @@ def console(input_):
     parser.add_argument("-l", "--list",
                         action="store",
                         help="Use test results from a list file")
+    parser.add_argument("-j", "--jobs",
+                        type=int,
+                        default=core.PIGLIT_CONFIG.safe_get('core', 'jobs'),
+                        metavar='<int>',
+                        help="The number of processes to load the results "
+                             "with. Default is the number of CPUs. This "
+                             "value can also be set in piglit.conf.")
     parser.add_argument("results",
                         metavar="<Results Path(s)>",
                         nargs="+",
                         help="Space separated paths to at least one results "
-                             "file")
+                             "file, or names of runs with --db")
     args = parser.parse_args(unparsed)
 
     # Throw an error if -d/--diff is called, but only one results file is
@@ -165,8 +202,12 @@ def console(input_):
     if args.list:
         args.results.extend(core.parse_listfile(args.list))
 
+    # With a database the results are the names of runs in it
+    if args.db:
+        args.results = db.load(args.db, args.results)
+
     # Generate the output
-    summary.console(args.results, args.mode or 'all')
+    summary.console(args.results, args.mode or 'all', args.jobs)
 
 
 @exceptions.handler
@@ -174,7 +215,7 @@ def csv(input_):
     unparsed = parsers.parse_config(input_)[1]
 
     # Adding the parent is necissary to get the help options
-    parser = argparse.ArgumentParser(parents=[parsers.CONFIG])
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG, db.DB])
     parser.add_argument("-o", "--output",
                         metavar="<Output File>",
                         action="store",
@@ -183,13 +224,19 @@ def csv(input_):
                         help="Output filename")
     parser.add_argument("testResults",
                         metavar="<Input Files>",
-                        help="JSON results file to be converted")
+                        help="JSON results file to be converted, or the "
+                             "name of a run with --db")
     args = parser.parse_args(unparsed)
 
-    testrun = backends.load(args.testResults)
+    # The tests are written as they are read, so the results are never in
+    # memory all at once
+    if args.db:
+        tests = six.iteritems(db.load(args.db, [args.testResults])[0].tests)
+    else:
+        tests = backends.iter_tests(args.testResults)
 
     def write_results(output):
-        for name, result in six.iteritems(testrun.tests):
+        for name, result in tests:
             output.write("{},{},{},{}\n".format(name, result.time.total,
                                                 result.returncode,
                                                 result.result))
@@ -246,12 +293,50 @@ def aggregate(input_):
         outfile, backends.compression.get_mode()))
 
 
+@exceptions.handler
+def compression(input_):
+    """Print the ratio and speed of each compression mode on a results file."""
+    unparsed = parsers.parse_config(input_)[1]
+
+    parser = argparse.ArgumentParser(parents=[parsers.CONFIG])
+    parser.add_argument("-m", "--mode",
+                        action="append",
+                        choices=sorted(backends.compression.COMPRESSORS),
+                        help="Only measure this compression mode. May be "
+                             "used multiple times. Default is every mode")
+    parser.add_argument("results",
+                        metavar="<Results File>",
+                        help="The results file to compress, which may "
+                             "itself be compressed")
+    args = parser.parse_args(unparsed)
+
+    stats = backends.compression.benchmark(
+        args.results, set(args.mode) | {'none'} if args.mode else None)
+    size = dict((s[0], s[1]) for s in stats)['none']
+    megabytes = size / (1024 * 1024)
+
+    print('{:<6} {:>12} {:>7} {:>14} {:>16}'.format(
+        'mode', 'size', 'ratio', 'compress MB/s', 'decompress MB/s'))
+    for mode, compressed, compress, decompress in stats:
+        print('{:<6} {:>12} {:>7.2f} {:>14.1f} {:>16.1f}'.format(
+            mode, compressed, size / max(compressed, 1),
+            megabytes / max(compress, 1e-6),
+            megabytes / max(decompress, 1e-6)))
+
+
 @exceptions.handler
 def feature(input_):
     parser = argparse.ArgumentParser()
     parser.add_argument("-o", "--overwrite",
                         action="store_true",
                         help="Overwrite existing directories")
+    parser.add_argument("-j", "--jobs",
+                        type=int,
+                        default=core.PIGLIT_CONFIG.safe_get('core', 'jobs'),
+                        metavar='<int>',
+                        help="The number of processes to load the results "
+                             "with. Default is the number of CPUs. This "
+                             "value can also be set in piglit.conf.")
     parser.add_argument("featureFile",
                         metavar="<Feature json file>",
                         help="Json file containing the features description")
@@ -279,4 +364,5 @@ def feature(input_):
     # If the requested directory doesn't exist, create it or throw an error
     core.checkDir(args.summaryDir, not args.overwrite)
 
-    summary.feat(args.resultsFiles, args.summaryDir, args.featureFile)
+    summary.feat(args.resultsFiles, args.summaryDir, args.featureFile,
+                 args.jobs)
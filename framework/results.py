@@ -27,6 +27,7 @@ from __future__ import (
 import collections
 import copy
 import datetime
+import sys
 
 import six
 
@@ -37,23 +38,49 @@ __all__ = [
     'TestResult',
 ]
 
+# Interning the names of subtests saves memory when there are many of them.
+# Only byte strings can be interned on python 2, where names are unicode.
+_intern = sys.intern if six.PY3 else lambda name: name
+
 
 class Subtests(collections.MutableMapping):
-    """A dict-like object that stores Statuses as values."""
+    """A dict-like object that stores Statuses as values.
+
+    Some tests have tens of thousands of subtests, so this is kept small: the
+    names are interned, so that the names shared by the results of many runs
+    (or by the subtests of many tests) are only stored once, and the worst
+    status is cached, so that TestResult.result doesn't have to look at every
+    subtest each time it is used.
+
+    """
+    __slots__ = ['__container', '__worst']
+
     def __init__(self, dict_=None):
         self.__container = {}
+        # The worst status, or None if it has to be found again
+        self.__worst = None
 
         if dict_ is not None:
             self.update(dict_)
 
     def __setitem__(self, name, value):
-        self.__container[name.lower()] = status.status_lookup(value)
+        name = _intern(name.lower())
+        value = status.status_lookup(value)
+        if name in self.__container:
+            # Replacing the worst status can make any other subtest the worst
+            self.__worst = None
+        elif self.__worst is not None and value > self.__worst:
+            self.__worst = value
+        elif not self.__container:
+            self.__worst = value
+        self.__container[name] = value
 
     def __getitem__(self, name):
         return self.__container[name.lower()]
 
     def __delitem__(self, name):
         del self.__container[name.lower()]
+        self.__worst = None
 
     def __iter__(self):
         return iter(self.__container)
@@ -64,6 +91,20 @@ class Subtests(collections.MutableMapping):
     def __repr__(self):
         return repr(self.__container)
 
+    def __reduce__(self):
+        return (Subtests, (self.__container, ))
+
+    def worst(self):
+        """Return the worst status of the subtests.
+
+        This is max() of the statuses, and like max() it raises a ValueError
+        if there are no subtests.
+
+        """
+        if self.__worst is None:
+            self.__worst = max(six.itervalues(self.__container))
+        return self.__worst
+
     def to_json(self):
         res = dict(self)
         res['__type__'] = 'Subtests'
@@ -180,7 +221,7 @@ class TestResult(object):
 
         """
         if self.subtests and self.__result != status.CRASH:
-            return max(six.itervalues(self.subtests))
+            return self.subtests.worst()
         return self.__result
 
     @result.setter
@@ -290,6 +331,65 @@ class Totals(dict):
         return tots
 
 
+class _Tests(collections.OrderedDict):
+    """The tests of a TestrunResult.
+
+    This is an OrderedDict that keeps an index of the name of every test and
+    subtest, which is thrown away whenever a test is added or removed.
+
+    """
+    def __init__(self, *args, **kwargs):
+        self.__index = None
+        super(_Tests, self).__init__(*args, **kwargs)
+
+    @property
+    def index(self):
+        """A dict mapping each test and subtest name to a tuple of the name of
+        the test and the name of the subtest (or None).
+
+        A test shadows a subtest of the same name, just as it does in
+        TestrunResult.get_result.
+
+        """
+        if self.__index is None:
+            index = {}
+            for name, test in six.iteritems(self):
+                for subtest in test.subtests:
+                    index[grouptools.join(name, subtest)] = (name, subtest)
+            for name in self:
+                index[name] = (name, None)
+            self.__index = index
+        return self.__index
+
+    def __setitem__(self, key, value):
+        self.__index = None
+        super(_Tests, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.__index = None
+        super(_Tests, self).__delitem__(key)
+
+    def pop(self, *args):
+        self.__index = None
+        return super(_Tests, self).pop(*args)
+
+    def popitem(self, *args, **kwargs):
+        self.__index = None
+        return super(_Tests, self).popitem(*args, **kwargs)
+
+    def setdefault(self, *args):
+        self.__index = None
+        return super(_Tests, self).setdefault(*args)
+
+    def clear(self):
+        self.__index = None
+        super(_Tests, self).clear()
+
+    def __reduce__(self):
+        # Don't pickle the index, it is cheap to rebuild
+        return self.__class__, (list(six.iteritems(self)),)
+
+
 class TestrunResult(object):
     """The result of a single piglit run."""
     def __init__(self):
@@ -301,9 +401,41 @@ class TestrunResult(object):
         self.clinfo = None
         self.lspci = None
         self.time_elapsed = TimeAttribute()
-        self.tests = collections.OrderedDict()
+        self.tests = _Tests()
         self.totals = collections.defaultdict(Totals)
 
+    @property
+    def tests(self):
+        """An OrderedDict of test names to TestResults."""
+        return self.__dict__['tests']
+
+    @tests.setter
+    def tests(self, value):
+        if not isinstance(value, _Tests):
+            value = _Tests(value)
+        self.__dict__['tests'] = value
+
+    def resolve(self, key):
+        """Find a test or subtest.
+
+        Returns a tuple of the name of the test, and the name of the subtest
+        or None if key is a test. A KeyError is raised if there is no such
+        test or subtest.
+
+        Arguments:
+        key -- the name of a test or subtest
+
+        """
+        try:
+            return self.tests.index[key]
+        except KeyError as e:
+            # Subtests that were added to a test after the index was built,
+            # or that were looked up with a different case.
+            name, subtest = grouptools.splitname(key)
+            if name in self.tests and subtest in self.tests[name].subtests:
+                return name, subtest
+            raise e
+
     def get_result(self, key):
         """Get the result of a test or subtest.
 
@@ -315,36 +447,65 @@ class TestrunResult(object):
         key -- the key name of the test to return
 
         """
-        try:
-            return self.tests[key].result
-        except KeyError as e:
-            name, test = grouptools.splitname(key)
-            try:
-                return self.tests[name].subtests[test]
-            except KeyError:
-                raise e
+        name, subtest = self.resolve(key)
+        if subtest is None:
+            return self.tests[name].result
+        return self.tests[name].subtests[subtest]
+
+    def iter_results(self):
+        """Iterate over (name, status) pairs of every test and subtest.
+
+        Tests with subtests are included as well as their subtests.
+
+        """
+        for key, (name, subtest) in six.iteritems(self.tests.index):
+            if subtest is None:
+                yield key, self.tests[name].result
+            else:
+                yield key, self.tests[name].subtests[subtest]
+
+    def update_metadata(self, other):
+        """Copy every value except the tests from another TestrunResult."""
+        for key, value in six.iteritems(vars(other)):
+            if key != 'tests':
+                setattr(self, key, value)
 
     def calculate_group_totals(self):
         """Calculate the number of pases, fails, etc at each level."""
         for name, result in six.iteritems(self.tests):
-            # If there are subtests treat the test as if it is a group instead
-            # of a test.
-            if result.subtests:
-                for res in six.itervalues(result.subtests):
-                    res = str(res)
-                    temp = name
-
-                    self.totals[temp][res] += 1
-                    while temp:
-                        temp = grouptools.groupname(temp)
-                        self.totals[temp][res] += 1
-                    self.totals['root'][res] += 1
-            else:
-                res = str(result.result)
-                while name:
-                    name = grouptools.groupname(name)
-                    self.totals[name][res] += 1
-                self.totals['root'][res] += 1
+            self.add_totals(self.totals, name, result)
+
+    @staticmethod
+    def add_totals(totals, name, result):
+        """Count a single TestResult in totals.
+
+        This is what calculate_group_totals does for each test, it allows the
+        totals to be built up one test at a time.
+
+        Arguments:
+        totals -- a defaultdict of Totals to add to
+        name -- the name of the test
+        result -- a TestResult instance
+
+        """
+        # If there are subtests treat the test as if it is a group instead
+        # of a test.
+        if result.subtests:
+            for res in six.itervalues(result.subtests):
+                res = str(res)
+                temp = name
+
+                totals[temp][res] += 1
+                while temp:
+                    temp = grouptools.groupname(temp)
+                    totals[temp][res] += 1
+                totals['root'][res] += 1
+        else:
+            res = str(result.result)
+            while name:
+                name = grouptools.groupname(name)
+                totals[name][res] += 1
+            totals['root'][res] += 1
 
     def to_json(self):
         if not self.totals:
@@ -379,8 +540,8 @@ class TestrunResult(object):
         if 'time_elapsed' in dict_:
             setattr(res, 'time_elapsed',
                     TimeAttribute.from_dict(dict_['time_elapsed']))
-        res.tests = collections.OrderedDict((n, TestResult.from_dict(t))
-                    for n, t in six.iteritems(dict_['tests']))
+        res.tests = _Tests((n, TestResult.from_dict(t))
+                           for n, t in six.iteritems(dict_['tests']))
 
         if not 'totals' in dict_ and not _no_totals:
             res.calculate_group_totals()
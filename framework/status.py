@@ -210,6 +210,11 @@ class Status(object):
     def __hash__(self):
         return hash(self.name)
 
+    def __reduce__(self):
+        # Statuses are singletons, so make sure that unpickling (for example
+        # a result returned from a worker process) returns the same instance.
+        return status_lookup, (self.name,)
+
 
 class NoChangeStatus(Status):
     """ Special sublcass of status that overides rich comparison methods
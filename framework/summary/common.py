@@ -25,17 +25,123 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import collections
+import itertools
+import multiprocessing
 import re
 import operator
 
 import six
-from six.moves import zip
+from six.moves import range, zip
+from six.moves import cPickle as pickle
 
 # a local variable status exists, prevent accidental overloading by renaming
 # the module
 import framework.status as so
 from framework.core import lazy_property
-from framework import grouptools
+from framework import backends, grouptools, results as results_
+
+
+# The code of each status in a StatusMatrix. The statuses before SKIP are in
+# ascending order of severity, so their codes can be compared directly.
+_CODES = {s: i for i, s in enumerate(so.ALL)}
+_SKIP = _CODES[so.SKIP]
+_NOTRUN = _CODES[so.NOTRUN]
+_INCOMPLETE_CODE = _CODES[so.INCOMPLETE]
+
+# The code of a test that isn't in a run at all
+MISSING = len(so.ALL)
+_CODES[None] = MISSING
+
+# Shifts a code into the high nibble of a byte, to be combined with another
+# code to look up a pair of statuses
+_SHIFT = bytes(bytearray((c << 4) & 0xff for c in range(256)))
+
+
+def _single_table(func):
+    """Create a translation table from func(code) for single statuses."""
+    table = bytearray(256)
+    for code in range(MISSING + 1):
+        table[code] = bool(func(code))
+    return bytes(table)
+
+
+def _pair_table(func):
+    """Create a translation table from func(prev, cur) for pairs of statuses.
+    """
+    table = bytearray(256)
+    for prev in range(MISSING + 1):
+        for cur in range(MISSING + 1):
+            table[prev << 4 | cur] = bool(func(prev, cur))
+    return bytes(table)
+
+
+def _changed(prev, cur):
+    if MISSING not in (prev, cur):
+        return prev != cur
+    # A missing test is treated as notrun, but a change between skip and a
+    # missing test isn't interesting
+    prev = _NOTRUN if prev == MISSING else prev
+    cur = _NOTRUN if cur == MISSING else cur
+    return prev != cur and {prev, cur} != {_SKIP, _NOTRUN}
+
+
+_PROBLEMS = _single_table(lambda x: 0 < x < _SKIP)
+_SKIPS = _single_table(lambda x: x == _SKIP)
+_INCOMPLETE = _single_table(lambda x: x == _INCOMPLETE_CODE)
+
+_CHANGES = _pair_table(_changed)
+# Requiring both statuses to be before SKIP eliminates NOTRUN, SKIP, and
+# missing tests from regressions and fixes
+_REGRESSIONS = _pair_table(lambda x, y: x < y < _SKIP)
+_FIXES = _pair_table(lambda x, y: y < x < _SKIP)
+_ENABLED = _pair_table(
+    lambda x, y: y != MISSING and x in (MISSING, _NOTRUN) and
+    (x == MISSING or y != _NOTRUN))
+_DISABLED = _pair_table(
+    lambda x, y: x != MISSING and y in (MISSING, _NOTRUN) and
+    (y == MISSING or x != _NOTRUN))
+
+
+class StatusMatrix(object):
+    """A matrix of the status of every test in every run.
+
+    Each run is a column of one byte status codes, with a row for each name.
+    Each category of names is described by a translation table from the code
+    (or pair of codes for comparisons between runs) to a truthy or falsy
+    byte, so that finding the names in a category doesn't require calling
+    any python code per test.
+
+    Arguments:
+    results -- a list of results.TestrunResult instances
+    names -- an iterable of test names
+
+    """
+    def __init__(self, results, names):
+        self.names = list(names)
+        self.columns = []
+        for res in results:
+            self.columns.append(bytearray(
+                map(_CODES.__getitem__,
+                    map(dict(res.iter_results()).get, self.names))))
+
+    @lazy_property
+    def pairs(self):
+        """A column of the code of each pair of consecutive runs."""
+        return [bytearray(map(operator.or_, prev.translate(_SHIFT), cur))
+                for prev, cur in zip(self.columns[:-1], self.columns[1:])]
+
+    def single(self, table):
+        """Return a set of the names in each run matching table."""
+        return [set(itertools.compress(self.names, c.translate(table)))
+                for c in self.columns]
+
+    def diff(self, table):
+        """Return a set of the names in each pair of consecutive runs matching
+        table.
+        """
+        return [set(itertools.compress(self.names, c.translate(table)))
+                for c in self.pairs]
 
 
 class Results(object):  # pylint: disable=too-few-public-methods
@@ -76,19 +182,20 @@ class Names(object):
     def __init__(self, tests):
         self.__results = tests.results
 
-    def __diff(self, comparator, handler=None):
-        """Helper for simplifying comparators using find_diffs."""
+    def __diff(self, table):
+        """Helper for simplifying comparators using the status matrix."""
         ret = ['']
-        if handler is None:
-            ret.extend(find_diffs(self.__results, self.all, comparator))
-        else:
-            ret.extend(find_diffs(self.__results, self.all, comparator,
-                                  handler=handler))
+        ret.extend(self.matrix.diff(table))
         return ret
 
-    def __single(self, comparator):
-        """Helper for simplifying comparators using find_single."""
-        return find_single(self.__results, self.all, comparator)
+    def __single(self, table):
+        """Helper for simplifying comparators using the status matrix."""
+        return self.matrix.single(table)
+
+    @lazy_property
+    def matrix(self):
+        """A StatusMatrix of all tests in all runs."""
+        return StatusMatrix(self.__results, self.all)
 
     @lazy_property
     def all(self):
@@ -105,72 +212,35 @@ class Names(object):
 
     @lazy_property
     def changes(self):
-        def handler(names, name, prev, cur):
-            """Handle missing tests.
-
-            For changes we want literally anything where the first result
-            isn't the same as the second result.
-
-            """
-            def _get(res):
-                try:
-                    return res.get_result(name)
-                except KeyError:
-                    return so.NOTRUN
-
-            # Add any case of a != b except skip <-> notrun
-            cur = _get(cur)
-            prev = _get(prev)
-            if cur != prev and {cur, prev} != {so.SKIP, so.NOTRUN}:
-                names.add(name)
-
-        return self.__diff(operator.ne, handler=handler)
+        return self.__diff(_CHANGES)
 
     @lazy_property
     def problems(self):
-        return self.__single(lambda x: x > so.PASS)
+        return self.__single(_PROBLEMS)
 
     @lazy_property
     def skips(self):
-        # It is critical to use is not == here, otherwise so.NOTRUN will also
-        # be added to this list
-        return self.__single(lambda x: x is so.SKIP)
+        return self.__single(_SKIPS)
 
     @lazy_property
     def regressions(self):
-        # By ensureing tha min(x, y) is >= so.PASS we eleminate NOTRUN and SKIP
-        # from these pages
-        return self.__diff(lambda x, y: x < y and min(x, y) >= so.PASS)
+        return self.__diff(_REGRESSIONS)
 
     @lazy_property
     def fixes(self):
-        # By ensureing tha min(x, y) is >= so.PASS we eleminate NOTRUN and SKIP
-        # from these pages
-        return self.__diff(lambda x, y: x > y and min(x, y) >= so.PASS)
+        return self.__diff(_FIXES)
 
     @lazy_property
     def enabled(self):
-        def handler(names, name, prev, cur):
-            if _result_in(name, cur) and not _result_in(name, prev):
-                names.add(name)
-
-        return self.__diff(
-            lambda x, y: x is so.NOTRUN and y is not so.NOTRUN,
-            handler=handler)
+        return self.__diff(_ENABLED)
 
     @lazy_property
     def disabled(self):
-        def handler(names, name, prev, cur):
-            if _result_in(name, prev) and not _result_in(name, cur):
-                names.add(name)
-
-        return self.__diff(
-            lambda x, y: x is not so.NOTRUN and y is so.NOTRUN,
-            handler=handler)
+        return self.__diff(_DISABLED)
 
     @lazy_property
     def incomplete(self):
-        return self.__single(lambda x: x is so.INCOMPLETE)
+        return self.__single(_INCOMPLETE)
 
     @lazy_property
     def all_changes(self):
@@ -271,6 +341,87 @@ class Counts(object):
         return [len(x) for x in self.__names.incomplete]
 
 
+# The values of a TestResult that the summaries don't use, and which can be
+# large
+_UNUSED = ['command', 'environment', 'dmesg', 'traceback', 'out', 'err']
+
+
+def load_results(result, lazy=False, stream=False):
+    """Return a TestrunResult for result.
+
+    Arguments:
+    result -- either the path to a results file, which is loaded, or a
+              TestrunResult that has already been loaded (for example from a
+              results database), which is returned as is.
+
+    Keyword Arguments:
+    lazy -- passed to backends.load
+    stream -- If True the tests are read one at a time, and the values of
+              each test that summaries don't use (like the output) are
+              thrown away as they are read, so memory use doesn't depend on
+              the size of the output. This takes precedence over lazy.
+
+    """
+    if isinstance(result, results_.TestrunResult):
+        return result
+    elif not stream:
+        return backends.load(result, lazy=lazy)
+
+    empty = results_.TestResult()
+    testrun = results_.TestrunResult()
+    tests = collections.OrderedDict()
+    for name, test in backends.iter_tests(result, testrun):
+        for attr in _UNUSED:
+            setattr(test, attr, getattr(empty, attr))
+        tests[name] = test
+    testrun.tests = tests
+
+    if not testrun.totals:
+        testrun.calculate_group_totals()
+    return testrun
+
+
+def _load_packed(args):
+    """Load a result in a worker of load_all.
+
+    The TestrunResult is returned pickled with the highest protocol, which is
+    considerably smaller and quicker to unpickle than the protocol the pool
+    would otherwise use to send it back.
+
+    """
+    result, stream = args
+    return pickle.dumps(load_results(result, stream=stream),
+                        pickle.HIGHEST_PROTOCOL)
+
+
+def load_all(results, jobs=1, lazy=False, stream=False):
+    """Return a list of a TestrunResult for each of results.
+
+    This is load_results for many results, which loads jobs of the results
+    files at once in separate processes, or one per CPU if jobs is None.
+    Lazily loaded results are always loaded in this process, since sending
+    one between processes would read the whole file anyway.
+
+    """
+    jobs = jobs or multiprocessing.cpu_count()
+    paths = [r for r in results
+             if not isinstance(r, results_.TestrunResult)]
+    if lazy or jobs == 1 or len(paths) < 2:
+        return [load_results(r, lazy=lazy, stream=stream) for r in results]
+
+    pool = multiprocessing.Pool(min(jobs, len(paths)))
+    try:
+        loaded = pool.map(_load_packed, [(p, stream) for p in paths], 1)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    loaded = iter(loaded)
+    return [r if isinstance(r, results_.TestrunResult)
+            else pickle.loads(next(loaded)) for r in results]
+
+
 def escape_filename(key):
     """Avoid reserved characters in filenames."""
     return re.sub(r'[<>:"|?*#]', '_', key)
@@ -281,17 +432,6 @@ def escape_pathname(key):
     return re.sub(r'[/\\]', '_', key)
 
 
-def _result_in(name, result):
-    """If a result (or a subtest result) exists return True, else False."""
-    try:
-        # This is a little hacky, but I don't know of a better way where we
-        # ensure the value is truthy
-        _ = result.get_result(name)
-        return True
-    except KeyError:
-        return False
-
-
 def find_diffs(results, tests, comparator, handler=lambda *a: None):
     """Generate diffs between two or more sets of results.
 
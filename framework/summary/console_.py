@@ -29,8 +29,8 @@ import textwrap
 
 import six
 
-from framework import grouptools, backends
-from .common import Results
+from framework import grouptools
+from .common import Results, load_all
 
 __all__ = [
     'console',
@@ -97,10 +97,14 @@ def _print_result(results, list_):
             statuses=' '.join(str(r) for r in results.get_result(test))))
 
 
-def console(results, mode):
-    """ Write summary information to the console """
+def console(results, mode, jobs=1):
+    """Write summary information to the console.
+
+    The results are loaded by jobs processes, or one per CPU if jobs is None.
+
+    """
     assert mode in ['summary', 'diff', 'incomplete', 'all'], mode
-    results = Results([backends.load(r) for r in results])
+    results = Results(load_all(results, jobs, stream=True))
 
     # Print the name of the test and the status from each test run
     if mode == 'all':
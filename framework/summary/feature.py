@@ -79,7 +79,7 @@ class FeatResults(object):  # pylint: disable=too-few-public-methods
                 profile_set = set(a for a, _ in profiles[feature].itertests())
 
                 common_set = profile_set & result_set
-                passed_list = [x for x in common_set if results.tests[x].result == status.PASS]
+                passed_list = [x for x in common_set if results.get_result(x) == status.PASS]
 
                 total = len(common_set)
                 passed = len(passed_list)
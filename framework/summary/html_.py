@@ -25,9 +25,14 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import collections
 import errno
 import getpass
+import hashlib
+import json
+import multiprocessing
 import os
+import posixpath
 import shutil
 import sys
 import tempfile
@@ -38,9 +43,9 @@ import six
 
 # a local variable status exists, prevent accidental overloading by renaming
 # the module
-from framework import backends, exceptions, core
+from framework import backends, exceptions, core, grouptools, status
 
-from .common import Results, escape_filename, escape_pathname
+from .common import Results, escape_filename, escape_pathname, load_all
 from .feature import FeatResults
 
 __all__ = [
@@ -58,6 +63,17 @@ _TEMP_DIR = os.path.join(
 
 _TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), '../..', 'templates')
 
+# The manifest of an incremental summary, which records which results each
+# run's pages were rendered from.
+_MANIFEST = 'manifest.pickle'
+
+# Bump this whenever the format of the manifest changes.
+_MANIFEST_VERSION = 1
+
+# Changing these changes the pages of each run, so they invalidate the whole
+# manifest.
+_RUN_TEMPLATES = ['testrun_info.mako', 'test_result.mako']
+
 # To ease the bytes/str/uincode between python 2 and python 3 the
 # output_encoding keyword is set below. This means that in both python 2 and 3
 # bytes are returned. This means that the files need to be opened in bytes mode
@@ -76,22 +92,85 @@ def _copy_static_files(destination):
                 os.path.join(destination, "result.css"))
 
 
-def _make_testrun_info(results, destination, exclude=None):
-    """Create the pages for each results file."""
+def _duplicate_name(name):
+    """Return the error for two runs with the same name."""
+    return exceptions.PiglitFatalError(
+        'Two or more of your results have the same "name" '
+        'attribute. Try changing one or more of the "name" '
+        'values in your json files.\n'
+        'Duplicate value: {}'.format(name))
+
+
+def _init_worker():
+    """Compile the test page template once in each worker process."""
+    _TEMPLATES.get_template('test_result.mako')
+
+
+def _write_test_page(page):
+    """Render a single test's page.
+
+    Arguments:
+    page -- a tuple of the path of the page, the name of the test, the
+            TestResult, and the paths of the css and index relative to the
+            page.
+
+    """
+    html_path, testname, value, css, index = page
+    with open(html_path, 'wb') as out:
+        out.write(_TEMPLATES.get_template('test_result.mako').render(
+            testname=testname, value=value, css=css, index=index))
+
+
+def _write_test_pages(pages, jobs):
+    """Render each of pages, using jobs processes."""
+    if jobs == 1 or len(pages) < 2:
+        for page in pages:
+            _write_test_page(page)
+        return
+
+    pool = multiprocessing.Pool(jobs, _init_worker)
+    try:
+        for _ in pool.imap_unordered(_write_test_page, pages,
+                                     max(1, len(pages) // (jobs * 16))):
+            pass
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _make_testrun_info(results, destination, exclude=None, jobs=1,
+                       reuse=frozenset()):
+    """Create the pages for each results file.
+
+    Arguments:
+    results -- a Results instance
+    destination -- the directory to write the pages to
+
+    Keyword Arguments:
+    exclude -- a container of statuses for which no test pages are written
+    jobs -- the number of processes to render the test pages with. If None
+            the number of CPUs is used. Default: 1
+    reuse -- a container of the names of runs whose pages have already been
+             rendered, and are left as they are.
+
+    """
     exclude = exclude or {}
+    jobs = jobs or multiprocessing.cpu_count()
     result_css = os.path.join(destination, "result.css")
     index = os.path.join(destination, "index.html")
+    pages = []
+    dirs = set()
 
     for each in results.results:
         name = escape_pathname(each.name)
+        if name in reuse:
+            continue
+
         try:
             core.check_dir(os.path.join(destination, name), True)
         except exceptions.PiglitException:
-            raise exceptions.PiglitFatalError(
-                'Two or more of your results have the same "name" '
-                'attribute. Try changing one or more of the "name" '
-                'values in your json files.\n'
-                'Duplicate value: {}'.format(name))
+            raise _duplicate_name(name)
 
         with open(os.path.join(destination, name, "index.html"), 'wb') as out:
             out.write(_TEMPLATES.get_template('testrun_info.mako').render(
@@ -104,22 +183,25 @@ def _make_testrun_info(results, destination, exclude=None):
                 clinfo=each.clinfo,
                 lspci=each.lspci))
 
-        # Then build the individual test results
+        # Then collect the individual test results
         for key, value in six.iteritems(each.tests):
+            if value.result in exclude:
+                continue
+
             html_path = os.path.join(destination, name,
                                      escape_filename(key + ".html"))
             temp_path = os.path.dirname(html_path)
+            dirs.add(temp_path)
+            pages.append((html_path, key, value,
+                          os.path.relpath(result_css, temp_path),
+                          os.path.relpath(index, temp_path)))
 
-            if value.result not in exclude:
-                core.check_dir(temp_path)
+    # Create every directory before any page is written, so that the workers
+    # don't need to check for them.
+    for dir_ in dirs:
+        core.check_dir(dir_)
 
-                with open(html_path, 'wb') as out:
-                    out.write(_TEMPLATES.get_template(
-                        'test_result.mako').render(
-                            testname=key,
-                            value=value,
-                            css=os.path.relpath(result_css, temp_path),
-                            index=os.path.relpath(index, temp_path)))
+    _write_test_pages(pages, jobs)
 
 
 def _make_comparison_pages(results, destination, exclude):
@@ -154,6 +236,166 @@ def _make_comparison_pages(results, destination, exclude):
                         page=page, pages=pages))
 
 
+def _group_result(result, group):
+    """Get the worst status in a group."""
+    if group not in result.totals:
+        return status.NOTRUN
+
+    return max([status.status_lookup(s) for s, v in
+                six.iteritems(result.totals[group]) if v > 0])
+
+
+def _group_fraction(result, group):
+    """Get the fraction value for a group."""
+    if group not in result.totals:
+        return '0/0'
+
+    num = 0
+    den = 0
+    for k, v in six.iteritems(result.totals[group]):
+        if v > 0:
+            s = status.status_lookup(k)
+            num += s.fraction[0] * v
+            den += s.fraction[1] * v
+
+    return '{}/{}'.format(num, den)
+
+
+def _group_cells(results, group):
+    """Return the status and fraction of a group in each run."""
+    return [[six.text_type(_group_result(r, group)), _group_fraction(r, group)]
+            for r in results.results]
+
+
+def _normalize_href(href):
+    """Force backward slashes in URLs, like normalize_href in the templates.
+    """
+    return href.replace('\\', '/')
+
+
+def _test_cells(results, name, exclude):
+    """Return the status of a test in each run, and the link to its page."""
+    cells = []
+    for res in results.results:
+        try:
+            test, subtest = res.resolve(name)
+        except KeyError:
+            cells.append([six.text_type(status.NOTRUN), None])
+            continue
+
+        if subtest is None:
+            result = res.tests[test].result
+        else:
+            result = res.tests[test].subtests[subtest]
+
+        href = None
+        if six.text_type(result) not in exclude and result is not status.NOTRUN:
+            # This must be posixpath, since we want /'s not \'s
+            href = _normalize_href(posixpath.join(
+                escape_pathname(res.name), escape_filename(test)) + '.html')
+        cells.append([six.text_type(result), href])
+    return cells
+
+
+def _group_rows(results, top, names, exclude):
+    """Return the rows of the groups and tests under top.
+
+    Each row is a list of the depth, the name, whether the row is a test, and
+    the cells of each run. This is the format the paged index expects.
+
+    """
+    rows = []
+    current = top
+    for name in names:
+        group = grouptools.groupname(name)
+        common = grouptools.commonprefix((current, group))
+        common = grouptools.split(common)
+        for elem in grouptools.split(group)[len(common):]:
+            common.append(elem)
+            rows.append([len(common) - 1, elem, False,
+                         _group_cells(results, grouptools.join(*common))])
+        current = group
+
+        rows.append([len(common), grouptools.testname(name), True,
+                     _test_cells(results, name, exclude)])
+    return rows
+
+
+def _make_paged_comparison_page(results, destination, page, pages, exclude):
+    """Create a paged comparison page.
+
+    Only the top level groups are in the page, the rows of each group are
+    written to a script in data/<page>/, which the page loads when the group
+    is expanded.
+
+    """
+    filename = 'index' if page == 'all' else page
+    names = getattr(results.names, page if page == 'all' else 'all_' + page)
+    data = posixpath.join('data', filename)
+    core.check_dir(os.path.join(destination, data))
+
+    # Group the names by their top level group, tests that aren't in a group
+    # are listed on the page itself
+    tops = collections.OrderedDict()
+    for name in sorted(names):
+        top = grouptools.split(name)[0]
+        if top == name:
+            tops[(name, True)] = None
+        else:
+            tops.setdefault((top, False), []).append(name)
+
+    entries = []
+    for n, ((top, is_test), members) in enumerate(six.iteritems(tops)):
+        if is_test:
+            entries.append((top, True, _test_cells(results, top, exclude), n))
+            continue
+
+        entries.append((top, False, _group_cells(results, top), n))
+        rows = _group_rows(results, top, members, exclude)
+        with open(os.path.join(destination, data, '{}.js'.format(n)),
+                  'w') as out:
+            out.write('piglit.rows({}, {});\n'.format(
+                n, json.dumps(rows, separators=(',', ':'))))
+
+    runs = [(r.name,
+             _normalize_href(
+                 posixpath.join(escape_pathname(r.name), 'index.html')),
+             six.text_type(_group_result(r, 'root')),
+             _group_fraction(r, 'root'))
+            for r in results.results]
+
+    with open(os.path.join(destination, filename + '.html'), 'wb') as out:
+        out.write(_TEMPLATES.get_template('paged_index.mako').render(
+            page=page,
+            pages=pages,
+            data=data,
+            runs=runs,
+            entries=entries))
+
+
+def _make_paged_comparison_pages(results, destination, exclude):
+    """Create the pages of comparisons, with the rows of each group loaded
+    on demand.
+    """
+    pages = frozenset(['changes', 'problems', 'skips', 'fixes',
+                       'regressions', 'enabled', 'disabled'])
+
+    # Remove the rows of a previous summary, which may have had more groups
+    # or pages than this one.
+    shutil.rmtree(os.path.join(destination, 'data'), ignore_errors=True)
+
+    _make_paged_comparison_page(results, destination, 'all', pages, exclude)
+    for page in pages:
+        if sum(getattr(results.counts, page)) > 0:
+            _make_paged_comparison_page(results, destination, page, pages,
+                                        exclude)
+        else:
+            with open(os.path.join(destination, page + '.html'), 'wb') as out:
+                out.write(
+                    _TEMPLATES.get_template('empty_status.mako').render(
+                        page=page, pages=pages))
+
+
 def _make_feature_info(results, destination):
     """Create the feature readiness page."""
 
@@ -162,7 +404,87 @@ def _make_feature_info(results, destination):
             results=results))
 
 
-def html(results, destination, exclude):
+def _hash_results(path):
+    """Return a hash of the contents of a results file or directory."""
+    if os.path.isdir(path):
+        files = sorted(os.path.join(dirpath, f)
+                       for dirpath, _, filenames in os.walk(path)
+                       for f in filenames)
+    else:
+        files = [path]
+
+    hash_ = hashlib.sha1()
+    for file_ in files:
+        hash_.update(os.path.relpath(file_, path).encode('utf-8'))
+        with open(file_, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hash_.update(chunk)
+    return hash_.hexdigest()
+
+
+def _manifest_key():
+    """Return the key the manifest is written with."""
+    hash_ = hashlib.sha1()
+    for template in _RUN_TEMPLATES:
+        with open(os.path.join(_TEMPLATE_DIR, template), 'rb') as f:
+            hash_.update(f.read())
+    return _MANIFEST_VERSION, hash_.hexdigest()
+
+
+def _incremental(results, destination, exclude, jobs=1):
+    """Load results, reusing the pages of any that haven't changed.
+
+    Results that have changed are loaded by jobs processes.
+
+    Returns a Results instance, a set of the names of the runs whose pages
+    can be reused, and the new manifest, which is a dict mapping the name of
+    each run to a tuple of the hash of its results and the statuses that were
+    excluded.
+
+    """
+    filename = os.path.join(destination, _MANIFEST)
+    key = _manifest_key()
+    old = core.read_cache(filename, key) or {}
+    exclude = frozenset(six.text_type(s) for s in exclude)
+    hashes = set(h for h, _ in six.itervalues(old))
+
+    hashed = [(p, _hash_results(p)) for p in results]
+    changed = [p for p, h in hashed if h not in hashes]
+    changed = dict(zip(changed, load_all(changed, jobs)))
+
+    runs = []
+    manifest = {}
+    for path, hash_ in hashed:
+        # The pages of unchanged runs aren't rendered, so there's no point in
+        # reading the rest of each test
+        run = changed[path] if hash_ not in hashes else \
+            backends.load(path, lazy=True)
+        runs.append(run)
+
+        name = escape_pathname(run.name)
+        if name in manifest:
+            raise _duplicate_name(name)
+        manifest[name] = (hash_, exclude)
+
+    reuse = set(
+        n for n, v in six.iteritems(manifest) if old.get(n) == v and
+        os.path.exists(os.path.join(destination, n, 'index.html')))
+
+    # Remove the pages of every other run, including those that are no longer
+    # being summarized.
+    for name in (set(old) | set(manifest)) - reuse:
+        if name in ('', os.curdir, os.pardir):
+            continue
+        shutil.rmtree(os.path.join(destination, name), ignore_errors=True)
+
+    # Until every run has been rendered only the reused runs are valid.
+    core.write_cache(filename, key, {n: manifest[n] for n in reuse})
+
+    return Results(runs), reuse, manifest
+
+
+def html(results, destination, exclude, jobs=1, incremental=False,
+         paged=False):
     """
     Produce HTML summaries.
 
@@ -171,18 +493,45 @@ def html(results, destination, exclude):
     The beauty of this approach is that mako is leveraged to do the
     heavy lifting, this method just passes it a bunch of dicts and lists
     of dicts, which mako turns into pretty HTML.
+
+    The results are loaded and the pages of each test are rendered by jobs
+    processes, or by one process per CPU if jobs is None.
+
+    If incremental is True then destination may contain a previous summary,
+    and the pages of the runs in it whose results (and excluded statuses)
+    haven't changed are kept. Only the pages of new or changed runs and the
+    comparison pages are rendered.
+
+    If paged is True then the comparison pages only list the top level
+    groups, and the rows of each group are loaded when it is expanded. This
+    keeps the pages small enough to open for very large results.
     """
-    results = Results([backends.load(i) for i in results])
+    if incremental:
+        results, reuse, manifest = _incremental(results, destination, exclude,
+                                                jobs)
+    else:
+        results = Results(load_all(results, jobs))
+        reuse = frozenset()
 
     _copy_static_files(destination)
-    _make_testrun_info(results, destination, exclude)
-    _make_comparison_pages(results, destination, exclude)
+    _make_testrun_info(results, destination, exclude, jobs, reuse)
+    if paged:
+        _make_paged_comparison_pages(results, destination, exclude)
+    else:
+        _make_comparison_pages(results, destination, exclude)
+
+    if incremental:
+        core.write_cache(os.path.join(destination, _MANIFEST),
+                         _manifest_key(), manifest)
 
 
-def feat(results, destination, feat_desc):
-    """Produce HTML feature readiness summary."""
+def feat(results, destination, feat_desc, jobs=1):
+    """Produce HTML feature readiness summary.
 
-    feat_res = FeatResults([backends.load(i) for i in results], feat_desc)
+    The results are loaded by jobs processes, or one per CPU if jobs is None.
+
+    """
+    feat_res = FeatResults(load_all(results, jobs), feat_desc)
 
     _copy_static_files(destination)
     _make_testrun_info(feat_res, destination)
@@ -0,0 +1,327 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Run tests from an asyncio event loop.
+
+This provides equivalents of Test.execute and Test.run that return futures
+rather than blocking, so that a single thread can run as many tests at once as
+is wanted. Test commands are started and reaped by the event loop, and
+timeouts are enforced with loop timers.
+
+This module requires asyncio, and so cannot be imported on python 2. It is
+written without coroutine syntax so that it can still be compiled there.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import asyncio
+import collections
+import errno
+import os
+import signal
+import subprocess
+import sys
+
+from framework.options import OPTIONS
+from .base import (Test, TestRunError, _EXTRA_POPEN_ARGS, _SUPPRESS_TIMEOUT,
+                   _OutputCapture)
+
+__all__ = [
+    'Lane',
+    'execute',
+    'new_event_loop',
+    'run',
+]
+
+
+def new_event_loop():
+    """Return a new event loop that is able to run subprocesses."""
+    if sys.platform == 'win32':
+        return asyncio.ProactorEventLoop()
+    return asyncio.new_event_loop()
+
+
+def _guard(future, func):
+    """Wrap func so that any exception it raises is set on future.
+
+    Exceptions raised by callbacks are only logged by the event loop, which
+    would leave future unresolved forever.
+    """
+    def wrapper(*args):
+        try:
+            func(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(e)
+    return wrapper
+
+
+class _Output(object):
+    """Collect all of an output stream, like _OutputCapture without limits."""
+
+    def __init__(self):
+        self.__chunks = []
+
+    def write(self, data):
+        self.__chunks.append(data)
+
+    def close(self):
+        pass
+
+    def value(self):
+        return b''.join(self.__chunks)
+
+
+class _Protocol(asyncio.SubprocessProtocol):
+    """Collect the output of a test, and resolve a future when it exits.
+
+    If the output that is kept is limited it is collected the same way
+    Test._run_command does, see _OutputCapture.
+    """
+
+    def __init__(self, future):
+        self.future = future
+        if OPTIONS.output_head or OPTIONS.output_tail:
+            self.output = {
+                fd: _OutputCapture(OPTIONS.output_head, OPTIONS.output_tail,
+                                   OPTIONS.output_dir, '{}-'.format(name))
+                for fd, name in [(1, 'stdout'), (2, 'stderr')]}
+        else:
+            self.output = {1: _Output(), 2: _Output()}
+
+    def pipe_data_received(self, fd, data):
+        self.output[fd].write(data)
+
+    def pipe_connection_lost(self, fd, exc):
+        if fd in self.output:
+            self.output[fd].close()
+
+    def connection_lost(self, exc):
+        # This is called once the process has exited and all of its pipes
+        # have been closed.
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def get_output(self, fd):
+        """Return what has been written to fd, with newlines normalized."""
+        return self.output[fd].value().replace(
+            b'\r\n', b'\n').replace(b'\r', b'\n')
+
+
+def _run_command(test, loop):
+    """Run the test's command, and return a future for its completion.
+
+    This is the equivalent of Test._run_command. The future's exception is a
+    TestRunError if the command couldn't be run or timed out.
+    """
+    future = asyncio.Future(loop=loop)
+    exited = asyncio.Future(loop=loop)
+    state = {'timer': None, 'timed_out': False}
+
+    def started(task):
+        try:
+            transport, protocol = task.result()
+        except OSError as e:
+            # Different sets of tests get built under different build
+            # configurations.  If a developer chooses to not build a test,
+            # Piglit should not report that test as having failed.
+            if e.errno == errno.ENOENT:
+                raise TestRunError("Test executable not found.\n", 'skip')
+            raise
+
+        test.result.pid.append(transport.get_pid())
+        if test.timeout and not _SUPPRESS_TIMEOUT:
+            state['timer'] = loop.call_later(
+                test.timeout, _guard(future, timed_out), transport)
+        exited.add_done_callback(
+            _guard(future, lambda _: finished(transport, protocol)))
+
+    def timed_out(transport):
+        state['timed_out'] = True
+        transport.terminate()
+        loop.call_later(3, _guard(future, kill), transport)
+
+    def kill(transport):
+        if transport.get_returncode() is not None:
+            return
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(os.getpgid(transport.get_pid()), signal.SIGKILL)
+            except OSError:
+                pass
+        else:
+            transport.kill()
+
+    def finished(transport, protocol):
+        if state['timer'] is not None:
+            state['timer'].cancel()
+        returncode = transport.get_returncode()
+        transport.close()
+
+        # The setter handles the bytes/unicode conversion
+        test.result.out = protocol.get_output(1)
+        test.result.err = protocol.get_output(2)
+
+        if state['timed_out']:
+            raise TestRunError(
+                'Test run time exceeded timeout value ({} seconds)\n'.format(
+                    test.timeout),
+                'timeout')
+        test.result.returncode = returncode
+        future.set_result(None)
+
+    task = asyncio.ensure_future(loop.subprocess_exec(
+        lambda: _Protocol(exited),
+        *test.command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=test.cwd,
+        env=test._environment(),  # pylint: disable=protected-access
+        **_EXTRA_POPEN_ARGS), loop=loop)
+    task.add_done_callback(_guard(future, started))
+    return future
+
+
+def _run(test, loop):
+    """Run a test, returning a future for its completion.
+
+    This is the equivalent of Test.run. Tests that override how their command
+    is run (like the ReducedProcessMixin) can't be run by the event loop, so
+    their run method is called from the loop's default executor instead.
+    """
+    # pylint: disable=protected-access
+    if (type(test).run is not Test.run or
+            type(test)._run_command is not Test._run_command):
+        return loop.run_in_executor(None, test.run)
+
+    future = asyncio.Future(loop=loop)
+    if not test._pre_run():
+        future.set_result(None)
+        return future
+
+    def finished(command):
+        try:
+            command.result()
+        except TestRunError as e:
+            test._run_error(e)
+        else:
+            test.interpret_result()
+        future.set_result(None)
+
+    _run_command(test, loop).add_done_callback(_guard(future, finished))
+    return future
+
+
+def execute(test, path, log, options, loop):
+    """Execute a test, returning a future for its completion.
+
+    This is the equivalent of Test.execute. The future never raises,
+    exceptions are recorded in the test's result just like execute does.
+    """
+    # pylint: disable=protected-access
+    future = asyncio.Future(loop=loop)
+    log.start(path)
+
+    if not OPTIONS.execute:
+        log.log('dry-run')
+        future.set_result(None)
+        return future
+
+    def finished(run):
+        try:
+            run.result()
+            test._post_execute(options, path)
+        except Exception as e:  # pylint: disable=broad-except
+            test._execute_error(type(e), e, e.__traceback__)
+        log.log(test.result.result)
+        future.set_result(None)
+
+    try:
+        test._pre_execute(options)
+        run = _run(test, loop)
+    except Exception as e:  # pylint: disable=broad-except
+        run = asyncio.Future(loop=loop)
+        run.set_exception(e)
+    run.add_done_callback(finished)
+    return future
+
+
+class Lane(object):
+    """A queue of work, at most limit items of which are run at once.
+
+    Arguments:
+    limit -- the maximum number of items to run at once
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.__queue = collections.deque()
+        self.__running = 0
+        self.__loop = None
+        self.__done = None
+
+    def add(self, func):
+        """Add a callable to the lane.
+
+        It will be called with the event loop, and must return a future.
+        """
+        self.__queue.append(func)
+
+    def stop(self):
+        """Drop all work that hasn't been started yet."""
+        self.__queue.clear()
+
+    def start(self, loop):
+        """Start running work, returning a future that resolves when the
+        lane is empty.
+        """
+        self.__loop = loop
+        self.__done = asyncio.Future(loop=loop)
+        self.__fill()
+        return self.__done
+
+    def __fill(self):
+        while self.__queue and self.__running < self.limit:
+            self.__running += 1
+            self.__queue.popleft()(self.__loop).add_done_callback(
+                self.__finished)
+
+        if not self.__running and not self.__done.done():
+            self.__done.set_result(None)
+
+    def __finished(self, _):
+        self.__running -= 1
+        self.__fill()
+
+
+def run(lanes):
+    """Run lanes on a new event loop until all of them are empty.
+
+    This must be called from the main thread, since that is where the event
+    loop is able to watch for child processes exiting.
+    """
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(
+            asyncio.gather(*[l.start(loop) for l in lanes]))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
@@ -26,12 +26,16 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 import errno
+import gzip
 import os
 import time
 import sys
+import tempfile
+import threading
 import traceback
 import itertools
 import abc
+import collections
 import copy
 import signal
 import warnings
@@ -39,6 +43,7 @@ import warnings
 import six
 from six.moves import range
 
+from framework import core
 from framework import exceptions
 from framework import status
 from framework.options import OPTIONS
@@ -71,6 +76,11 @@ if six.PY2:
                     del kwargs['timeout']
                 return super(Popen, self).communicate(*args, **kwargs)
 
+            def wait(self, *args, **kwargs):
+                if 'timeout' in kwargs:
+                    del kwargs['timeout']
+                return super(Popen, self).wait(*args, **kwargs)
+
         subprocess.TimeoutExpired = TimeoutExpired
         subprocess.Popen = Popen
         _EXTRA_POPEN_ARGS = {}
@@ -95,6 +105,11 @@ elif six.PY3:
                     del kwargs['timeout']
                 return super(Popen, self).communicate(*args, **kwargs)
 
+            def wait(self, *args, **kwargs):
+                if 'timeout' in kwargs:
+                    del kwargs['timeout']
+                return super(Popen, self).wait(*args, **kwargs)
+
         subprocess.Popen = Popen
     elif os.name == 'posix':
         # This should work for all *nix systems, Linux, the BSDs, and OSX.
@@ -133,6 +148,203 @@ class TestRunError(exceptions.PiglitException):
         self.status = status
 
 
+class _PiglitLines(object):
+    """Find the lines that start with "PIGLIT:" in data that is fed to it a
+    piece at a time.
+    """
+    PREFIX = b'PIGLIT:'
+
+    def __init__(self):
+        self.lines = []
+        # The start of the current line, while it may be a PIGLIT: line
+        self.__line = bytearray()
+        self.__skip = False
+
+    def feed(self, data):
+        start = 0
+        while start < len(data):
+            end = data.find(b'\n', start)
+            end = len(data) if end == -1 else end + 1
+            if not self.__skip:
+                self.__line += data[start:end]
+                prefix = bytes(self.__line[:len(self.PREFIX)])
+                if not self.PREFIX.startswith(prefix):
+                    self.__line = bytearray()
+                    self.__skip = True
+            if data[end - 1:end] == b'\n':
+                if not self.__skip:
+                    self.lines.append(bytes(self.__line))
+                self.__line = bytearray()
+                self.__skip = False
+            start = end
+
+
+class _OutputCapture(object):
+    """Collect one of the output streams of a test, keeping only its head and
+    tail in memory.
+
+    Output that is no larger than head + tail bytes is kept whole. Larger
+    output is written to a gzip compressed file in directory as it arrives,
+    and value() is the head, a note of where the whole output is, each line
+    from the middle that starts with "PIGLIT:" (since interpret_result needs
+    those), and the tail.
+
+    Arguments:
+    head -- the number of bytes at the start of the output to keep
+    tail -- the number of bytes at the end of the output to keep
+    directory -- the directory to save large output in, or None to discard
+                 the middle of it
+    prefix -- the prefix of the name of the file large output is saved in
+
+    """
+    def __init__(self, head, tail, directory, prefix):
+        self.head = head
+        self.tail = tail
+        self.filename = None
+        self.__directory = directory
+        self.__prefix = prefix
+        self.__head = bytearray()
+        self.__tail = collections.deque()
+        self.__tail_size = 0
+        self.__size = 0
+        self.__spill = None
+        self.__lines = None
+
+    def write(self, data):
+        self.__size += len(data)
+        if self.__spill is not None:
+            self.__spill.write(data)
+
+        if len(self.__head) < self.head:
+            count = self.head - len(self.__head)
+            self.__head += data[:count]
+            data = data[count:]
+        if not data:
+            return
+
+        self.__tail.append(data)
+        self.__tail_size += len(data)
+        if self.__tail_size > self.tail:
+            if self.__lines is None:
+                self.__start_spill()
+            self.__trim()
+
+    def __start_spill(self):
+        """Start saving the output, since some of it is about to be dropped.
+        """
+        # A PIGLIT: line may start at the end of the head
+        self.__lines = _PiglitLines()
+        self.__lines.feed(bytes(self.__head[self.__head.rfind(b'\n') + 1:]))
+
+        if self.__directory is None:
+            return
+        try:
+            core.check_dir(self.__directory)
+            fd, self.filename = tempfile.mkstemp(
+                dir=self.__directory, prefix=self.__prefix, suffix='.gz')
+            os.close(fd)
+            # Tests that produce this much output tend to produce a lot more,
+            # so favor speed over size.
+            self.__spill = gzip.GzipFile(self.filename, 'wb', 1)
+        except (OSError, IOError):
+            self.filename = None
+            return
+        self.__spill.write(bytes(self.__head))
+        for chunk in self.__tail:
+            self.__spill.write(chunk)
+
+    def __trim(self):
+        """Drop data from the start of the tail until it is tail bytes."""
+        while (self.__tail and
+               self.__tail_size - len(self.__tail[0]) >= self.tail):
+            chunk = self.__tail.popleft()
+            self.__tail_size -= len(chunk)
+            self.__lines.feed(chunk)
+
+        excess = self.__tail_size - self.tail
+        if excess > 0:
+            self.__lines.feed(self.__tail[0][:excess])
+            self.__tail[0] = self.__tail[0][excess:]
+            self.__tail_size -= excess
+
+    def close(self):
+        """Finish saving the output."""
+        if self.__spill is not None:
+            self.__spill.close()
+            self.__spill = None
+
+    def value(self):
+        """Return the output that is kept, as bytes."""
+        head = bytes(self.__head)
+        tail = b''.join(self.__tail)
+        if self.__lines is None:
+            return head + tail
+
+        # Only keep whole lines, the partial lines are in the middle.
+        end = tail.find(b'\n')
+        if end != -1:
+            self.__lines.feed(tail[:end + 1])
+            tail = tail[end + 1:]
+        head = head[:head.rfind(b'\n') + 1]
+        lines = b''.join(self.__lines.lines)
+
+        omitted = self.__size - len(head) - len(tail)
+        if self.filename is not None:
+            where = 'all of it is in {}'.format(os.path.join(
+                os.path.basename(self.__directory),
+                os.path.basename(self.filename)))
+        else:
+            where = 'it was not saved'
+        note = '[piglit: {} bytes of output omitted, {}]\n'.format(
+            omitted, where).encode('utf-8')
+        return head + note + lines + tail
+
+
+def _read_pipe(pipe, capture):
+    """Read a pipe into an _OutputCapture until it is closed."""
+    try:
+        while True:
+            data = os.read(pipe.fileno(), 65536)
+            if not data:
+                break
+            capture.write(data)
+    finally:
+        pipe.close()
+        capture.close()
+
+
+class _Communicate(object):
+    """A replacement for Popen.communicate that streams the output of the
+    process into _OutputCaptures, so that only the head and tail of it is
+    kept in memory.
+
+    Like communicate it may be called again after it times out.
+    """
+    def __init__(self, proc):
+        self.__proc = proc
+        self.__captures = [
+            _OutputCapture(OPTIONS.output_head, OPTIONS.output_tail,
+                           OPTIONS.output_dir, '{}-'.format(name))
+            for name in ['stdout', 'stderr']]
+        self.__threads = [
+            threading.Thread(target=_read_pipe, args=(pipe, capture))
+            for pipe, capture in zip([proc.stdout, proc.stderr],
+                                     self.__captures)]
+        for thread in self.__threads:
+            thread.daemon = True
+            thread.start()
+
+    def __call__(self, timeout=None):
+        if timeout is None:
+            self.__proc.wait()
+        else:
+            self.__proc.wait(timeout=timeout)
+        for thread in self.__threads:
+            thread.join()
+        return tuple(c.value().replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+                     for c in self.__captures)
+
+
 def is_crash_returncode(returncode):
     """Determine whether the given process return code correspond to a
     crash.
@@ -184,7 +396,7 @@ class Test(object):
         self.result = TestResult()
         self.cwd = None
 
-    def execute(self, path, log, options):
+    def execute(self, path, log, options, runner=None):
         """ Run a test
 
         Run a test, but with features. This times the test, uses dmesg checking
@@ -194,32 +406,51 @@ class Test(object):
         path    -- the name of the test
         log     -- a log.Log instance
         options -- a dictionary containing dmesg and monitoring objects
+
+        Keyword Arguments:
+        runner  -- a callable that takes this test, runs it (possibly in
+                   another process), and returns its TestResult. If None then
+                   run() is called directly. Default: None
         """
         log.start(path)
         # Run the test
         if OPTIONS.execute:
             try:
-                self.result.time.start = time.time()
-                options['dmesg'].update_dmesg()
-                options['monitor'].update_monitoring()
-                self.run()
-                self.result.time.end = time.time()
-                self.result = options['dmesg'].update_result(self.result)
-                options['monitor'].check_monitoring()
+                self._pre_execute(options)
+                if runner is None:
+                    self.run()
+                else:
+                    self.result = runner(self)
+                self._post_execute(options, path)
             # This is a rare case where a bare exception is okay, since we're
             # using it to log exceptions
             except:
-                exc_type, exc_value, exc_traceback = sys.exc_info()
-                traceback.print_exc(file=sys.stderr)
-                self.result.result = 'fail'
-                self.result.exception = "{}{}".format(exc_type, exc_value)
-                self.result.traceback = "".join(
-                    traceback.format_tb(exc_traceback))
+                self._execute_error(*sys.exc_info())
 
             log.log(self.result.result)
         else:
             log.log('dry-run')
 
+    def _pre_execute(self, options):
+        """Start timing the test, and start dmesg."""
+        self.result.time.start = time.time()
+        options['dmesg'].update_dmesg()
+
+    def _post_execute(self, options, path=None):
+        """Stop timing the test, and check dmesg and monitoring."""
+        self.result.time.end = time.time()
+        self.result = options['dmesg'].update_result(self.result)
+        options['monitor'].check_monitoring(self.result, path)
+
+    def _execute_error(self, exc_type, exc_value, exc_traceback):
+        """Record an unexpected exception raised while executing the test."""
+        traceback.print_exception(exc_type, exc_value, exc_traceback,
+                                  file=sys.stderr)
+        self.result.result = 'fail'
+        self.result.exception = "{}{}".format(exc_type, exc_value)
+        self.result.traceback = "".join(
+            traceback.format_tb(exc_traceback))
+
     @property
     def command(self):
         assert self._command
@@ -247,6 +478,23 @@ class Test(object):
         * For 'returncode', the value will be the numeric exit code/value.
         * For 'command', the value will be command line program and arguments.
         """
+        if not self._pre_run():
+            return
+
+        try:
+            self._run_command()
+        except TestRunError as e:
+            self._run_error(e)
+            return
+
+        self.interpret_result()
+
+    def _pre_run(self):
+        """Record the command and environment, and check if this is a skip.
+
+        Returns False if the test was skipped, and its command shouldn't be
+        run.
+        """
         self.result.command = ' '.join(self.command)
         self.result.environment = " ".join(
             '{0}="{1}"'.format(k, v) for k, v in itertools.chain(
@@ -260,19 +508,16 @@ class Test(object):
                 self.result.subtests[each] = status.SKIP
             self.result.out = e.reason
             self.result.returncode = None
-            return
+            return False
+        return True
 
-        try:
-            self._run_command()
-        except TestRunError as e:
-            self.result.result = six.text_type(e.status)
-            for each in six.iterkeys(self.result.subtests):
-                self.result.subtests[each] = six.text_type(e.status)
-            self.result.out = six.text_type(e)
-            self.result.returncode = None
-            return
-
-        self.interpret_result()
+    def _run_error(self, error):
+        """Set the result from a TestRunError raised running the command."""
+        self.result.result = six.text_type(error.status)
+        for each in six.iterkeys(self.result.subtests):
+            self.result.subtests[each] = six.text_type(error.status)
+        self.result.out = six.text_type(error)
+        self.result.returncode = None
 
     def is_skip(self):
         """ Application specific check for skip
@@ -283,18 +528,8 @@ class Test(object):
         """
         pass
 
-    def _run_command(self, **kwargs):
-        """ Run the test command and get the result
-
-        This method sets environment options, then runs the executable. If the
-        executable isn't found it sets the result to skip.
-
-        """
-        # This allows the ReducedProcessMixin to work without having to whack
-        # self.command (which should be treated as immutable), but is
-        # considered private.
-        command = kwargs.pop('_command', self.command)
-
+    def _environment(self):
+        """Return the environment to run the test command in."""
         # Setup the environment for the test. Environment variables are taken
         # from the following sources, listed in order of increasing precedence:
         #
@@ -317,7 +552,25 @@ class Test(object):
         _base = itertools.chain(six.iteritems(os.environ),
                                 six.iteritems(OPTIONS.env),
                                 six.iteritems(self.env))
-        fullenv = {f(k): f(v) for k, v in _base}
+        return {f(k): f(v) for k, v in _base}
+
+    def _run_command(self, **kwargs):
+        """ Run the test command and get the result
+
+        This method sets environment options, then runs the executable. If the
+        executable isn't found it sets the result to skip.
+
+        """
+        # This allows the ReducedProcessMixin to work without having to whack
+        # self.command (which should be treated as immutable), but is
+        # considered private.
+        command = kwargs.pop('_command', self.command)
+
+        fullenv = self._environment()
+
+        # If there is a limit on the output that is kept, it is read as it
+        # is written, rather than all at once by communicate
+        capture = bool(OPTIONS.output_head or OPTIONS.output_tail)
 
         try:
             proc = subprocess.Popen(command,
@@ -325,14 +578,15 @@ class Test(object):
                                     stderr=subprocess.PIPE,
                                     cwd=self.cwd,
                                     env=fullenv,
-                                    universal_newlines=True,
+                                    universal_newlines=not capture,
                                     **_EXTRA_POPEN_ARGS)
 
             self.result.pid.append(proc.pid)
+            communicate = _Communicate(proc) if capture else proc.communicate
             if not _SUPPRESS_TIMEOUT:
-                out, err = proc.communicate(timeout=self.timeout)
+                out, err = communicate(timeout=self.timeout)
             else:
-                out, err = proc.communicate()
+                out, err = communicate()
             returncode = proc.returncode
         except OSError as e:
             # Different sets of tests get built under different build
@@ -357,7 +611,7 @@ class Test(object):
 
             # Since the process isn't running it's safe to get any remaining
             # stdout/stderr values out and store them.
-            self.result.out, self.result.err = proc.communicate()
+            self.result.out, self.result.err = communicate()
 
             raise TestRunError(
                 'Test run time exceeded timeout value ({} seconds)\n'.format(
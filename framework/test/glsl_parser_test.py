@@ -33,6 +33,7 @@ import six
 from framework import exceptions
 from .base import TestIsSkip
 from .opengl import FastSkipMixin
+from .parse_cache import PARSE_CACHE
 from .piglit_test import PiglitBaseTest, TEST_BIN_DIR
 
 __all__ = [
@@ -97,9 +98,7 @@ class Parser(object):
         self.glsl_version = None
 
         try:
-            with io.open(filepath, mode='r', encoding='utf-8') as testfile:
-                testfile = testfile.read()
-                self.config = self.parse(testfile, filepath)
+            self.config = self.read_config(filepath)
             self.command = self.get_command(filepath)
         except GLSLParserInternalError as e:
             raise exceptions.PiglitFatalError(
@@ -107,6 +106,28 @@ class Parser(object):
 
         self.set_skip_conditions()
 
+    def read_config(self, filepath):
+        """Return the config of filepath, using the parse cache if possible.
+
+        Only the config is cached, the command and skip conditions depend on
+        which binaries have been built so they are recomputed every time.
+        Files without a config are cached too, so that legacy tests don't
+        need to be read again either.
+        """
+        cached = PARSE_CACHE.get(filepath)
+        if cached is None:
+            with io.open(filepath, mode='r', encoding='utf-8') as testfile:
+                testfile = testfile.read()
+            try:
+                cached = tuple(six.iteritems(self.parse(testfile, filepath)))
+            except GLSLParserNoConfigError:
+                cached = ()
+            PARSE_CACHE.set(filepath, cached)
+
+        if not cached:
+            raise GLSLParserNoConfigError("No [config] section found!")
+        return dict(cached)
+
     def set_skip_conditions(self):
         """Set OpenGL and OpenGL ES fast skipping conditions."""
         glsl = self.config['glsl_version']
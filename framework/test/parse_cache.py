@@ -0,0 +1,129 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A persistent index of the information parsed from test files.
+
+Creating a ShaderTest or GLSLParserTest requires reading the test file to find
+its requirements. The results of that parsing are stored here, along with the
+modification time and size of the file, so that only files that have changed
+since the last time they were parsed need to be read again.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import os
+
+from framework import core
+
+__all__ = [
+    'PARSE_CACHE',
+    'ParseCache',
+]
+
+_DISABLED = bool(os.environ.get('PIGLIT_NO_PARSE_CACHE', False))
+
+# Bump this whenever the format of the values stored in the cache changes.
+_VERSION = 1
+
+# Changing the parsers can change what they would return for a file, so they
+# invalidate the whole cache.
+_PARSERS = ['glsl_parser_test.py', 'shader_test.py', 'parse_cache.py']
+
+
+def _signature(path):
+    """Return the modification time and size of path, or None."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+class ParseCache(object):
+    """A mapping of file paths to the values parsed from them.
+
+    The cache is read from disk the first time it is used, and written back
+    by save(). Entries are only returned if the file has the same modification
+    time and size as when the entry was stored.
+    """
+
+    def __init__(self):
+        self.__entries = None
+        self.__dirty = False
+        self.__key = (_VERSION,) + tuple(
+            _signature(os.path.join(os.path.dirname(__file__), p))
+            for p in _PARSERS)
+
+    @staticmethod
+    def _filename():
+        return os.path.join(core.get_cache_dir('parse'), 'index.pickle')
+
+    @property
+    def _entries(self):
+        if self.__entries is None:
+            try:
+                filename = self._filename()
+            except OSError:
+                self.__entries = {}
+            else:
+                self.__entries = core.read_cache(filename, self.__key) or {}
+        return self.__entries
+
+    def get(self, path):
+        """Return the value stored for path, or None if there isn't one.
+
+        None is also returned if path has been modified since the value was
+        stored, or if it cannot be stat'd.
+        """
+        if _DISABLED:
+            return None
+
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != _signature(path):
+            return None
+        return entry[1]
+
+    def set(self, path, value):
+        """Store value for path.
+
+        Values are pickled and shared between callers, so they should be
+        immutable.
+        """
+        if _DISABLED:
+            return
+
+        signature = _signature(path)
+        if signature is not None:
+            self._entries[path] = (signature, value)
+            self.__dirty = True
+
+    def save(self):
+        """Write the cache to disk if anything has been added to it."""
+        if _DISABLED or not self.__dirty:
+            return
+
+        try:
+            filename = self._filename()
+        except OSError:
+            return
+        core.write_cache(filename, self.__key, self.__entries)
+        self.__dirty = False
+
+
+PARSE_CACHE = ParseCache()
@@ -34,6 +34,7 @@ from framework import exceptions
 from framework import status
 from .base import ReducedProcessMixin, TestIsSkip
 from .opengl import FastSkipMixin, FastSkip
+from .parse_cache import PARSE_CACHE
 from .piglit_test import PiglitBaseTest
 
 __all__ = [
@@ -62,6 +63,26 @@ class Parser(object):
         self.__sl_op = None
 
     def parse(self):
+        cached = PARSE_CACHE.get(self.filename)
+        if cached is not None:
+            self.__set_state(cached)
+            return
+
+        self.__parse()
+        PARSE_CACHE.set(self.filename, self.__get_state())
+
+    def __get_state(self):
+        return (frozenset(self.gl_required), self._gl_version,
+                self._gles_version, self._glsl_version, self._glsl_es_version,
+                self.prog, self.__op, self.__sl_op)
+
+    def __set_state(self, state):
+        (gl_required, self._gl_version, self._gles_version,
+         self._glsl_version, self._glsl_es_version, self.prog, self.__op,
+         self.__sl_op) = state
+        self.gl_required = set(gl_required)
+
+    def __parse(self):
         # Iterate over the lines in shader file looking for the config section.
         # By using a generator this can be split into two for loops at minimal
         # cost. The first one looks for the start of the config block or raises
@@ -153,26 +153,21 @@
         </td>
         % for res in results.results:
           <%
-            # Get the raw result, if it's none check to see if it's a subtest, if that's still None
-            # then declare it not run
+            # Find the test or subtest, if there isn't one declare it not run
             # This very intentionally uses posix path, we're generating urls, and while
             # some windows based browsers support \\ as a url separator, *nix systems do not,
             # which would make a result generated on windows non-portable
-            raw = res.tests.get(test)
-            if raw is not None:
-              result = raw.result
-              href = normalize_href(posixpath.join(escape_pathname(res.name),
-                                                   escape_filename(test)))
+            try:
+              name, subtest = res.resolve(test)
+            except KeyError:
+              result = status.NOTRUN
             else:
-              raw = res.tests.get(grouptools.groupname(test))
-              name = grouptools.testname(test)
-              if raw is not None and name in raw.subtests:
-                result = raw.subtests[name]
-                href = normalize_href(posixpath.join(escape_pathname(res.name),
-                                                     escape_filename(grouptools.groupname(test))))
+              if subtest is None:
+                result = res.tests[name].result
               else:
-                result = status.NOTRUN
-            del raw  # we don't need this, so don't let it leak
+                result = res.tests[name].subtests[subtest]
+              href = normalize_href(posixpath.join(escape_pathname(res.name),
+                                                   escape_filename(name)))
           %>
           <td class="${str(result)}">
           % if str(result) not in exclude and result is not status.NOTRUN:
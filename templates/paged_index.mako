@@ -0,0 +1,156 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN"
+ "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+  <head>
+    <meta http-equiv="Content-Type" content="text/html; charset=UTF-8" />
+    <title>Result summary</title>
+    <link rel="stylesheet" href="index.css" type="text/css" />
+    <script type="text/javascript">
+    //<![CDATA[
+      // The rows of each group are in a data file, which is only loaded when
+      // the group is first expanded. The data files call piglit.rows, since
+      // browsers won't let a page read a local file any other way.
+      var piglit = {
+        loaded: {},
+
+        toggle: function(n) {
+          var body = document.getElementById('g' + n);
+          if (!piglit.loaded[n]) {
+            piglit.loaded[n] = true;
+            var script = document.createElement('script');
+            script.src = '${data}/' + n + '.js';
+            document.getElementsByTagName('head')[0].appendChild(script);
+          }
+          body.style.display = body.style.display === 'none' ? '' : 'none';
+        },
+
+        // Each row is [depth, name, is a test, cells], where each cell is
+        // [status, fraction] for groups and [status, link or null] for tests.
+        rows: function(n, rows) {
+          var body = document.getElementById('g' + n);
+          for (var i = 0; i < rows.length; i++) {
+            var row = rows[i];
+            var tr = document.createElement('tr');
+            var td = document.createElement('td');
+            var div = document.createElement('div');
+            div.className = row[2] ? 'group' : 'head';
+            div.style.marginLeft = (row[0] * 1.75) + 'em';
+            if (row[2]) {
+              div.appendChild(document.createTextNode(row[1]));
+            } else {
+              var b = document.createElement('b');
+              b.appendChild(document.createTextNode(row[1]));
+              div.appendChild(b);
+            }
+            td.appendChild(div);
+            tr.appendChild(td);
+
+            for (var j = 0; j < row[3].length; j++) {
+              var cell = row[3][j];
+              td = document.createElement('td');
+              td.className = cell[0];
+              var text = document.createTextNode(row[2] ? cell[0] : cell[1]);
+              if (row[2] && cell[1] !== null) {
+                var a = document.createElement('a');
+                a.href = cell[1];
+                a.appendChild(text);
+                td.appendChild(a);
+              } else if (row[2]) {
+                td.appendChild(text);
+              } else {
+                b = document.createElement('b');
+                b.appendChild(text);
+                td.appendChild(b);
+              }
+              tr.appendChild(td);
+            }
+            body.appendChild(tr);
+          }
+        }
+      };
+    //]]>
+    </script>
+  </head>
+  <body>
+    <h1>Result summary</h1>
+    <p>Currently showing: ${page}</p>
+    <p>Show:
+      % if page == 'all':
+        all
+      % else:
+        <a href="index.html">all</a>
+      % endif
+      % for i in pages:
+        % if i == page:
+          | ${i}
+        % else:
+          | <a href="${i}.html">${i}</a>
+        % endif
+      % endfor
+    </p>
+    <table>
+      <colgroup>
+        ## Name Column
+        <col />
+
+        ## Status columns
+        ## Create an additional column for each summary
+        % for _ in runs:
+        <col />
+        % endfor
+      </colgroup>
+      <tbody>
+        <tr>
+          <th/>
+          % for name, href, _, _ in runs:
+            <th class="head"><b>${name}</b><br />\
+            (<a href="${href}">info</a>)</th>
+          % endfor
+        </tr>
+        <tr>
+          <td class="head"><b>all</b></td>
+          % for _, _, result, fraction in runs:
+            <td class="${result}">
+              <b>${fraction}</b>
+            </td>
+          % endfor
+        </tr>
+      </tbody>
+      % for name, is_test, cells, n in entries:
+        <tbody>
+          <tr>
+            % if is_test:
+              <td>
+                <div class="group">${name}</div>
+              </td>
+              % for result, href in cells:
+                <td class="${result}">
+                % if href is not None:
+                  <a href="${href}">${result}</a>
+                % else:
+                  ${result}
+                % endif
+                </td>
+              % endfor
+            % else:
+              <td>
+                <div class="head">
+                  <b><a href="javascript:piglit.toggle(${n})">${name}</a></b>
+                </div>
+              </td>
+              % for result, fraction in cells:
+                <td class="${result}">
+                  <b>${fraction}</b>
+                </td>
+              % endfor
+            % endif
+          </tr>
+        </tbody>
+        % if not is_test:
+          <tbody id="g${n}" style="display: none"></tbody>
+        % endif
+      % endfor
+    </table>
+  </body>
+</html>
@@ -14,7 +14,7 @@ from six.moves import range
 
 from framework import grouptools
 from framework import options
-from framework.profile import TestProfile
+from framework.profile import DirectoryCache, TestProfile
 from framework.driver_classifier import DriverClassifier
 from framework.test import (PiglitGLTest, GleanTest, PiglitBaseTest,
                             GLSLParserTest, GLSLParserNoConfigError)
@@ -210,30 +210,49 @@ profile = TestProfile()  # pylint: disable=invalid-name
 
 shader_tests = collections.defaultdict(list)
 
+# Generating the shader and glslparser tests means reading every one of them,
+# so the tests generated for each directory are cached between runs.
+_CACHE = DirectoryCache('all')
+
+
+def _find_shader_tests(dirpath, filenames):
+    """Return a list of (testname, test) pairs for a directory.
+
+    When not using process isolation the test is the path to the shader_test
+    file rather than a Test instance.
+    """
+    tests = []
+    for filename in filenames:
+        testname, ext = os.path.splitext(filename)
+        if ext == '.shader_test':
+            if PROCESS_ISOLATION:
+                test = ShaderTest(os.path.join(dirpath, filename))
+            else:
+                test = os.path.join(dirpath, filename)
+        elif ext in ['.vert', '.tesc', '.tese', '.geom', '.frag', '.comp']:
+            try:
+                test = GLSLParserTest(os.path.join(dirpath, filename))
+            except GLSLParserNoConfigError:
+                # In the event that there is no config assume that it is a
+                # legacy test, and continue
+                continue
+
+            # For glslparser tests you can have multiple tests with the
+            # same name, but a different stage, so keep the extension.
+            testname = filename
+        else:
+            continue
+        tests.append((testname, test))
+    return tests
+
+
 # Find and add all shader tests.
 for basedir in [TESTS_DIR, GENERATED_TESTS_DIR]:
-    for dirpath, _, filenames in os.walk(basedir):
-        for filename in filenames:
-            testname, ext = os.path.splitext(filename)
-            groupname = grouptools.from_path(os.path.relpath(dirpath, basedir))
-            if ext == '.shader_test':
-                if PROCESS_ISOLATION:
-                    test = ShaderTest(os.path.join(dirpath, filename))
-                else:
-                    shader_tests[groupname].append(os.path.join(dirpath, filename))
-                    continue
-            elif ext in ['.vert', '.tesc', '.tese', '.geom', '.frag', '.comp']:
-                try:
-                    test = GLSLParserTest(os.path.join(dirpath, filename))
-                except GLSLParserNoConfigError:
-                    # In the event that there is no config assume that it is a
-                    # legacy test, and continue
-                    continue
-
-                # For glslparser tests you can have multiple tests with the
-                # same name, but a different stage, so keep the extension.
-                testname = filename
-            else:
+    for dirpath, tests in _CACHE.walk(basedir, _find_shader_tests):
+        groupname = grouptools.from_path(os.path.relpath(dirpath, basedir))
+        for testname, test in tests:
+            if isinstance(test, six.string_types):
+                shader_tests[groupname].append(test)
                 continue
 
             group = grouptools.join(groupname, testname)
@@ -4945,5 +4964,8 @@ with profile.test_list.group_manager(
     g(['intel_conservative_rasterization-innercoverage_gles3'])
     g(['intel_conservative_rasterization-tri_gles3'])
 
+_CACHE.save()
+profile.source_trees = _CACHE.trees
+
 if platform.system() is 'Windows':
     profile.filters.append(lambda p, _: not p.startswith('glx'))
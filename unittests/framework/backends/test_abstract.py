@@ -0,0 +1,122 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the framework.backends.abstract module."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import six
+
+from framework.backends import abstract
+
+# pylint: disable=no-self-use
+
+
+class TestJournal(object):
+    """Tests for the Journal class."""
+
+    def test_round_trip(self, tmpdir):
+        p = six.text_type(tmpdir.join('journal'))
+        journal = abstract.Journal(p)
+        journal.append('foo')
+        journal.append('bär')
+        journal.close()
+
+        assert list(abstract.read_journal(p)) == ['foo', 'bär']
+
+    def test_stops_at_corrupt_record(self, tmpdir):
+        """Records after one that doesn't match its checksum are dropped."""
+        p = tmpdir.join('journal')
+        journal = abstract.Journal(six.text_type(p))
+        for each in ['foo', 'bar', 'baz']:
+            journal.append(each)
+        journal.close()
+
+        data = bytearray(p.read_binary())
+        data[abstract.Journal.HEADER.size * 2 + 3] ^= 0xff
+        p.write_binary(bytes(data))
+
+        assert list(abstract.read_journal(six.text_type(p))) == ['foo']
+
+    def test_truncated_record(self, tmpdir):
+        p = tmpdir.join('journal')
+        journal = abstract.Journal(six.text_type(p))
+        journal.append('foo')
+        journal.append('bar')
+        journal.close()
+        p.write_binary(p.read_binary()[:-1])
+
+        assert list(abstract.read_journal(six.text_type(p))) == ['foo']
+
+    def test_append_after_torn_write(self, tmpdir):
+        """Opening a journal discards a partially written record, so that
+        new records can be read back.
+        """
+        p = tmpdir.join('journal')
+        journal = abstract.Journal(six.text_type(p))
+        journal.append('foo')
+        journal.close()
+        p.write_binary(p.read_binary() + b'\x10\x00')
+
+        journal = abstract.Journal(six.text_type(p))
+        journal.append('bar')
+        journal.close()
+
+        assert list(abstract.read_journal(six.text_type(p))) == \
+            ['foo', 'bar']
+
+    def test_sync_batched(self, tmpdir, mocker):
+        """Syncs happen once per sync_records records."""
+        fsync = mocker.patch('framework.backends.abstract.os.fsync')
+        journal = abstract.Journal(six.text_type(tmpdir.join('journal')),
+                                   sync=True, sync_records=3,
+                                   sync_interval=1000)
+        for _ in range(7):
+            journal.append('foo')
+        assert fsync.call_count == 2
+
+        journal.close()
+        assert fsync.call_count == 3
+
+    def test_no_sync(self, tmpdir, mocker):
+        fsync = mocker.patch('framework.backends.abstract.os.fsync')
+        journal = abstract.Journal(six.text_type(tmpdir.join('journal')),
+                                   sync_records=1)
+        journal.append('foo')
+        journal.close()
+        assert fsync.call_count == 0
+
+
+class TestReadTests(object):
+    """Tests for the read_tests function."""
+
+    def test_files_in_order(self, tmpdir):
+        for i in [10, 2, 1]:
+            tmpdir.join('{}.json'.format(i)).write(six.text_type(i))
+        assert list(abstract.read_tests(six.text_type(tmpdir))) == \
+            ['1', '2', '10']
+
+    def test_journal(self, tmpdir):
+        tmpdir.join('0.json').write('0')
+        journal = abstract.Journal(six.text_type(tmpdir.join('journal.json')))
+        journal.append('1')
+        journal.close()
+        tmpdir.join('0.json.tmp').write('ignored')
+
+        assert list(abstract.read_tests(six.text_type(tmpdir))) == ['0', '1']
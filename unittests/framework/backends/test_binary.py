@@ -0,0 +1,126 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the binary backend."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import pytest
+import six
+
+from framework import backends
+from framework import exceptions
+from framework import grouptools
+from framework import results
+
+from . import shared
+
+# pylint: disable=no-self-use
+
+
+@pytest.fixture
+def testrun():
+    """A TestrunResult with a few tests, one of them with subtests."""
+    run = results.TestrunResult.from_dict(shared.JSON)
+    test = results.TestResult('pass')
+    test.out = 'some output'
+    test.returncode = 0
+    test.time = results.TimeAttribute(1.0, 2.5)
+    run.tests[grouptools.join('a', 'test')] = test
+    test = results.TestResult('crash')
+    test.subtests.update({'x': 'pass', 'y': 'fail'})
+    run.tests[grouptools.join('a', 'subtests')] = test
+    return run
+
+
+def _json(testrun):
+    return json.loads(json.dumps(testrun,
+                                 default=backends.json.piglit_encoder))
+
+
+class TestWriteResults(object):
+    """Tests for converting to and from the binary format."""
+
+    @pytest.mark.parametrize('lazy', [False, True])
+    def test_round_trip(self, testrun, tmpdir, lazy):
+        p = six.text_type(tmpdir.join('results.bin'))
+        backends.binary.write_results(testrun, p)
+        loaded = backends.binary.load(p, 'none', lazy=lazy)
+
+        assert _json(loaded) == _json(testrun)
+
+    def test_sorted(self, testrun, tmpdir):
+        p = six.text_type(tmpdir.join('results.bin'))
+        backends.binary.write_results(testrun, p)
+        assert list(backends.binary.load(p, 'none').tests) == \
+            sorted(testrun.tests)
+
+    def test_lazy_columns(self, testrun, tmpdir, mocker):
+        """Only the columns are read unless something else is used."""
+        p = six.text_type(tmpdir.join('results.bin'))
+        backends.binary.write_results(testrun, p)
+        loaded = backends.binary.load(p, 'none', lazy=True)
+        blobs = mocker.spy(backends.binary, '_decode')
+
+        test = loaded.tests[grouptools.join('a', 'test')]
+        assert test.result == 'pass'
+        assert test.time.total == 1.5
+        assert loaded.tests[grouptools.join('a', 'subtests')].subtests['y'] \
+            == 'fail'
+        assert blobs.call_count == 0
+
+        assert test.out == 'some output'
+        assert test.returncode == 0
+        assert blobs.call_count == 1
+
+    def test_empty(self, tmpdir):
+        run = results.TestrunResult()
+        p = six.text_type(tmpdir.join('results.bin'))
+        backends.binary.write_results(run, p)
+        assert backends.binary.load(p, 'none').tests == {}
+
+    def test_not_binary(self, tmpdir):
+        p = tmpdir.join('results.bin')
+        p.write('{}')
+        with pytest.raises(exceptions.PiglitFatalError):
+            backends.binary.load(six.text_type(p), 'none')
+
+
+class TestBinaryBackend(object):
+    """Tests for the BinaryBackend class."""
+
+    def test_finalize(self, tmpdir):
+        backend = backends.binary.BinaryBackend(six.text_type(tmpdir))
+        backend.initialize(shared.INITIAL_METADATA)
+        with backend.write_test(grouptools.join('a', 'test')) as t:
+            t(results.TestResult('fail'))
+        backend.finalize(
+            {'time_elapsed':
+                results.TimeAttribute(start=0.0, end=1.0).to_json()})
+
+        assert not tmpdir.join('tests').check()
+        loaded = backends.load(six.text_type(tmpdir))
+        assert loaded.tests[grouptools.join('a', 'test')].result == 'fail'
+        assert loaded.totals['root']['fail'] == 1
+        assert loaded.time_elapsed.total == 1.0
@@ -0,0 +1,132 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the backends.cache module."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import json
+import os
+
+import pytest
+import six
+
+from framework import backends
+from framework.backends import cache
+
+from . import shared
+
+# pylint: disable=no-self-use,protected-access
+
+
+@pytest.fixture
+def cache_dir(tmpdir, mocker):
+    mocker.patch('framework.backends.cache._DISABLED', False)
+    mocker.patch('framework.backends.cache._limit', return_value=1024 ** 2)
+    dirname = tmpdir.mkdir('cache')
+    mocker.patch('framework.backends.cache.core.get_cache_dir',
+                 return_value=six.text_type(dirname))
+    return dirname
+
+
+@pytest.fixture
+def path(tmpdir):
+    p = tmpdir.join('results.json')
+    p.write(json.dumps(shared.JSON))
+    return p
+
+
+@pytest.mark.usefixtures('cache_dir')
+class TestLoad(object):
+    """Tests for using the cache from backends.load."""
+
+    def test_hit(self, path, mocker):
+        expected = backends.load(six.text_type(path))
+        load = mocker.patch.object(backends.json, 'load_results')
+        mocker.patch.dict(backends.BACKENDS, {
+            'json': backends.BACKENDS['json']._replace(load=load)})
+        loaded = backends.load(six.text_type(path))
+
+        assert load.call_count == 0
+        assert loaded.name == expected.name
+        assert loaded.totals == expected.totals
+        assert {k: v.to_json() for k, v in six.iteritems(loaded.tests)} == \
+            {k: v.to_json() for k, v in six.iteritems(expected.tests)}
+
+    def test_modified(self, path):
+        backends.load(six.text_type(path))
+        data = dict(shared.JSON)
+        data['name'] = 'changed name'
+        path.write(json.dumps(data))
+
+        assert backends.load(six.text_type(path)).name == 'changed name'
+
+    def test_lazy_not_cached(self, path, cache_dir):
+        backends.load(six.text_type(path), lazy=True)
+        assert cache_dir.listdir() == []
+
+    def test_unfinalized(self, tmpdir, cache_dir):
+        """Results that haven't been finalized aren't cached."""
+        tmpdir.join('metadata.json').write(json.dumps(
+            {k: v for k, v in six.iteritems(shared.JSON) if k != 'tests'}))
+        tmpdir.mkdir('tests').join('0.json').write(json.dumps(
+            {'a@b': shared.JSON['tests']['spec@!opengl 1.0@gl-1.0-readpixsanity']}))
+        backends.load(six.text_type(tmpdir))
+        assert cache_dir.listdir() == []
+
+
+class TestEvict(object):
+    """Tests for the _evict function."""
+
+    def test_least_recently_used(self, cache_dir):
+        for i, name in enumerate(['b', 'a', 'c']):
+            f = cache_dir.join(name + '.pickle')
+            f.write('x' * 10)
+            os.utime(six.text_type(f), (i, i))
+        cache._evict(20)
+
+        assert sorted(f.basename for f in cache_dir.listdir()) == \
+            ['a.pickle', 'c.pickle']
+
+    def test_get_updates(self, cache_dir, path):
+        """Using an entry makes it the most recently used."""
+        backends.load(six.text_type(path))
+        entry = cache_dir.listdir()[0]
+        os.utime(six.text_type(entry), (0, 0))
+        cache.get(six.text_type(path))
+
+        assert entry.mtime() > 0
+
+
+class TestKey(object):
+    """Tests for the _key function."""
+
+    @pytest.mark.parametrize('module', ['json.py', 'junit.py', 'abstract.py'])
+    def test_loaders(self, module, mocker):
+        """Changes to the code that loads results change the key."""
+        stat = cache._stat
+
+        def changed(path):
+            if path.endswith(os.path.join('backends', module)):
+                return (0, 0)
+            return stat(path)
+
+        key = cache._key('foo')
+        mocker.patch('framework.backends.cache._stat', side_effect=changed)
+        assert cache._key('foo') != key
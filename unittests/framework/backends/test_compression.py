@@ -35,6 +35,7 @@ import pytest
 import six
 
 from framework import core
+from framework import exceptions
 from framework.backends import abstract
 from framework.backends import compression
 
@@ -77,6 +78,14 @@ requires_xz_bin = pytest.mark.skipif(  # pylint: disable=invalid-name
     _has_lzma() or not _has_xz_bin(),
     reason="Python 2.x requires xz binary to run this test.")
 
+requires_zst = pytest.mark.skipif(  # pylint: disable=invalid-name
+    'zst' not in compression.COMPRESSORS,
+    reason="zst compression requires a zstd binary.")
+
+requires_lz4 = pytest.mark.skipif(  # pylint: disable=invalid-name
+    'lz4' not in compression.COMPRESSORS,
+    reason="lz4 compression requires an lz4 binary.")
+
 requires_any_lzma = pytest.mark.skipif(  # pylint: disable=invalid-name
     six.PY2 and not (_has_lzma() or _has_xz_bin()),
     reason="Python 2.x requires some form of xz compression to run this test.")
@@ -148,7 +157,8 @@ def test_compress(mode, tmpdir):
         f.write('foo')
 
 
-@pytest.mark.parametrize("mode", ['none', 'bz2', 'gz', requires_lzma('xz')])
+@pytest.mark.parametrize("mode", ['none', 'bz2', 'gz', requires_lzma('xz'),
+                                  requires_zst('zst'), requires_lz4('lz4')])
 def test_decompress(mode, tmpdir):
     """Test that each supported decompressor works.
 
@@ -263,3 +273,77 @@ def test_changed_extension(orig, new, tmpdir, config):
     assert 'results.txt.' + new in os.listdir('.')
     assert 'results.txt.' + orig not in os.listdir('.')
     assert 'results.txt.{}.{}'.format(orig, new) not in os.listdir('.')
+
+
+@pytest.mark.parametrize("mode", [requires_zst('zst'), requires_lz4('lz4')])
+class TestPipe(object):
+    """Tests for the compressors that use a binary."""
+
+    def test_large(self, mode, tmpdir):
+        """More than a pipe's buffer can be written and read back."""
+        text = ''.join('{}\n'.format(i) for i in range(100000))
+        testfile = six.text_type(tmpdir.join('test'))
+        with compression.COMPRESSORS[mode](testfile) as f:
+            f.write(text)
+
+        with compression.DECOMPRESSORS[mode](testfile) as f:
+            assert f.read() == text
+
+    def test_partial_read(self, mode, tmpdir):
+        """Closing the file before reading everything works."""
+        testfile = six.text_type(tmpdir.join('test'))
+        with compression.COMPRESSORS[mode](testfile) as f:
+            f.write('a' * 1000000)
+
+        with compression.DECOMPRESSORS[mode](testfile) as f:
+            assert f.read(3) == 'aaa'
+
+    def test_missing(self, mode, tmpdir):
+        with pytest.raises(IOError):
+            with compression.DECOMPRESSORS[mode](
+                    six.text_type(tmpdir.join('test'))):
+                pass
+
+
+class TestGetLevel(object):
+    """Tests for the compression.get_level function."""
+
+    def test_default(self, config):
+        assert compression.get_level() is None
+
+    def test_config(self, config):
+        config.set('core', 'compression level', '3')
+        assert compression.get_level() == 3
+
+    def test_invalid(self, config):
+        config.set('core', 'compression level', 'fast')
+        with pytest.raises(exceptions.PiglitFatalError):
+            compression.get_level()
+
+    @pytest.mark.parametrize("mode", ['bz2', 'gz', requires_lzma('xz'),
+                                      requires_zst('zst'),
+                                      requires_lz4('lz4')])
+    def test_used(self, mode, config, tmpdir):
+        """The level changes how well the compressors compress."""
+        text = ''.join('{}\n'.format(i * 7919 % 100003) for i in range(50000))
+        sizes = []
+        for level in ['1', '9']:
+            config.set('core', 'compression level', level)
+            testfile = tmpdir.join(level)
+            with compression.COMPRESSORS[mode](six.text_type(testfile)) as f:
+                f.write(text)
+            sizes.append(testfile.size())
+
+        assert sizes[0] > sizes[1]
+
+
+def test_benchmark(tmpdir):
+    """benchmark measures each mode, reading compressed results."""
+    testfile = six.text_type(tmpdir.join('results.json.gz'))
+    with compression.COMPRESSORS['gz'](testfile) as f:
+        f.write('foo' * 1000)
+
+    stats = compression.benchmark(testfile, ['none', 'bz2'])
+    assert [s[0] for s in stats] == ['bz2', 'none']
+    assert stats[1][1] == 3000
+    assert stats[0][1] < 3000
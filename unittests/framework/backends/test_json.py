@@ -23,6 +23,8 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import collections
+import copy
 import os
 try:
     import simplejson as json
@@ -36,6 +38,7 @@ except ImportError:
 import jsonschema
 import pytest
 import six
+from six.moves import cPickle as pickle
 
 from framework import backends
 from framework import exceptions
@@ -144,6 +147,89 @@ class TestJSONBackend(object):
             jsonschema.validate(json_, schema)
 
 
+    class TestJournal(object):
+        """Tests for writing the tests to a journal."""
+
+        name = grouptools.join('a', 'test', 'group', 'test1')
+
+        @pytest.fixture
+        def backend(self, tmpdir):
+            test = backends.json.JSONBackend(six.text_type(tmpdir),
+                                             file_journal=True)
+            test.initialize(shared.INITIAL_METADATA)
+            return test
+
+        def test_single_file(self, backend, tmpdir):
+            for i in range(3):
+                with backend.write_test('test{}'.format(i)) as t:
+                    t(results.TestResult('pass'))
+            assert tmpdir.join('tests').listdir() == \
+                [tmpdir.join('tests', 'journal.json')]
+
+        def test_incomplete(self, backend, tmpdir):
+            """The incomplete placeholder is recorded before the test
+            finishes.
+            """
+            with backend.write_test(self.name):
+                test = backends.json._resume(six.text_type(tmpdir))
+            assert test.tests[self.name].result == 'incomplete'
+
+        def test_finalize(self, backend, tmpdir):
+            with backend.write_test(self.name) as t:
+                t(results.TestResult('pass'))
+            backend.finalize(
+                {'time_elapsed':
+                    results.TimeAttribute(start=0.0, end=1.0).to_json()})
+
+            with tmpdir.join('results.json').open('r') as f:
+                json_ = json.load(f)
+            assert list(json_['tests']) == [self.name]
+            assert json_['tests'][self.name]['result'] == 'pass'
+
+
+class TestWriteStream(object):
+    """Tests for the _write_stream function."""
+
+    tests = [
+        (grouptools.join('group1', 'test1'),
+         results.TestResult('pass').to_json()),
+        (grouptools.join('group1', 'test2'),
+         results.TestResult('fail').to_json()),
+        (grouptools.join('group2', 'test3'),
+         {'result': 'pass', 'out': 'multiple\nlines',
+          'subtests': {'a': 'pass', 'b': 'skip'}}),
+    ]
+
+    @pytest.fixture
+    def written(self):
+        f = six.StringIO()
+        backends.json._write_stream(
+            f, {'name': 'foo', 'options': {'a': [1, 2]}}, iter(self.tests))
+        return f.getvalue()
+
+    def test_same_as_dump(self, written):
+        """The output is equivalent to dumping a TestrunResult."""
+        expected = results.TestrunResult.from_dict(
+            {'name': 'foo', 'options': {'a': [1, 2]},
+             'tests': dict(self.tests)})
+        expected = json.loads(json.dumps(
+            expected, default=backends.json.piglit_encoder))
+        del expected['time_elapsed']
+        for each in ['uname', 'glxinfo', 'wglinfo', 'clinfo', 'lspci']:
+            del expected[each]
+
+        assert json.loads(written) == expected
+
+    def test_totals(self, written):
+        totals = json.loads(written)['totals']
+        assert totals['root']['pass'] == 2
+        assert totals['root']['skip'] == 1
+        assert totals['group1']['fail'] == 1
+
+    def test_indented(self, written):
+        assert '\n            "result": "fail",\n' in written
+
+
 class TestUpdateResults(object):
     """Test for the _update_results function."""
 
@@ -189,6 +275,48 @@ class TestResume(object):
         assert set(test.tests.keys()) == \
             {'group1/test1', 'group1/test2', 'group2/test3'}
 
+    def test_load_journal(self, tmpdir):
+        """backends.json._resume: the last record for a test is used."""
+        backend = backends.json.JSONBackend(six.text_type(tmpdir),
+                                            file_journal=True)
+        backend.initialize(shared.INITIAL_METADATA)
+        with backend.write_test("group1/test1") as t:
+            t(results.TestResult('fail'))
+        with backend.write_test("group1/test2"):
+            pass
+        test = backends.json._resume(six.text_type(tmpdir))
+
+        assert test.tests['group1/test1'].result == 'fail'
+        assert test.tests['group1/test2'].result == 'incomplete'
+
+    def test_decoded_once(self, tmpdir, mocker):
+        """backends.json._resume: each record is only decoded once."""
+        backend = backends.json.JSONBackend(six.text_type(tmpdir))
+        backend.initialize(shared.INITIAL_METADATA)
+        for name in ['group1/test1', 'group1/test2']:
+            with backend.write_test(name) as t:
+                t(results.TestResult('pass'))
+        loads = mocker.spy(backends.json.json, 'loads')
+        backends.json._resume(six.text_type(tmpdir))
+
+        assert sum(1 for c in loads.call_args_list
+                   if c[0][0].lstrip().startswith('{"group1/')) == 2
+
+    def test_load_invalid_rerun(self, tmpdir):
+        """backends.json._resume: if the last record of a test is invalid
+        an earlier one is used.
+        """
+        f = six.text_type(tmpdir)
+        backend = backends.json.JSONBackend(f)
+        backend.initialize(shared.INITIAL_METADATA)
+        with backend.write_test("group1/test1") as t:
+            t(results.TestResult('fail'))
+        with open(os.path.join(f, 'tests', '9.json'), 'w') as w:
+            w.write('{"group1/test1": {"result": ')
+        test = backends.json._resume(f)
+
+        assert test.tests['group1/test1'].result == 'fail'
+
     def test_load_invalid_folder(self, tmpdir):
         """backends.json._resume: ignores invalid results"""
         f = six.text_type(tmpdir)
@@ -269,3 +397,193 @@ class TestLoad(object):
         with p.open('r') as f:
             with pytest.raises(exceptions.PiglitFatalError):
                 backends.json._load(f)
+
+
+class TestScanObject(object):
+    """Tests for the _scan_object function."""
+
+    @staticmethod
+    def scan(text):
+        members = []
+
+        def member(key, start):
+            value, end = json.JSONDecoder().raw_decode(text, start)
+            members.append((key, value))
+            return end
+
+        return backends.json._scan_object(text, 0, member), members
+
+    def test_basic(self):
+        text = ' { "a": 1, "b" : {"c": [1, {"}": "]"}]} ,"d": "\\"x,"} '
+        end, members = self.scan(text)
+        assert end == len(text) - 1
+        assert dict(members) == json.loads(text)
+
+    def test_order(self):
+        assert [k for k, _ in self.scan('{"b": 1, "a": 2}')[1]] == ['b', 'a']
+
+    def test_empty(self):
+        assert self.scan('{ }') == (3, [])
+
+    @pytest.mark.parametrize('text', ['{"a": 1', '[1, 2]', '{"a" 1}',
+                                      '{"a": 1 "b": 2}', '{a: 1}'])
+    def test_invalid(self, text):
+        with pytest.raises(ValueError):
+            self.scan(text)
+
+
+class TestLoadLazy(object):
+    """Tests for loading results with lazy=True."""
+
+    name = 'spec@!opengl 1.0@gl-1.0-readpixsanity'
+
+    @pytest.fixture
+    def path(self, tmpdir):
+        p = tmpdir.join('results.json')
+        p.write(json.dumps(shared.JSON, indent=4))
+        return six.text_type(p)
+
+    def test_same_as_eager(self, path):
+        eager = backends.json.load_results(path, 'none')
+        lazy = backends.json.load_results(path, 'none', lazy=True)
+
+        assert isinstance(lazy.tests[self.name],
+                          backends.json.LazyTestResult)
+        assert lazy.tests[self.name].to_json() == \
+            eager.tests[self.name].to_json()
+        assert lazy.totals == eager.totals
+        assert lazy.name == eager.name
+
+    def test_output_decoded_on_use(self, path, mocker):
+        """The output of a test is only decoded again when it is used."""
+        result = backends.json.load_results(path, 'none', lazy=True)
+        loads = mocker.spy(backends.json.json, 'loads')
+
+        assert result.tests[self.name].result == 'fail'
+        assert result.tests[self.name].time.total > 0
+        assert loads.call_count == 0
+
+        assert result.tests[self.name].err.startswith('piglit: error')
+        assert result.tests[self.name].command.endswith('-fbo')
+        assert loads.call_count == 1
+
+    @pytest.mark.parametrize('compression', ['none', 'gz'])
+    def test_any_order(self, tmpdir, mocker, compression):
+        """Tests can be loaded in any order, without keeping the file in
+        memory.
+        """
+        mocker.patch.object(backends.json._Source, 'CHUNK_SIZE', 7)
+        data = copy.deepcopy(shared.JSON)
+        test = data['tests'][self.name]
+        data['tests'] = collections.OrderedDict(
+            ('t{}'.format(i), dict(test, out='out {}'.format(i)))
+            for i in range(5))
+        p = tmpdir.join('results.json')
+        with backends.compression.COMPRESSORS[compression](
+                six.text_type(p)) as f:
+            f.write(six.text_type(json.dumps(data)))
+
+        result = backends.json.load_results(six.text_type(p), compression,
+                                            lazy=True)
+        for i in [1, 3, 4, 0, 2]:
+            assert result.tests['t{}'.format(i)].out == 'out {}'.format(i)
+
+    def test_defaults(self, tmpdir):
+        p = tmpdir.join('results.json')
+        p.write('{"results_version": 9, "tests": {"a": {}}}')
+        test = backends.json.load_results(six.text_type(p), 'none',
+                                          lazy=True).tests['a']
+
+        assert test.to_json() == results.TestResult().to_json()
+        assert test.out == ''
+
+    def test_pickle(self, path):
+        test = backends.json.load_results(path, 'none', lazy=True)
+        test = pickle.loads(pickle.dumps(test.tests[self.name]))
+        assert type(test) is results.TestResult  # pylint: disable=unidiomatic-typecheck
+        assert test.result == 'fail'
+
+    def test_old_version(self, tmpdir):
+        """Old results are updated and loaded eagerly."""
+        data = copy.deepcopy(shared.JSON)
+        data['results_version'] = 8
+        for test in data['tests'].values():
+            test['pid'] = test['pid'][0]
+        p = tmpdir.join('results.json')
+        p.write(json.dumps(data))
+        result = backends.json.load_results(six.text_type(p), 'none',
+                                            lazy=True)
+
+        assert result.tests[self.name].pid == [11768]
+
+    def test_bad_json(self, tmpdir):
+        p = tmpdir.join('results.json')
+        p.write('{"results_version": 9, "tests": {"a": }')
+        with pytest.raises(exceptions.PiglitFatalError):
+            backends.json.load_results(six.text_type(p), 'none', lazy=True)
+
+
+class TestIterTests(object):
+    """Tests for the iter_tests function."""
+
+    name = 'spec@!opengl 1.0@gl-1.0-readpixsanity'
+
+    @pytest.fixture
+    def path(self, tmpdir):
+        p = tmpdir.join('results.json')
+        p.write(json.dumps(shared.JSON, indent=4))
+        return six.text_type(p)
+
+    @pytest.fixture(params=[1, 3, 7, 4096])
+    def chunk(self, request, mocker):
+        """Read in chunks that end inside of strings and numbers."""
+        mocker.patch.object(backends.json._Reader, 'CHUNK_SIZE',
+                            request.param)
+
+    @pytest.mark.usefixtures('chunk')
+    def test_same_as_load(self, path):
+        loaded = backends.json.load_results(path, 'none')
+        testrun = results.TestrunResult()
+        tests = list(backends.json.iter_tests(path, 'none', testrun))
+
+        assert [n for n, _ in tests] == list(loaded.tests)
+        assert [t.to_json() for _, t in tests] == \
+            [t.to_json() for t in six.itervalues(loaded.tests)]
+        assert testrun.name == loaded.name
+        assert testrun.totals == loaded.totals
+        assert testrun.time_elapsed.end == loaded.time_elapsed.end
+
+    @pytest.mark.usefixtures('chunk')
+    def test_whitespace(self, tmpdir):
+        p = tmpdir.join('results.json')
+        p.write(' {\n "results_version" : 9 ,"tests":{ "a b" :\t{} } ,\n'
+                ' "name" : "x y" } ')
+        testrun = results.TestrunResult()
+        tests = list(backends.json.iter_tests(six.text_type(p), 'none',
+                                              testrun))
+
+        assert [n for n, _ in tests] == ['a b']
+        assert testrun.name == 'x y'
+
+    def test_old_version(self, tmpdir):
+        """Old results are loaded and updated."""
+        data = copy.deepcopy(shared.JSON)
+        data['results_version'] = 8
+        for test in data['tests'].values():
+            test['pid'] = test['pid'][0]
+        p = tmpdir.join('results.json')
+        p.write(json.dumps(data))
+        tests = dict(backends.json.iter_tests(six.text_type(p), 'none'))
+
+        assert tests[self.name].pid == [11768]
+
+    def test_bad_json(self, tmpdir):
+        p = tmpdir.join('results.json')
+        p.write('{"results_version": 9, "tests": {"a": }')
+        with pytest.raises(exceptions.PiglitFatalError):
+            list(backends.json.iter_tests(six.text_type(p), 'none'))
+
+    def test_package(self, path):
+        """backends.iter_tests streams json results."""
+        assert [n for n, _ in backends.iter_tests(path)] == \
+            list(shared.JSON['tests'])
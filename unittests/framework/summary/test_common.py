@@ -25,9 +25,14 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+import json
+import operator
+
 import pytest
+import six
 from six.moves import range
 
+from framework import backends
 from framework import grouptools
 from framework import results
 from framework import status
@@ -445,3 +450,130 @@ class TestEscapeFilename(object):
         expected = 'foo_bar_boink'
 
         assert expected == summary.escape_pathname(invalid)
+
+
+class TestStatusMatrix(object):
+    """Tests for the StatusMatrix class."""
+
+    @pytest.fixture(scope='class')
+    def runs(self):
+        """Three runs with every combination of statuses and missing tests."""
+        statuses = list(status.ALL) + [None]
+        runs = [results.TestrunResult() for _ in range(3)]
+        for i, combo in enumerate(
+                (a, b, c) for a in statuses for b in statuses
+                for c in statuses):
+            for run, stat in zip(runs, combo):
+                if stat is not None:
+                    run.tests['test{}'.format(i)] = results.TestResult(stat)
+                    run.tests['group{}'.format(i)] = results.TestResult('pass')
+                    run.tests['group{}'.format(i)].subtests['sub'] = stat
+        return runs
+
+    @staticmethod
+    def _get(run, name):
+        try:
+            return run.get_result(name)
+        except KeyError:
+            return status.NOTRUN
+
+    @staticmethod
+    def _in(run, name):
+        try:
+            run.get_result(name)
+        except KeyError:
+            return False
+        return True
+
+    def test_single(self, runs):
+        """summary.StatusMatrix.single: matches find_single."""
+        names = summary.Results(runs).names
+        assert names.problems == summary.find_single(
+            runs, names.all, lambda x: x > status.PASS)
+        assert names.skips == summary.find_single(
+            runs, names.all, lambda x: x is status.SKIP)
+        assert names.incomplete == summary.find_single(
+            runs, names.all, lambda x: x is status.INCOMPLETE)
+
+    def test_diff(self, runs):
+        """summary.StatusMatrix.diff: matches find_diffs."""
+        names = summary.Results(runs).names
+
+        def changes(names_, name, prev, cur):
+            prev, cur = self._get(prev, name), self._get(cur, name)
+            if prev != cur and {prev, cur} != {status.SKIP, status.NOTRUN}:
+                names_.add(name)
+
+        def enabled(names_, name, prev, cur):
+            if self._in(cur, name) and not self._in(prev, name):
+                names_.add(name)
+
+        def disabled(names_, name, prev, cur):
+            if self._in(prev, name) and not self._in(cur, name):
+                names_.add(name)
+
+        assert names.changes[1:] == summary.find_diffs(
+            runs, names.all, operator.ne, handler=changes)
+        assert names.regressions[1:] == summary.find_diffs(
+            runs, names.all, lambda x, y: x < y and min(x, y) >= status.PASS)
+        assert names.fixes[1:] == summary.find_diffs(
+            runs, names.all, lambda x, y: x > y and min(x, y) >= status.PASS)
+        assert names.enabled[1:] == summary.find_diffs(
+            runs, names.all,
+            lambda x, y: x is status.NOTRUN and y is not status.NOTRUN,
+            handler=enabled)
+        assert names.disabled[1:] == summary.find_diffs(
+            runs, names.all,
+            lambda x, y: x is not status.NOTRUN and y is status.NOTRUN,
+            handler=disabled)
+
+
+def _write_run(tmpdir, name):
+    """Write a results file with a single test, and return its path."""
+    testrun = results.TestrunResult()
+    testrun.name = name
+    test = results.TestResult('pass')
+    test.out = 'output'
+    test.subtests['sub'] = 'fail'
+    testrun.tests['a@b'] = test
+    testrun.calculate_group_totals()
+    data = testrun.to_json()
+    data['results_version'] = backends.json.CURRENT_JSON_VERSION
+    p = tmpdir.join('{}.json'.format(name))
+    p.write(json.dumps(data, default=backends.json.piglit_encoder))
+    return six.text_type(p)
+
+
+class TestLoadResults(object):
+    """Tests for the load_results function."""
+
+    def test_stream(self, tmpdir):
+        """With stream=True the output isn't kept."""
+        loaded = summary.load_results(_write_run(tmpdir, 'foo'), stream=True)
+        assert loaded.name == 'foo'
+        assert loaded.tests['a@b'].result == 'fail'
+        assert loaded.tests['a@b'].subtests['sub'] == 'fail'
+        assert loaded.tests['a@b'].out == ''
+        assert loaded.totals['a']['fail'] == 1
+
+    def test_testrun(self):
+        testrun = results.TestrunResult()
+        assert summary.load_results(testrun, stream=True) is testrun
+
+
+class TestLoadAll(object):
+    """Tests for the load_all function."""
+
+    @pytest.mark.parametrize('stream', [True, False])
+    def test_parallel(self, tmpdir, stream):
+        """Results loaded in parallel are the same, and in the same order."""
+        paths = [_write_run(tmpdir, n) for n in ['a', 'b', 'c']]
+        run = results.TestrunResult()
+        loaded = summary.load_all([paths[0], run] + paths[1:], jobs=2,
+                                  stream=stream)
+
+        assert loaded[1] is run
+        assert [l.name for l in loaded] == ['a', None, 'b', 'c']
+        assert loaded[3].get_result('a@b@sub') == 'fail'
+        assert loaded[3].totals['a']['fail'] == 1
+        assert loaded[3].tests['a@b'].out == ('' if stream else 'output')
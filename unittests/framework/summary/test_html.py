@@ -25,11 +25,14 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import json
 import os
 
+import pytest
 import six
 
-from framework.summary import html_
+from framework import backends, grouptools, results, status
+from framework.summary import common, html_
 
 
 def test_copy_static(tmpdir):
@@ -38,3 +41,156 @@ def test_copy_static(tmpdir):
     html_._copy_static_files(six.text_type(tmpdir))
     assert os.path.exists('index.css'), 'index.css not created correctly'
     assert os.path.exists('result.css'), 'result.css not created correctly'
+
+
+class TestMakeTestrunInfo(object):
+    """Tests for the _make_testrun_info function."""
+
+    @pytest.fixture
+    def results_(self):
+        run = results.TestrunResult()
+        run.name = 'run'
+        run.tests[grouptools.join('group', 'pass')] = results.TestResult('pass')
+        run.tests[grouptools.join('group', 'fail')] = results.TestResult('fail')
+        run.tests['skip'] = results.TestResult('skip')
+        run.calculate_group_totals()
+        return common.Results([run])
+
+    @staticmethod
+    def _pages(tmpdir):
+        return {p.relto(tmpdir): p.read_binary() for p in tmpdir.visit()
+                if p.check(file=True)}
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_pages(self, tmpdir, results_, jobs):
+        """A page is written for each test that isn't excluded."""
+        html_._make_testrun_info(results_, six.text_type(tmpdir),
+                                 {status.SKIP}, jobs=jobs)
+        assert sorted(self._pages(tmpdir)) == sorted([
+            os.path.join('run', 'index.html'),
+            os.path.join('run', 'group@fail.html'),
+            os.path.join('run', 'group@pass.html'),
+        ])
+
+    def test_jobs(self, tmpdir, results_):
+        """The same pages are written by one and several processes."""
+        html_._make_testrun_info(results_, six.text_type(tmpdir.mkdir('a')))
+        html_._make_testrun_info(results_, six.text_type(tmpdir.mkdir('b')),
+                                 jobs=2)
+        assert self._pages(tmpdir.join('a')) == self._pages(tmpdir.join('b'))
+
+
+class TestIncremental(object):
+    """Tests for incremental html summaries."""
+
+    @staticmethod
+    def _write(path, name, result):
+        run = results.TestrunResult()
+        run.name = name
+        run.results_version = backends.json.CURRENT_JSON_VERSION
+        run.tests['test'] = results.TestResult(result)
+        path.write(json.dumps(run.to_json(),
+                              default=backends.json.piglit_encoder))
+        return six.text_type(path)
+
+    @pytest.fixture
+    def runs(self, tmpdir):
+        return [self._write(tmpdir.join('a.json'), 'a', 'pass'),
+                self._write(tmpdir.join('b.json'), 'b', 'pass')]
+
+    def test_reuse(self, tmpdir, runs):
+        """The pages of unchanged runs are not rendered again."""
+        dest = tmpdir.mkdir('summary')
+        html_.html(runs, six.text_type(dest), [], incremental=True)
+        dest.join('a', 'test.html').write('unchanged')
+
+        self._write(tmpdir.join('b.json'), 'b', 'fail')
+        html_.html(runs, six.text_type(dest), [], incremental=True)
+
+        assert dest.join('a', 'test.html').read() == 'unchanged'
+        assert 'fail' in dest.join('b', 'test.html').read()
+        assert 'fail' in dest.join('changes.html').read()
+
+    def test_removed(self, tmpdir, runs):
+        """The pages of runs that are no longer summarized are removed."""
+        dest = tmpdir.mkdir('summary')
+        html_.html(runs, six.text_type(dest), [], incremental=True)
+        html_.html(runs[:1], six.text_type(dest), [], incremental=True)
+
+        assert not dest.join('b').check()
+
+    def test_exclude(self, tmpdir, runs):
+        """Changing the excluded statuses renders the pages again."""
+        dest = tmpdir.mkdir('summary')
+        html_.html(runs, six.text_type(dest), [], incremental=True)
+        html_.html(runs, six.text_type(dest), [status.PASS],
+                   incremental=True)
+
+        assert not dest.join('a', 'test.html').check()
+
+
+class TestPaged(object):
+    """Tests for the paged comparison pages."""
+
+    @pytest.fixture
+    def summary_(self, tmpdir):
+        runs = []
+        for name, result in [('a', 'pass'), ('b', 'fail')]:
+            run = results.TestrunResult()
+            run.name = name
+            run.tests[grouptools.join('spec', 'ext', 'test')] = \
+                results.TestResult(result)
+            run.tests['toplevel'] = results.TestResult('pass')
+            run.calculate_group_totals()
+            runs.append(run)
+
+        dest = tmpdir.mkdir('summary')
+        html_._make_paged_comparison_pages(
+            common.Results(runs), six.text_type(dest), [])
+        return dest
+
+    @staticmethod
+    def _rows(path):
+        prefix, text = path.read().split(', ', 1)
+        assert prefix.startswith('piglit.rows(')
+        return json.loads(text[:-len(');\n')])
+
+    def test_group_rows(self, summary_):
+        """The rows of a group are written to its data file."""
+        assert self._rows(summary_.join('data', 'index', '0.js')) == [
+            [1, 'ext', False, [['pass', '1/1'], ['fail', '0/1']]],
+            [2, 'test', True, [['pass', 'a/spec@ext@test.html'],
+                               ['fail', 'b/spec@ext@test.html']]],
+        ]
+
+    def test_index(self, summary_):
+        """Only the top level groups and tests are in the page."""
+        page = summary_.join('index.html').read()
+        assert 'piglit.toggle(0)' in page
+        assert 'toplevel' in page
+        assert 'spec@ext@test' not in page
+
+    def test_empty(self, summary_):
+        """Empty categories get the empty page."""
+        assert 'No skips' in summary_.join('skips.html').read()
+        assert not summary_.join('data', 'skips').check()
+
+    def test_stale_data(self, tmpdir):
+        """The rows of a previous summary are removed."""
+        dest = tmpdir.mkdir('summary')
+        dest.join('data', 'skips', '0.js').write('old', ensure=True)
+        run = results.TestrunResult()
+        run.name = 'a'
+        run.tests['toplevel'] = results.TestResult('pass')
+        run.calculate_group_totals()
+        html_._make_paged_comparison_pages(
+            common.Results([run]), six.text_type(dest), [])
+        assert not dest.join('data', 'skips').check()
+
+    def test_normalize_href(self):
+        """Backslashes in test names are forward slashes in the links."""
+        run = results.TestrunResult()
+        run.name = 'a'
+        run.tests['foo\\bar'] = results.TestResult('pass')
+        assert html_._test_cells(common.Results([run]), 'foo\\bar', []) == \
+            [['pass', 'a/foo/bar.html']]
@@ -0,0 +1,111 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the async_ module."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import sys
+
+import pytest
+
+from framework import dmesg
+from framework import log
+from framework import monitoring
+from framework import status
+from .. import skip
+from .. import utils
+
+async_ = pytest.importorskip('framework.test.async_')
+
+# pylint: disable=invalid-name,no-self-use
+
+
+def _execute(test, mocker):
+    """Execute a single test on an event loop."""
+    dmesg_ = mocker.Mock(spec=dmesg.BaseDmesg)
+    dmesg_.update_result.side_effect = lambda r: r
+    options = {'dmesg': dmesg_,
+               'monitor': mocker.Mock(spec=monitoring.Monitoring)}
+
+    lane = async_.Lane(1)
+    lane.add(lambda loop: async_.execute(
+        test, 'foo', mocker.Mock(spec=log.BaseLog), options, loop))
+    async_.run([lane])
+    return test.result
+
+
+class TestExecute(object):
+    """Tests for the execute function."""
+
+    def test_output(self, mocker):
+        """Captures the output and returncode of the command."""
+        result = _execute(
+            utils.Test([sys.executable, '-c', 'print("foo")']), mocker)
+        assert result.out == 'foo\n'
+        assert result.returncode == 0
+
+    def test_not_found(self, mocker):
+        """Sets the result to skip if the command doesn't exist."""
+        result = _execute(utils.Test(['this_command_will_never_exist']), mocker)
+        assert result.result is status.SKIP
+
+    @skip.posix
+    @pytest.mark.slow
+    @pytest.mark.timeout(6)
+    def test_timeout(self, mocker):
+        """Sets the result to timeout when the timeout is exceeded."""
+        test = utils.Test(['sleep', '60'])
+        test.timeout = 1
+        assert _execute(test, mocker).result is status.TIMEOUT
+
+    def test_exception(self, mocker):
+        """Records exceptions raised running the test."""
+        test = utils.Test(['foo'])
+        mocker.patch.object(test, '_pre_run', side_effect=Exception('foo'))
+        result = _execute(test, mocker)
+        assert result.result is status.FAIL
+        assert result.exception != ''
+
+
+class TestLane(object):
+    """Tests for the Lane class."""
+
+    def test_limit(self):
+        """Never runs more than limit items at once."""
+        state = {'running': 0, 'max': 0}
+
+        def func(loop):
+            state['running'] += 1
+            state['max'] = max(state['max'], state['running'])
+            future = loop.create_future()
+
+            def done():
+                state['running'] -= 1
+                future.set_result(None)
+            loop.call_later(0.01, done)
+            return future
+
+        lane = async_.Lane(3)
+        for _ in range(10):
+            lane.add(func)
+        async_.run([lane])
+
+        assert state['max'] == 3
+        assert state['running'] == 0
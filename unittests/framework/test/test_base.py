@@ -23,7 +23,9 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import gzip
 import os
+import sys
 import textwrap
 try:
     import subprocess32 as subprocess
@@ -36,6 +38,7 @@ import six
 from framework import dmesg
 from framework import log
 from framework import monitoring
+from framework import results
 from framework import status
 from framework.options import _Options as Options
 from framework.test import base
@@ -237,6 +240,41 @@ class TestTest(object):
             assert shared_test.exception != ''
             assert isinstance(shared_test.exception, six.string_types)
 
+    class TestExecuteRunner(object):
+        """Test.execute tests for the runner argument."""
+
+        @pytest.fixture
+        def shared_test(self, mocker):
+            test = _Test(['foo'])
+            test.run = mocker.Mock()
+
+            result = results.TestResult('pass')
+            runner = mocker.Mock(return_value=result)
+            dmesg_ = mocker.Mock(spec=dmesg.BaseDmesg)
+            dmesg_.update_result.side_effect = lambda r: r
+            test.execute(mocker.Mock(spec=six.text_type),
+                         mocker.Mock(spec=log.BaseLog),
+                         {'dmesg': dmesg_,
+                          'monitor': mocker.Mock(spec=monitoring.Monitoring)},
+                         runner=runner)
+            return test, runner, result
+
+        def test_run_not_called(self, shared_test):
+            """Test.execute (runner): Doesn't call run()."""
+            test, _, _ = shared_test
+            assert not test.run.called
+
+        def test_runner_called(self, shared_test):
+            """Test.execute (runner): Calls runner with the test."""
+            test, runner, _ = shared_test
+            runner.assert_called_once_with(test)
+
+        def test_result(self, shared_test):
+            """Test.execute (runner): Uses the result the runner returns."""
+            test, _, result = shared_test
+            assert test.result is result
+            assert test.result.time.end != 0
+
     class TestCommand(object):
         """Tests for Test.command."""
 
@@ -284,6 +322,74 @@ class TestTest(object):
             assert test.result.result is status.FAIL
 
 
+class TestOutputCapture(object):
+    """Tests for the _OutputCapture class."""
+
+    data = b''.join([b'head\n' * 10,
+                     b'PIGLIT: {"subtest": {"a": "pass"}}\n',
+                     b'middle\n' * 100,
+                     b'PIGLIT: {"result": "pass"}\n',
+                     b'tail\n' * 10])
+
+    @staticmethod
+    def capture(data, directory, size):
+        """Write data to an _OutputCapture in pieces of size bytes."""
+        capture = base._OutputCapture(52, 52, directory, 'stdout-')
+        for i in range(0, len(data), size):
+            capture.write(data[i:i + size])
+        capture.close()
+        return capture
+
+    def test_small(self, tmpdir):
+        """Output that fits is kept whole, and isn't saved."""
+        capture = self.capture(b'foo\nbar\n', six.text_type(tmpdir), 3)
+        assert capture.value() == b'foo\nbar\n'
+        assert capture.filename is None
+        assert tmpdir.listdir() == []
+
+    @pytest.mark.parametrize('size', [1, 3, 7, 64, 4096])
+    def test_large(self, tmpdir, size):
+        """The head, tail, and PIGLIT: lines of large output are kept."""
+        capture = self.capture(self.data, six.text_type(tmpdir), size)
+        value = capture.value()
+
+        assert value.startswith(b'head\n' * 10 + b'[piglit: ')
+        assert value.endswith(b'PIGLIT: {"subtest": {"a": "pass"}}\n'
+                              b'PIGLIT: {"result": "pass"}\n' +
+                              b'tail\n' * 10)
+        assert b'middle' not in value
+        with gzip.open(capture.filename, 'rb') as f:
+            assert f.read() == self.data
+
+    def test_not_saved(self):
+        """Without a directory the middle of the output is dropped."""
+        value = self.capture(self.data, None, 64).value()
+        assert b'it was not saved' in value
+        assert value.endswith(b'tail\n' * 10)
+
+    def test_run_command(self, mocker, tmpdir):
+        """Test._run_command uses it when the output is limited."""
+        opts = mocker.patch('framework.test.base.OPTIONS',
+                            new_callable=Options)
+        opts.output_head = 10
+        opts.output_tail = 10
+        opts.output_dir = six.text_type(tmpdir.join('output'))
+
+        test = _Test([sys.executable, '-c', textwrap.dedent("""\
+            import sys
+            print('x' * 100)
+            print('PIGLIT: {"result": "pass"}')
+            print('y' * 100)
+            sys.stderr.write('z\\n')
+        """)])
+        test.run()
+
+        assert 'PIGLIT: {"result": "pass"}\n' in test.result.out
+        assert 'xxxxxxxxxx' not in test.result.out
+        assert test.result.err == 'z\n'
+        assert len(tmpdir.join('output').listdir()) == 1
+
+
 class TestWindowResizeMixin(object):
     """Tests for the WindowResizeMixin class."""
 
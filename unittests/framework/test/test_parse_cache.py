@@ -0,0 +1,94 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the parse_cache module."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+import textwrap
+
+import pytest
+import six
+
+from framework.test import parse_cache
+from framework.test import shader_test
+
+# pylint: disable=invalid-name,no-self-use,protected-access
+
+
+@pytest.fixture
+def cache(tmpdir, mocker):
+    mocker.patch('framework.test.parse_cache._DISABLED', False)
+    mocker.patch('framework.test.parse_cache.core.get_cache_dir',
+                 return_value=six.text_type(tmpdir.mkdir('cache')))
+    return parse_cache.ParseCache()
+
+
+@pytest.fixture
+def testfile(tmpdir):
+    f = tmpdir.join('foo.shader_test')
+    f.write('foo')
+    return f
+
+
+class TestParseCache(object):
+    """Tests for the ParseCache class."""
+
+    def test_get_missing(self, cache, testfile):
+        """Returns None for files that aren't in the cache."""
+        assert cache.get(six.text_type(testfile)) is None
+
+    def test_get(self, cache, testfile):
+        """Returns the value that was set."""
+        cache.set(six.text_type(testfile), 'bar')
+        assert cache.get(six.text_type(testfile)) == 'bar'
+
+    def test_get_modified(self, cache, testfile):
+        """Returns None if the file has changed since the value was set."""
+        cache.set(six.text_type(testfile), 'bar')
+        testfile.write('foobar')
+        assert cache.get(six.text_type(testfile)) is None
+
+    def test_save(self, cache, testfile):
+        """Values are persisted by save()."""
+        cache.set(six.text_type(testfile), 'bar')
+        cache.save()
+        assert parse_cache.ParseCache().get(six.text_type(testfile)) == 'bar'
+
+
+def test_shader_test_parser(cache, testfile, mocker):
+    """shader_test.Parser uses the values from the parse cache."""
+    mocker.patch('framework.test.shader_test.PARSE_CACHE', cache)
+    testfile.write(textwrap.dedent("""\
+        [require]
+        GL ES >= 3.0
+        GL_ARB_ham_sandwhich
+        """))
+
+    expected = shader_test.Parser(six.text_type(testfile))
+    expected.parse()
+
+    open_ = mocker.patch('framework.test.shader_test.io.open')
+    actual = shader_test.Parser(six.text_type(testfile))
+    actual.parse()
+
+    assert not open_.called
+    assert actual.prog == expected.prog == 'shader_runner_gles3'
+    assert actual.gl_required == expected.gl_required
+    assert actual.gles_version == expected.gles_version
@@ -201,6 +201,51 @@ class TestPiglitConfig(object):
         assert self.conf.safe_get('invalid', 'invalid', fallback='foo') == 'foo'
 
 
+class TestGetCacheDir(object):
+    """Tests for core.get_cache_dir."""
+
+    @pytest.fixture
+    def conf(self, mocker):
+        conf = mocker.patch('framework.core.PIGLIT_CONFIG',
+                            new_callable=core.PiglitConfig)
+        conf.add_section('core')
+        return conf
+
+    def test_xdg(self, conf, mocker, tmpdir):
+        """The default is in $XDG_CACHE_HOME."""
+        mocker.patch.dict('os.environ',
+                          {'XDG_CACHE_HOME': six.text_type(tmpdir)})
+        assert core.get_cache_dir('foo') == \
+            six.text_type(tmpdir.join('piglit', 'foo'))
+
+    @skip.posix
+    def test_private(self, conf, tmpdir):
+        """New directories can only be used by the current user."""
+        conf.set('core', 'cache dir', six.text_type(tmpdir.join('cache')))
+        dirname = core.get_cache_dir('foo')
+        assert os.stat(dirname).st_mode & 0o777 == 0o700
+        assert tmpdir.join('cache').stat().mode & 0o777 == 0o700
+
+    @skip.posix
+    def test_writable(self, conf, tmpdir):
+        """Directories other users can write to aren't used."""
+        cache = tmpdir.mkdir('cache')
+        cache.chmod(0o777)
+        conf.set('core', 'cache dir', six.text_type(cache))
+        with pytest.warns(RuntimeWarning):
+            with pytest.raises(OSError):
+                core.get_cache_dir('foo')
+
+    @skip.posix
+    def test_owner(self, conf, mocker, tmpdir):
+        """Directories owned by another user aren't used."""
+        conf.set('core', 'cache dir', six.text_type(tmpdir.join('cache')))
+        mocker.patch('framework.core.os.getuid', return_value=os.getuid() + 1)
+        with pytest.warns(RuntimeWarning):
+            with pytest.raises(OSError):
+                core.get_cache_dir()
+
+
 class TestCheckDir(object):
     """Tests for core.check_dir."""
 
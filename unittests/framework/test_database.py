@@ -0,0 +1,124 @@
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the database module."""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import pytest
+import six
+
+from framework import database
+from framework import exceptions
+from framework import grouptools
+from framework import results
+from framework import status
+
+# pylint: disable=no-self-use
+
+
+def _run(name, start, result, subtest=None):
+    """Create a TestrunResult with a single test."""
+    run = results.TestrunResult()
+    run.name = name
+    run.time_elapsed.start = start
+    run.tests['test'] = results.TestResult(result)
+    run.tests['test'].out = 'output of {}'.format(name)
+    if subtest is not None:
+        run.tests['group'] = results.TestResult('pass')
+        run.tests['group'].subtests['sub'] = subtest
+    return run
+
+
+class TestResultsDB(object):
+    """Tests for the ResultsDB class."""
+
+    @pytest.fixture
+    def db(self, tmpdir):
+        with database.ResultsDB(six.text_type(tmpdir.join('db'))) as db:
+            # These are added out of order, runs are ordered by start time
+            db.add(_run('second', 2.0, 'fail', 'fail'))
+            db.add(_run('first', 1.0, 'pass', 'pass'))
+            db.add(_run('third', 3.0, 'fail'))
+            yield db
+
+    def test_runs(self, db):
+        """runs returns the runs in order of their start time."""
+        assert db.runs() == ['first', 'second', 'third']
+
+    def test_history(self, db):
+        """history returns the status of a test in each run."""
+        assert db.history('test') == [
+            ('first', status.PASS), ('second', status.FAIL),
+            ('third', status.FAIL)]
+
+    def test_history_subtest(self, db):
+        """history returns None for runs without the subtest."""
+        assert db.history(grouptools.join('group', 'sub')) == [
+            ('first', status.PASS), ('second', status.FAIL),
+            ('third', None)]
+
+    def test_first(self, db):
+        """first returns the oldest run with one of the statuses."""
+        assert db.first('test', ['fail', 'crash']) == 'second'
+
+    def test_first_none(self, db):
+        """first returns None if the test never had the status."""
+        assert db.first('test', ['crash']) is None
+
+    def test_load(self, db):
+        """load returns the run as a TestrunResult."""
+        run = db.load('second')
+        assert run.name == 'second'
+        assert run.get_result('test') is status.FAIL
+        assert run.tests['test'].out == 'output of second'
+        assert run.get_result(grouptools.join('group', 'sub')) is status.FAIL
+        assert run.totals['root']['fail'] == 2
+
+    def test_load_missing(self, db):
+        """load raises KeyError for runs that aren't in the database."""
+        with pytest.raises(KeyError):
+            db.load('fourth')
+
+    def test_duplicate(self, db):
+        """Adding a run with an existing name is an error."""
+        with pytest.raises(exceptions.PiglitFatalError):
+            db.add(_run('first', 4.0, 'crash'))
+
+    def test_replace(self, db):
+        """A run can be replaced."""
+        db.add(_run('first', 4.0, 'crash'), replace=True)
+        assert db.runs() == ['second', 'third', 'first']
+        assert db.history(grouptools.join('group', 'sub'))[2] == \
+            ('first', None)
+
+    def test_remove(self, db):
+        """Removing a run removes its tests."""
+        db.remove('second')
+        assert db.history('test') == [
+            ('first', status.PASS), ('third', status.FAIL)]
+
+    def test_reopen(self, tmpdir):
+        """Runs are kept when the database is opened again."""
+        filename = six.text_type(tmpdir.join('db'))
+        with database.ResultsDB(filename) as db:
+            db.add(_run('first', 1.0, 'pass'))
+        with database.ResultsDB(filename) as db:
+            assert db.runs() == ['first']
@@ -29,6 +29,8 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 import collections
+import errno
+import os
 import re
 try:
     import mock
@@ -47,6 +49,14 @@ from . import skip
 
 # pylint: disable=invalid-name,no-self-use
 
+_open = os.open
+
+
+def _fake_kmsg(mocker):
+    """Make KmsgDmesg open /dev/null instead of /dev/kmsg."""
+    mocker.patch('framework.dmesg.os.open',
+                 side_effect=lambda *_: _open(os.devnull, os.O_RDONLY))
+
 
 class _DmesgTester(dmesg.BaseDmesg):
     """Test Dmesg class. stubs update_dmesg and __init__"""
@@ -311,6 +321,118 @@ class TestLinuxDmesg(object):
             assert repr(dmesg.LinuxDmesg()) == 'LinuxDmesg()'
 
 
+class TestKmsgDmesg(object):
+    """Tests for the KmsgDmesg class."""
+
+    @pytest.fixture
+    def kmsg(self, mocker):
+        """Return a function that adds records to a fake /dev/kmsg."""
+        records = collections.deque()
+
+        def read(fd, size):
+            if not records:
+                raise OSError(errno.EAGAIN, 'Resource temporarily unavailable')
+            record = records.popleft()
+            if isinstance(record, Exception):
+                raise record
+            return record
+
+        _fake_kmsg(mocker)
+        mocker.patch('framework.dmesg.os.read', side_effect=read)
+        # Make the monotonic clock the same as time.time().
+        mocker.patch('framework.dmesg._monotonic',
+                     side_effect=lambda: dmesg.time.time())
+        return records.extend
+
+    @staticmethod
+    def _result(start, end):
+        result = results.TestResult(status.PASS)
+        result.time.start = start
+        result.time.end = end
+        return result
+
+    def test_update_dmesg(self, kmsg):
+        """Only new records of a high enough level are read."""
+        test = dmesg.KmsgDmesg()
+        kmsg([b'4,10,1500000,-;first\n',
+              b'6,11,1600000,-;info is ignored\n',
+              b'3,12,2000001,-;second\n SUBSYSTEM=drm\n',
+              b'3,12,2000001,-;second\n'])
+        test.update_dmesg()
+        assert test._new_messages == ['[    1.500000] first',
+                                      '[    2.000001] second']
+
+        test.update_dmesg()
+        assert test._new_messages == []
+
+    def test_overwritten(self, kmsg):
+        """Records that were overwritten before being read are skipped."""
+        test = dmesg.KmsgDmesg()
+        kmsg([OSError(errno.EPIPE, 'Broken pipe'), b'4,20,1000000,-;foo\n'])
+        test.update_dmesg()
+        assert test._new_messages == ['[    1.000000] foo']
+
+    def test_update_result_window(self, kmsg):
+        """Only messages logged while the test ran are attributed to it."""
+        test = dmesg.KmsgDmesg()
+        test.serial = False
+        kmsg([b'4,1,1000000,-;before\n',
+              b'4,2,2000000,-;during\n',
+              b'4,3,3000000,-;after\n'])
+
+        result = test.update_result(self._result(1.5, 2.5))
+        assert result.dmesg == '[    2.000000] during'
+        assert result.result is status.DMESG_WARN
+
+        # The records are remembered for tests that overlap.
+        result = test.update_result(self._result(0.5, 3.5))
+        assert result.dmesg == ('[    1.000000] before\n'
+                                '[    2.000000] during\n'
+                                '[    3.000000] after')
+
+    def test_update_result_late(self, kmsg):
+        """Messages logged after a test ended and read later aren't
+        attributed to it.
+        """
+        test = dmesg.KmsgDmesg()
+        test.serial = False
+        kmsg([b'4,1,2000000,-;during\n'])
+        result = test.update_result(self._result(1.5, 2.5))
+        assert result.dmesg == '[    2.000000] during'
+
+        kmsg([b'4,2,3000000,-;late\n'])
+        result = test.update_result(self._result(3.5, 4.5))
+        assert result.result is status.PASS
+
+    def test_update_result_serial(self, kmsg):
+        """When tests run serially the messages read while a test runs are
+        attributed to it, and those logged before it started are not.
+        """
+        test = dmesg.KmsgDmesg()
+
+        # Logged between tests, read when the next one starts.
+        kmsg([b'4,1,1000000,-;before\n'])
+        test.update_dmesg()
+        kmsg([b'4,2,2000000,-;during\n'])
+        result = test.update_result(self._result(1.5, 2.5))
+        assert result.dmesg == '[    2.000000] during'
+
+        kmsg([b'4,3,3000000,-;between\n'])
+        test.update_dmesg()
+        result = test.update_result(self._result(3.5, 4.5))
+        assert result.result is status.PASS
+
+    def test_update_result_no_messages(self, kmsg):
+        test = dmesg.KmsgDmesg()
+        test.serial = False
+        kmsg([b'4,1,1000000,-;before\n'])
+        result = test.update_result(self._result(1.5, 2.5))
+        assert result.result is status.PASS
+
+    def test_repr(self, kmsg):  # pylint: disable=unused-argument
+        assert repr(dmesg.KmsgDmesg()) == 'KmsgDmesg()'
+
+
 class TestDummyDmesg(object):
     """Tests for the DummyDmesg class."""
     _Namespace = collections.namedtuple('_Namespace', ['dmesg', 'result'])
@@ -351,19 +473,25 @@ class TestGetDmesg(object):
     """Tests for get_dmesg factory."""
 
     @pytest.mark.parametrize(
-        'platform,dummy,expected',
+        'platform,dummy,kmsg,expected',
         [
-            ('win32', False, dmesg.DummyDmesg),
-            ('win32', True, dmesg.DummyDmesg),
-            skip.linux(('linux', False, dmesg.DummyDmesg)),
-            skip.linux(('linux', True, dmesg.LinuxDmesg)),
+            ('win32', False, False, dmesg.DummyDmesg),
+            ('win32', True, False, dmesg.DummyDmesg),
+            skip.linux(('linux', False, False, dmesg.DummyDmesg)),
+            skip.linux(('linux', True, False, dmesg.LinuxDmesg)),
+            skip.linux(('linux', True, True, dmesg.KmsgDmesg)),
         ],
         ids=_name_get_dmesg)
-    def test_get_dmesg(self, platform, dummy, expected, mocker):
+    def test_get_dmesg(self, platform, dummy, kmsg, expected, mocker):
         """Test that get_dmesg returns the expected dmesg type on variuos
         platforms with various configurations.
         """
         mocker.patch('framework.dmesg.sys.platform', platform)
+        if kmsg:
+            _fake_kmsg(mocker)
+            mocker.patch('framework.dmesg.KmsgDmesg.update_dmesg')
+        else:
+            mocker.patch('framework.dmesg.os.open', side_effect=OSError)
 
         with mock.patch('framework.dmesg.subprocess.check_output',
                         mock.Mock(return_value=b'[1.0]foo')):
@@ -26,12 +26,15 @@ This provides tests for the framework.monitoring modules.
 from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
+import pickle
+import time
 
 import pytest
 import six
 
 from framework import exceptions
 from framework import monitoring
+from framework import results
 from . import skip
 
 # pylint: disable=no-self-use,attribute-defined-outside-init
@@ -47,9 +50,9 @@ class TestMonitoring(object):
         to avoid reading the rules in piglit.conf.
         """
         self.regex = r'\*ERROR\*|BUG:'
-        self.init_contents = r'foo bar\n'
-        self.no_error_contents = r'foo bar\n'
-        self.error_contents = r'BUG:bar\n'
+        self.init_contents = 'foo bar\n'
+        self.no_error_contents = 'foo bar\n'
+        self.error_contents = 'BUG:bar\n'
         self.monitoring = monitoring.Monitoring(False)
 
     @skip.linux
@@ -176,3 +179,201 @@ class TestMonitoring(object):
         self.monitoring.check_monitoring()
 
         assert self.monitoring.abort_needed is False
+
+    @skip.posix
+    def test_errors(self, tmpdir):
+        """monitoring.Monitoring: errors are matched to tests by time."""
+        p = tmpdir.join('foo')
+        p.write(b'', mode='wb')
+        self.monitoring.add_rule('error_file', 'file', six.text_type(p),
+                                 self.regex)
+        self.monitoring.update_monitoring()
+
+        before = results.TestResult()
+        before.time.start = time.time() - 10
+        before.time.end = time.time() - 5
+        during = results.TestResult()
+        during.time.start = time.time()
+        p.write(b'foo\nBUG: bar\n', mode='ab')
+        during.time.end = time.time()
+
+        assert self.monitoring.check_monitoring(during, 'during') == \
+            [('error_file', 'BUG: bar')]
+        assert self.monitoring.check_monitoring(before, 'before') == []
+        assert self.monitoring.error_message == \
+            'From the rule error_file:\nBUG: bar\nWhile running: during'
+
+    @skip.posix
+    def test_abort_kept(self, tmpdir):
+        """monitoring.Monitoring: once an error is found, abort is still
+        needed after later checks.
+        """
+        p = tmpdir.join('foo')
+        p.write(b'', mode='wb')
+        self.monitoring.add_rule('error_file', 'file', six.text_type(p),
+                                 self.regex)
+        self.monitoring.update_monitoring()
+        p.write(b'BUG: bar\n', mode='ab')
+        self.monitoring.update_monitoring()
+        self.monitoring.check_monitoring()
+
+        assert self.monitoring.abort_needed is True
+
+    @skip.posix
+    @pytest.mark.timeout(10)
+    def test_thread(self, tmpdir, mocker):
+        """monitoring.Monitoring: sources are read from a background thread.
+        """
+        mocker.patch.object(self.monitoring, 'INTERVAL', 0.01)
+        p = tmpdir.join('foo')
+        p.write(b'', mode='wb')
+        self.monitoring.add_rule('error_file', 'file', six.text_type(p),
+                                 self.regex)
+        self.monitoring.start()
+        try:
+            p.write(b'BUG: bar\n', mode='ab')
+            while not self.monitoring.abort_needed:
+                time.sleep(0.01)
+        finally:
+            self.monitoring.stop()
+
+        assert self.monitoring.error_message == \
+            'From the rule error_file:\nBUG: bar'
+
+    @skip.posix
+    def test_thread_reads(self, tmpdir, mocker):
+        """monitoring.Monitoring: while the thread is running checking a
+        test doesn't read the sources, and a test is named in the
+        error_message even if the error is found after it was checked.
+        """
+        mocker.patch.object(self.monitoring, 'INTERVAL', 60)
+        p = tmpdir.join('foo')
+        p.write(b'', mode='wb')
+        self.monitoring.add_rule('error_file', 'file', six.text_type(p),
+                                 self.regex)
+        self.monitoring.start()
+        try:
+            update = mocker.spy(self.monitoring, 'update_monitoring')
+            result = results.TestResult()
+            result.time.start = time.time()
+            p.write(b'BUG: bar\n', mode='ab')
+            result.time.end = time.time()
+            assert self.monitoring.check_monitoring(result, 'test') == []
+            assert update.call_count == 0
+        finally:
+            self.monitoring.stop()
+
+        # What the thread would have read next.
+        self.monitoring.update_monitoring()
+        assert self.monitoring.errors(result.time.start,
+                                      result.time.end) == \
+            [('error_file', 'BUG: bar')]
+        assert self.monitoring.error_message == \
+            'From the rule error_file:\nBUG: bar\nWhile running: test'
+
+    def test_pickle(self):
+        """monitoring.Monitoring: can be pickled, as part of a profile."""
+        self.monitoring.start()
+        self.monitoring.stop()
+        new = pickle.loads(pickle.dumps(self.monitoring))
+        assert new.abort_needed is False
+        new.check_monitoring()
+
+
+@skip.posix
+class TestMonitoringFile(object):
+    """Tests for the MonitoringFile class."""
+
+    @pytest.fixture(params=[False, True], ids=['poll', 'inotify'])
+    def setup(self, request, tmpdir):
+        """Return a file with some old contents, and a MonitoringFile for it.
+        """
+        p = tmpdir.join('log')
+        p.write(b'old\n' * 10, mode='wb')
+        rule = monitoring.MonitoringFile(six.text_type(p), r'BUG',
+                                         inotify=request.param)
+        rule.update_monitoring()
+        assert rule.new_messages == []
+        return p, rule
+
+    def test_appended(self, setup):
+        """Only the lines appended since the last update are read."""
+        p, rule = setup
+        p.write(b'one\ntwo\n', mode='ab')
+        rule.update_monitoring()
+        assert rule.new_messages == ['one', 'two']
+
+        rule.update_monitoring()
+        assert rule.new_messages == []
+
+    def test_partial(self, setup):
+        """A line is only returned once it has been finished."""
+        p, rule = setup
+        p.write(b'one\ntw', mode='ab')
+        rule.update_monitoring()
+        assert rule.new_messages == ['one']
+
+        p.write(b'o\n', mode='ab')
+        rule.update_monitoring()
+        assert rule.new_messages == ['two']
+
+    def test_partial_existing(self, tmpdir):
+        """The rest of a line which was started before the file was first
+        read is returned with its start.
+        """
+        p = tmpdir.join('log')
+        p.write(b'old\nBU', mode='wb')
+        rule = monitoring.MonitoringFile(six.text_type(p), r'BUG')
+        rule.update_monitoring()
+        p.write(b'G\n', mode='ab')
+        rule.update_monitoring()
+        assert rule.new_messages == ['BUG']
+
+    def test_truncated(self, setup):
+        """A file that shrinks is read from the start."""
+        p, rule = setup
+        p.write(b'BUG\n', mode='wb')
+        rule.update_monitoring()
+        assert rule.new_messages == ['BUG']
+        assert rule.check_monitoring() == 'BUG'
+
+    def test_rotated(self, setup, tmpdir):
+        """A file that is replaced is read from the start, after what is left
+        of the old file.
+        """
+        p, rule = setup
+        p.write(b'last\nunterminated', mode='ab')
+        p.rename(tmpdir.join('log.1'))
+        tmpdir.join('log').write(b'first\n', mode='wb')
+        rule.update_monitoring()
+        assert rule.new_messages == ['last', 'unterminated', 'first']
+
+    def test_missing(self, setup):
+        """A file that doesn't exist has no messages."""
+        p, rule = setup
+        p.write(b'one\n', mode='ab')
+        p.remove()
+        rule.update_monitoring()
+        assert rule.new_messages == []
+
+        p.write(b'two\n', mode='wb')
+        rule.update_monitoring()
+        assert rule.new_messages == ['one', 'two']
+
+    def test_inotify_unchanged(self, tmpdir, mocker):
+        """With inotify the file isn't looked at when it hasn't changed."""
+        p = tmpdir.join('log')
+        p.write(b'old\n', mode='wb')
+        rule = monitoring.MonitoringFile(six.text_type(p), r'BUG',
+                                         inotify=True)
+        rule.update_monitoring()
+        if rule._inotify is None:
+            pytest.skip('inotify is not available')
+
+        stat = mocker.spy(monitoring.os, 'stat')
+        rule.update_monitoring()
+        assert stat.call_count == 0
+
+        p.write(b'new\n', mode='ab')
+        rule.update_monitoring()
+        assert rule.new_messages == ['new']
@@ -24,12 +24,17 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+import contextlib
+import threading
+import time
+
 import pytest
 import six
 
 from framework import exceptions
 from framework import grouptools
 from framework import profile
+from framework import status
 from framework.test.gleantest import GleanTest
 from . import utils
 
@@ -305,3 +310,310 @@ class TestRegexFilter(object):
             """Returns False when the test matches any regex."""
             test = profile.RegexFilter([r'fob', r'bar'], inverse=True)
             assert test('foobob', None)
+
+
+@pytest.fixture
+def cache_dir(tmpdir, mocker):
+    """Redirect the profile caches into a temporary directory."""
+    cache = tmpdir.mkdir('cache')
+    mocker.patch('framework.profile.get_cache_dir',
+                 return_value=six.text_type(cache))
+    mocker.patch('framework.profile._DISABLE_CACHE', False)
+    return cache
+
+
+class TestDirectoryCache(object):
+    """Tests for the DirectoryCache class."""
+
+    @pytest.fixture
+    def tree(self, tmpdir):
+        root = tmpdir.mkdir('tree')
+        root.mkdir('a').join('foo.test').write('foo')
+        root.mkdir('b').join('bar.test').write('bar')
+        return root
+
+    @staticmethod
+    def walk(root, calls):
+        def func(dirpath, filenames):
+            calls.append(dirpath)
+            return sorted(filenames)
+
+        cache = profile.DirectoryCache('test')
+        values = dict(cache.walk(six.text_type(root), func))
+        cache.save()
+        return values
+
+    def test_walk(self, cache_dir, tree):
+        """Yields the value returned by func for each directory."""
+        values = self.walk(tree, [])
+        assert values[six.text_type(tree.join('a'))] == ['foo.test']
+        assert values[six.text_type(tree.join('b'))] == ['bar.test']
+
+    def test_cached(self, cache_dir, tree):
+        """func isn't called for directories that haven't changed."""
+        expected = self.walk(tree, [])
+        calls = []
+        assert self.walk(tree, calls) == expected
+        assert calls == []
+
+    def test_changed(self, cache_dir, tree):
+        """Only directories that have changed are processed again."""
+        self.walk(tree, [])
+        tree.join('b', 'baz.test').write('baz')
+
+        calls = []
+        values = self.walk(tree, calls)
+        assert calls == [six.text_type(tree.join('b'))]
+        assert values[six.text_type(tree.join('b'))] == ['bar.test',
+                                                          'baz.test']
+
+
+class TestProfileCache(object):
+    """Tests for the ProfileCache class."""
+
+    @pytest.fixture
+    def inst(self, cache_dir, tmpdir):
+        tree = tmpdir.mkdir('tree')
+        tree.join('foo.test').write('foo')
+
+        orig = profile.TestProfile()
+        orig.test_list['foo'] = utils.Test(['foo'])
+        orig.source_trees = {
+            six.text_type(tree): profile._tree_signatures(six.text_type(tree))}
+        profile.ProfileCache('test').save(orig)
+        return tree
+
+    def test_load(self, inst):
+        """Returns the saved profile."""
+        cached = profile.ProfileCache('test').load()
+        assert cached.test_list['foo'].command == ['foo']
+
+    def test_no_cache(self, cache_dir):
+        """Returns None if there is no cached profile."""
+        assert profile.ProfileCache('test').load() is None
+
+    def test_stale(self, inst):
+        """Returns None if a file in the source trees has been added."""
+        inst.join('bar.test').write('bar')
+        assert profile.ProfileCache('test').load() is None
+
+    def test_unpicklable(self, cache_dir):
+        """Profiles that can't be pickled are not cached."""
+        orig = profile.TestProfile()
+        orig.filters.append(lambda n, _: True)
+        profile.ProfileCache('test').save(orig)
+        assert profile.ProfileCache('test').load() is None
+
+
+class _PassTest(utils.Test):
+    """A Test that passes without running a command."""
+
+    def run(self):
+        self.result.result = 'pass'
+
+
+class _Backend(object):
+    """A Backend that stores the results in a dict."""
+
+    def __init__(self):
+        self.results = {}
+
+    @contextlib.contextmanager
+    def write_test(self, name):
+        def writer(result):
+            self.results[name] = result
+        yield writer
+
+
+class TestRun(object):
+    """Tests for the run function."""
+
+    @pytest.mark.parametrize('executor', profile.EXECUTORS)
+    def test_executor(self, executor):
+        """Every test is run and has its result written to the backend."""
+        inst = profile.TestProfile()
+        inst.test_list['concurrent'] = _PassTest(['foo'], run_concurrent=True)
+        inst.test_list['serial'] = _PassTest(['bar'], run_concurrent=False)
+        backend = _Backend()
+
+        profile.run([inst], 'dummy', backend, 'some', jobs=2,
+                    executor=executor)
+
+        assert sorted(backend.results) == ['concurrent', 'serial']
+        for result in six.itervalues(backend.results):
+            assert result.result is status.PASS
+
+
+class TestSchedule(object):
+    """Tests for the schedule function."""
+
+    @pytest.fixture
+    def test_list(self):
+        return [(n, utils.Test([n], run_concurrent=True))
+                for n in ['a', 'b', 'c', 'd']]
+
+    def test_longest_first(self, test_list):
+        """Tests are ordered by the time they took, longest first."""
+        history = {'a': 1, 'b': 4, 'c': 2, 'd': 3}
+        ordered, _ = profile.schedule(test_list, history, 2, 'all')
+        assert [n for n, _ in ordered] == ['b', 'd', 'c', 'a']
+
+    def test_predicted(self, test_list):
+        """Predicts the longest time any worker is busy."""
+        history = {'a': 1, 'b': 4, 'c': 2, 'd': 3}
+        _, predicted = profile.schedule(test_list, history, 2, 'all')
+        assert predicted == 5
+
+    def test_predicted_serial(self, test_list):
+        """Predicts the sum of the times when there is no concurrency."""
+        history = {'a': 1, 'b': 4, 'c': 2, 'd': 3}
+        _, predicted = profile.schedule(test_list, history, 2, 'none')
+        assert predicted == 10
+
+    def test_no_history(self, test_list):
+        """Tests without history are ordered by how many subtests they have.
+        """
+        test_list[2][1].result.subtests['x'] = status.NOTRUN
+        test_list[2][1].result.subtests['y'] = status.NOTRUN
+        ordered, _ = profile.schedule(test_list, {}, 2, 'all')
+        assert [n for n, _ in ordered] == ['c', 'a', 'b', 'd']
+
+    def test_unknown_median(self, test_list):
+        """Tests not in history are expected to take the median time."""
+        history = {'a': 1, 'b': 5, 'c': 3}
+        ordered, _ = profile.schedule(test_list, history, 2, 'all')
+        assert [n for n, _ in ordered] == ['b', 'c', 'd', 'a']
+
+
+class TestRWLock(object):
+    """Tests for the RWLock class."""
+
+    def test_shared(self):
+        """More than one reader can hold the lock at once."""
+        lock = profile.RWLock()
+        with lock.shared():
+            with lock.shared():
+                pass
+
+    @pytest.mark.timeout(10)
+    def test_exclusive(self):
+        """Readers and writers never hold the lock at the same time."""
+        lock = profile.RWLock(window=0.01)
+        state = {'readers': 0, 'writers': 0, 'overlap': False}
+        guard = threading.Lock()
+
+        def work(context, kind):
+            for _ in range(20):
+                with context():
+                    with guard:
+                        state[kind] += 1
+                        if state['writers'] and (
+                                state['readers'] or state['writers'] > 1):
+                            state['overlap'] = True
+                    time.sleep(0.001)
+                    with guard:
+                        state[kind] -= 1
+
+        threads = [threading.Thread(target=work, args=(lock.shared, 'readers'))
+                   for _ in range(4)]
+        threads.append(
+            threading.Thread(target=work, args=(lock.exclusive, 'writers')))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not state['overlap']
+
+    @pytest.mark.timeout(30)
+    def test_abort(self, tmpdir, mocker):
+        """No test is started after the one that caused a monitored error,
+        even if the monitoring thread hasn't read it yet.
+        """
+        log = tmpdir.join('log')
+        log.write(b'', mode='wb')
+
+        class Test(utils.Test):
+            def run(self):
+                log.write(b'BUG: hang\n', mode='ab')
+                self.result.result = 'pass'
+
+        inst = profile.TestProfile()
+        for i in range(5):
+            inst.test_list['t{}'.format(i)] = Test(['t'])
+        monitor = inst.options['monitor']
+        mocker.patch.object(monitor, 'INTERVAL', 60)
+        monitor.add_rule('error_file', 'file', six.text_type(log), r'BUG:')
+        backend = _Backend()
+
+        with pytest.raises(exceptions.PiglitAbort):
+            profile.run([inst], 'dummy', backend, 'none')
+
+        assert len(backend.results) == 1
+
+    def test_interleave(self):
+        """The interleave concurrency mode runs every test."""
+        inst = profile.TestProfile()
+        inst.test_list['concurrent'] = _PassTest(['foo'], run_concurrent=True)
+        inst.test_list['serial'] = _PassTest(['bar'], run_concurrent=False)
+        backend = _Backend()
+
+        profile.run([inst], 'dummy', backend, 'interleave', jobs=2)
+
+        assert sorted(backend.results) == ['concurrent', 'serial']
+
+    @pytest.mark.timeout(30)
+    def test_interleave_window(self, mocker):
+        """More than one serial test is run in each exclusive window."""
+        lock = profile.RWLock
+        mocker.patch('framework.profile.RWLock', lambda: lock(window=0.05))
+        events = []
+        guard = threading.Lock()
+
+        class Test(utils.Test):
+            def run(self):
+                with guard:
+                    events.append(self.command[0])
+                time.sleep(0.01 if self.run_concurrent else 0.001)
+                self.result.result = 'pass'
+
+        inst = profile.TestProfile()
+        for i in range(80):
+            inst.test_list['c{}'.format(i)] = Test(['c'], run_concurrent=True)
+        for i in range(4):
+            inst.test_list['s{}'.format(i)] = Test(['s'], run_concurrent=False)
+
+        class Backend(_Backend):
+            """A backend that takes a while to write each result."""
+            @contextlib.contextmanager
+            def write_test(self, name):
+                with super(Backend, self).write_test(name) as writer:
+                    yield writer
+                time.sleep(0.005)
+
+        profile.run([inst], 'dummy', Backend(), 'interleave', jobs=4)
+
+        # The serial tests are short enough to all run in the first window,
+        # without a concurrent test starting between them.
+        first = events.index('s')
+        assert events[first:first + 4] == ['s'] * 4
+        assert len(events) == 84
+
+    @pytest.mark.timeout(10)
+    def test_expired(self):
+        """The window only expires once the other side is waiting."""
+        lock = profile.RWLock(window=0.01)
+
+        def read():
+            with lock.shared():
+                pass
+
+        reader = threading.Thread(target=read)
+        with lock.exclusive():
+            time.sleep(0.02)
+            assert not lock.expired()
+
+            reader.start()
+            while not lock.expired():
+                time.sleep(0.001)
+        reader.join()
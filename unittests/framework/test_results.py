@@ -27,12 +27,14 @@ from __future__ import (
 
 import pytest
 import six
+from six.moves import cPickle
 
 from framework import exceptions
 from framework import grouptools
 from framework import results
 from framework import status
 
+from . import skip
 from .backends import shared
 
 # pylint: disable=no-self-use
@@ -81,6 +83,39 @@ class TestSubtests(object):
 
         assert test['foo'] is status.PASS
 
+    @skip.PY2
+    def test_interned(self, subtest):
+        """Subtest names are interned."""
+        other = results.Subtests()
+        subtest[''.join(['fo', 'o'])] = 'pass'
+        other[''.join(['f', 'oo'])] = 'pass'
+
+        assert next(iter(subtest)) is next(iter(other))
+
+    @pytest.mark.parametrize('ops', [
+        [('a', 'pass'), ('b', 'fail'), ('c', 'warn')],
+        [('a', 'fail'), ('a', 'pass')],
+        [('a', 'skip'), ('b', 'notrun'), ('a', 'notrun')],
+        [('a', 'crash'), ('b', 'pass'), ('a', None)],
+        [('a', 'pass'), ('b', 'skip'), ('b', None), ('c', 'notrun')],
+    ])
+    def test_worst(self, subtest, ops):
+        """The cached worst status is the same as max() of the statuses."""
+        for name, value in ops:
+            if value is None:
+                del subtest[name]
+            else:
+                subtest[name] = value
+            assert subtest.worst() is max(six.itervalues(dict(subtest)))
+
+    def test_pickle(self, subtest):
+        subtest['foo'] = 'fail'
+        subtest['bar'] = 'pass'
+        test = cPickle.loads(cPickle.dumps(subtest, 0))
+
+        assert dict(test) == dict(subtest)
+        assert test.worst() is status.FAIL
+
 
 class TestTestResult(object):
     """Tests for the TestResult class."""
@@ -587,6 +622,67 @@ class TestTestrunResult(object):
             with pytest.raises(KeyError):
                 self.inst.get_result('fooobar')
 
+    class TestIndex(object):
+        """Tests for the index of tests and subtests."""
+
+        @pytest.fixture
+        def inst(self):
+            tr = results.TestResult('crash')
+            tr.subtests['foo'] = status.PASS
+
+            run = results.TestrunResult()
+            run.tests['sub'] = tr
+            run.tests['test'] = results.TestResult('pass')
+            return run
+
+        def test_resolve(self, inst):
+            """resolve returns the test and subtest names."""
+            assert inst.resolve('test') == ('test', None)
+            assert inst.resolve(grouptools.join('sub', 'foo')) == \
+                ('sub', 'foo')
+
+        def test_add_test(self, inst):
+            """Adding a test after the index is built finds the new test."""
+            inst.get_result('test')
+            inst.tests['new'] = results.TestResult('fail')
+            assert inst.get_result('new') == 'fail'
+
+        def test_delete_test(self, inst):
+            """Removing a test after the index is built forgets the test."""
+            inst.get_result('test')
+            del inst.tests['test']
+            with pytest.raises(KeyError):
+                inst.get_result('test')
+
+        def test_replace_tests(self, inst):
+            """Replacing tests after the index is built forgets the tests."""
+            inst.get_result('test')
+            inst.tests = {'other': results.TestResult('fail')}
+            assert inst.get_result('other') == 'fail'
+            with pytest.raises(KeyError):
+                inst.get_result('test')
+
+        def test_add_subtest(self, inst):
+            """Subtests added after the index is built are found."""
+            inst.get_result('test')
+            inst.tests['sub'].subtests['bar'] = status.FAIL
+            assert inst.get_result(grouptools.join('sub', 'bar')) == 'fail'
+
+        def test_iter_results(self, inst):
+            """iter_results yields every test and subtest."""
+            assert dict(inst.iter_results()) == {
+                'sub': status.CRASH,
+                grouptools.join('sub', 'foo'): status.PASS,
+                'test': status.PASS,
+            }
+
+        def test_pickle(self, inst):
+            """The tests can be pickled."""
+            inst.get_result('test')
+            new = cPickle.loads(cPickle.dumps(inst))
+            assert list(new.tests) == ['sub', 'test']
+            assert new.get_result(grouptools.join('sub', 'foo')) == 'pass'
+
 
 class TestTimeAttribute(object):
     """Tests for the TimeAttribute class."""